@@ -6,6 +6,8 @@ import os
 import re
 from pathlib import Path
 
+from bracket_index import BracketIndex
+
 def fix_missing_closures(filepath):
     """Add missing ); after function calls"""
     with open(filepath, 'r', encoding='utf-8') as f:
@@ -13,6 +15,7 @@ def fix_missing_closures(filepath):
 
     original = content
     lines = content.split('\n')
+    index = BracketIndex(content)
     fixed_lines = []
 
     i = 0
@@ -39,21 +42,9 @@ def fix_missing_closures(filepath):
                 if next_line and not next_line.startswith(')') and not next_line.startswith(';') and not next_line.startswith('}') and not next_line.startswith('catch') and not next_line.startswith('finally'):
                     # Count braces and parens to determine if we need to close
                     # Look back up to 30 lines to find the opening
-                    brace_count = 0
-                    paren_count = 0
-
-                    for j in range(max(0, i - 30), i + 1):
-                        check_line = lines[j]
-                        # Count opening/closing braces and parens
-                        for char in check_line:
-                            if char == '(':
-                                paren_count += 1
-                            elif char == ')':
-                                paren_count -= 1
-                            elif char == '{':
-                                brace_count += 1
-                            elif char == '}':
-                                brace_count -= 1
+                    counts = index.counts_between(max(0, i - 30), i)
+                    brace_count = counts.brace
+                    paren_count = counts.paren
 
                     # If we have more opening parens than closing, and braces are balanced, add );
                     if paren_count > 0 and brace_count == 0:
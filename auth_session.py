@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Auth Sessions
+Logs test users in through /api/auth/login and keeps their bearer tokens
+fresh, so route tests reach the handlers behind authenticateRequest instead
+of stopping at a 401. Tokens are refreshed through /api/auth/refresh shortly
+before they expire (that route itself needs a live access token) and a user
+is logged in again if refreshing fails. Several users can be pooled so that
+per-user rate limits do not throttle a benchmark.
+"""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from http_client import ConnectionPool, HttpError
+
+LOGIN_PATH = "/api/auth/login"
+REFRESH_PATH = "/api/auth/refresh"
+
+# Refresh this long before the access token runs out
+REFRESH_MARGIN = 60.0
+# Access token lifetime assumed when the login response has no expires_in
+DEFAULT_EXPIRES_IN = 15 * 60
+
+# Used when no --user / --users is given
+ENV_EMAIL = "ASH_TEST_EMAIL"
+ENV_PASSWORD = "ASH_TEST_PASSWORD"
+
+class Credentials(NamedTuple):
+    email: str
+    password: str
+
+class AuthError(Exception):
+    """Login or refresh rejected by the server"""
+
+class TokenSession:
+    """One user's token pair, refreshed or re-acquired on demand"""
+
+    def __init__(self, credentials: Credentials):
+        self.credentials = credentials
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        # Wall-clock expiry, so a token cache stays valid across runs
+        self.expires_at = 0.0
+        self.logins = 0
+        self.refreshes = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _loop_lock(self) -> asyncio.Lock:
+        # A session outlives the event loop of a single asyncio.run (warm-up,
+        # then measured rounds), and a lock may only be used in one loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    def valid(self, margin: float = REFRESH_MARGIN) -> bool:
+        return bool(self.access_token) and time.time() < self.expires_at - margin
+
+    def _store(self, data: Dict):
+        if not data.get("access_token"):
+            raise AuthError(f"{self.credentials.email}: response has no access_token")
+        self.access_token = data["access_token"]
+        self.refresh_token = data.get("refresh_token") or self.refresh_token
+        self.expires_at = time.time() + float(data.get("expires_in") or DEFAULT_EXPIRES_IN)
+
+    async def _post(self, pool: ConnectionPool, path: str, payload: Dict,
+                    token: Optional[str] = None) -> Dict:
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        response = await pool.request("POST", path, headers, json.dumps(payload).encode())
+        try:
+            data = json.loads(response.text() or "{}")
+        except json.JSONDecodeError:
+            data = {}
+        if response.status != 200:
+            reason = data.get("error") or response.text()[:200]
+            raise AuthError(f"{self.credentials.email}: {path} returned {response.status}: {reason}")
+        return data
+
+    async def login(self, pool: ConnectionPool):
+        data = await self._post(pool, LOGIN_PATH, {"email": self.credentials.email,
+                                                   "password": self.credentials.password})
+        self._store(data)
+        self.logins += 1
+
+    async def refresh(self, pool: ConnectionPool):
+        # Refresh tokens rotate: the old one is blacklisted once used
+        data = await self._post(pool, REFRESH_PATH, {"refresh_token": self.refresh_token},
+                                token=self.access_token)
+        self._store(data)
+        self.refreshes += 1
+
+    async def authorization(self, pool: ConnectionPool, force: bool = False) -> str:
+        """
+        Authorization header value, refreshing or logging in first if the
+        token is missing, close to expiry, or force is set (after a 401).
+        Concurrent callers wait for a single refresh.
+        """
+        stale = self.access_token
+        async with self._loop_lock():
+            if force and self.access_token == stale:
+                self.expires_at = 0.0
+            if not self.valid():
+                refreshed = False
+                if self.refresh_token and self.access_token and time.time() < self.expires_at:
+                    try:
+                        await self.refresh(pool)
+                        refreshed = True
+                    except (AuthError, HttpError, asyncio.TimeoutError):
+                        pass
+                if not refreshed:
+                    await self.login(pool)
+            return f"Bearer {self.access_token}"
+
+class SessionPool:
+    """Round-robin over several users' sessions"""
+
+    def __init__(self, users: List[Credentials]):
+        if not users:
+            raise ValueError("SessionPool needs at least one user")
+        self.sessions = [TokenSession(user) for user in users]
+        self._next = 0
+
+    def next(self) -> TokenSession:
+        session = self.sessions[self._next % len(self.sessions)]
+        self._next += 1
+        return session
+
+    async def login_all(self, pool: ConnectionPool) -> List[str]:
+        """
+        Make sure every session holds a usable token. Users that cannot log
+        in are dropped from the rotation; their errors are returned.
+        """
+        outcomes = await asyncio.gather(*(session.authorization(pool) for session in self.sessions),
+                                        return_exceptions=True)
+        errors = [str(outcome) for outcome in outcomes if isinstance(outcome, BaseException)]
+        self.sessions = [session for session, outcome in zip(self.sessions, outcomes)
+                         if not isinstance(outcome, BaseException)]
+        if not self.sessions:
+            raise AuthError("No test user could log in: " + "; ".join(errors))
+        return errors
+
+    def load_cache(self, path: Path):
+        """Reuse unexpired tokens saved by an earlier run, saving a login per user"""
+        if not path.exists():
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        for session in self.sessions:
+            entry = cached.get(session.credentials.email)
+            if entry:
+                session.access_token = entry.get("access_token")
+                session.refresh_token = entry.get("refresh_token")
+                session.expires_at = float(entry.get("expires_at", 0))
+
+    def save_cache(self, path: Path):
+        data = {session.credentials.email: {"access_token": session.access_token,
+                                            "refresh_token": session.refresh_token,
+                                            "expires_at": session.expires_at}
+                for session in self.sessions if session.access_token}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        # The file holds live credentials
+        os.chmod(path, 0o600)
+
+def parse_users(assignments: List[str], users_file: Optional[Path] = None) -> List[Credentials]:
+    """
+    Test users from EMAIL:PASSWORD assignments and a JSON file holding a list
+    of {"email", "password"} objects, falling back to the ASH_TEST_EMAIL /
+    ASH_TEST_PASSWORD environment variables.
+    """
+    users = []
+    if users_file:
+        with open(users_file, 'r', encoding='utf-8') as f:
+            users.extend(Credentials(entry["email"], entry["password"]) for entry in json.load(f))
+    for assignment in assignments:
+        email, sep, password = assignment.partition(':')
+        if not sep:
+            raise SystemExit(f"Expected EMAIL:PASSWORD, got {assignment!r}")
+        users.append(Credentials(email, password))
+    if not users and os.environ.get(ENV_EMAIL) and os.environ.get(ENV_PASSWORD):
+        users.append(Credentials(os.environ[ENV_EMAIL], os.environ[ENV_PASSWORD]))
+    return users
+
+def add_auth_arguments(parser):
+    """--login / --user / --users / --token-cache options shared by the route tools"""
+    parser.add_argument("--login", action="store_true",
+                        help=f"Log in first and send a bearer token with every request "
+                             f"(users from --user/--users or ${ENV_EMAIL}/${ENV_PASSWORD})")
+    parser.add_argument("--user", action="append", default=[], metavar="EMAIL:PASSWORD",
+                        help="Test user to log in as (repeatable; requests rotate over users)")
+    parser.add_argument("--users", type=Path, metavar="FILE",
+                        help='JSON list of {"email": ..., "password": ...} test users')
+    parser.add_argument("--token-cache", type=Path, metavar="FILE",
+                        help="Reuse unexpired tokens from FILE and save them back after the run")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: window recount vs bracket depth index
+Compares the closure fixers' old approach (recount braces/parens over the
+previous N lines for every candidate line) with one BracketIndex scan per
+file plus O(1) queries, on the real API route tree.
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from bracket_index import BracketIndex
+from route_tree import API_DIR, find_route_files
+
+def window_recount(lines: List[str], window: int) -> List[Tuple[int, int]]:
+    """Old approach: (brace, paren) over the previous `window` lines, per line"""
+    results = []
+    for i in range(len(lines)):
+        brace_count = 0
+        paren_count = 0
+        for j in range(max(0, i - window), i + 1):
+            for char in lines[j]:
+                if char == '(':
+                    paren_count += 1
+                elif char == ')':
+                    paren_count -= 1
+                elif char == '{':
+                    brace_count += 1
+                elif char == '}':
+                    brace_count -= 1
+        results.append((brace_count, paren_count))
+    return results
+
+def index_lookup(content: str, window: int) -> List[Tuple[int, int]]:
+    """New approach: one scan, then an O(1) query per line"""
+    index = BracketIndex(content)
+    results = []
+    for i in range(index.line_count):
+        counts = index.counts_between(max(0, i - window), i)
+        results.append((counts.brace, counts.paren))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark window recount vs bracket depth index")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    parser.add_argument("--window", type=int, default=30, help="Look-back window in lines (default 30)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions, best is kept")
+    args = parser.parse_args()
+
+    route_files = find_route_files(args.api_dir)
+    sources = [(path, path.read_text(encoding='utf-8')) for path in route_files]
+    total_lines = sum(content.count('\n') + 1 for _, content in sources)
+
+    print("=" * 80)
+    print(" BRACKET DEPTH: WINDOW RECOUNT vs INDEX")
+    print("=" * 80)
+    print(f"Files: {len(sources)}   Lines: {total_lines}   Window: {args.window}")
+    print()
+
+    timings = {}
+    outputs = {}
+    for name, approach in [("window recount", lambda c: window_recount(c.split('\n'), args.window)),
+                           ("depth index", lambda c: index_lookup(c, args.window))]:
+        best = None
+        for _ in range(max(1, args.repeat)):
+            started = time.perf_counter()
+            outputs[name] = [approach(content) for _, content in sources]
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+
+    for name, seconds in timings.items():
+        print(f"  {name:<16} {seconds * 1000:>10.1f} ms   {seconds * 1e6 / total_lines:>8.2f} us/line")
+    if timings["depth index"]:
+        print(f"\nSpeedup: {timings['window recount'] / timings['depth index']:.1f}x")
+
+    # Lines where the raw recount is thrown off by strings, templates, regexes or comments
+    differing_lines = 0
+    differing_files = []
+    for (path, _), old, new in zip(sources, outputs["window recount"], outputs["depth index"]):
+        diff = sum(1 for a, b in zip(old, new) if a != b)
+        if diff:
+            differing_lines += diff
+            differing_files.append((diff, path.relative_to(args.api_dir)))
+
+    print(f"\nLines whose counts change once lexical context is respected: {differing_lines}")
+    for diff, relative_path in sorted(differing_files, key=lambda x: -x[0])[:10]:
+        print(f"  {diff:5d}  {relative_path}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Bracket Depth Index
+One linear, lexically aware scan of a TypeScript file that records { ( [
+depth at every line and offset. Braces inside strings, template literal
+text, regex literals and comments are not counted.
+"""
+
+import bisect
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+OPENERS = {'{': 0, '(': 1, '[': 2}
+CLOSERS = {'}': 0, ')': 1, ']': 2}
+
+# A '/' after one of these starts a regex literal rather than a division
+REGEX_PREFIX_CHARS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_PREFIX_WORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete',
+                      'void', 'throw', 'case', 'do', 'else', 'yield', 'await'}
+
+class Depth(NamedTuple):
+    brace: int
+    paren: int
+    bracket: int
+
+    def __sub__(self, other: 'Depth') -> 'Depth':
+        return Depth(self.brace - other.brace, self.paren - other.paren, self.bracket - other.bracket)
+
+ZERO = Depth(0, 0, 0)
+
+class BracketIndex:
+    """
+    Depth index for one file's content.
+    Lines are 0-based, matching content.split('\\n'). Depths are net counts
+    (they go negative on stray closers), so counts_between() gives the same
+    numbers the old per-line recount loops produced, minus lexical noise.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self.line_offsets = [0] + [m.end() for m in re.finditer('\n', content)]
+        self.pairs: Dict[int, int] = {}
+        self.unmatched: List[int] = []
+        # (start, end) of every string, template text, regex literal and comment
+        self.skipped_spans: List[Tuple[int, int]] = []
+        self._event_offsets: List[int] = []
+        self._event_depths: List[Depth] = []
+        self._scan()
+        self._index_lines()
+
+    # -- scanning -----------------------------------------------------------
+
+    def _skip(self, start: int, end: int) -> int:
+        self.skipped_spans.append((start, end))
+        return end
+
+    def _scan_quoted(self, i: int) -> int:
+        """Skip a '...' or "..." string starting at i; returns the offset after it"""
+        c, n, quote = self.content, len(self.content), self.content[i]
+        j = i + 1
+        while j < n and c[j] != quote and c[j] != '\n':
+            j += 2 if c[j] == '\\' else 1
+        return self._skip(i, min(j + 1, n))
+
+    def _scan_template_text(self, i: int) -> Tuple[int, bool]:
+        """
+        Skip template literal text starting at i (just after ` or a closing }).
+        Returns (offset, opened_expression): offset is after the closing ` or
+        after a '${' that starts an embedded expression.
+        """
+        c, n = self.content, len(self.content)
+        j = i
+        while j < n:
+            if c[j] == '\\':
+                j += 2
+            elif c[j] == '`':
+                return self._skip(i, j + 1), False
+            elif c[j] == '$' and j + 1 < n and c[j + 1] == '{':
+                return self._skip(i, j + 2), True
+            else:
+                j += 1
+        return self._skip(i, n), False
+
+    def _scan_regex(self, i: int) -> Optional[int]:
+        """Skip a regex literal starting at i, or return None if it is not one"""
+        c, n = self.content, len(self.content)
+        j, in_class = i + 1, False
+        while j < n and c[j] != '\n':
+            if c[j] == '\\':
+                j += 2
+                continue
+            if c[j] == '[':
+                in_class = True
+            elif c[j] == ']':
+                in_class = False
+            elif c[j] == '/' and not in_class:
+                j += 1
+                while j < n and (c[j].isalnum() or c[j] == '_'):
+                    j += 1
+                return self._skip(i, j)
+            j += 1
+        return None
+
+    def _scan(self):
+        c, n = self.content, len(self.content)
+        depth = [0, 0, 0]
+        open_stack: List[Tuple[int, int]] = []
+        # open_stack height at each '${' still waiting for its closing '}'
+        template_stack: List[int] = []
+        last = ''
+        i = 0
+
+        while i < n:
+            ch = c[i]
+
+            if ch in ' \t\r\n':
+                i += 1
+            elif ch == '/' and c.startswith('//', i):
+                end = c.find('\n', i)
+                i = self._skip(i, n if end < 0 else end)
+            elif ch == '/' and c.startswith('/*', i):
+                end = c.find('*/', i + 2)
+                i = self._skip(i, n if end < 0 else end + 2)
+            elif ch == '"' or ch == "'":
+                i = self._scan_quoted(i)
+                last = '"'
+            elif ch == '`':
+                i, opened = self._scan_template_text(i + 1)
+                if opened:
+                    template_stack.append(len(open_stack))
+                    last = '{'
+                else:
+                    last = '"'
+            elif ch == '/' and (not last or last in REGEX_PREFIX_CHARS or last in REGEX_PREFIX_WORDS):
+                end = self._scan_regex(i)
+                if end is None:
+                    last = ch
+                    i += 1
+                else:
+                    last = '"'
+                    i = end
+            elif ch.isalnum() or ch in '_$':
+                j = i + 1
+                while j < n and (c[j].isalnum() or c[j] in '_$'):
+                    j += 1
+                last = c[i:j]
+                i = j
+            elif ch in OPENERS:
+                kind = OPENERS[ch]
+                depth[kind] += 1
+                open_stack.append((kind, i))
+                self._record(i, depth)
+                last = ch
+                i += 1
+            elif ch in CLOSERS:
+                if ch == '}' and template_stack and template_stack[-1] == len(open_stack):
+                    # End of a ${...} expression: back to template text
+                    template_stack.pop()
+                    i, opened = self._scan_template_text(i + 1)
+                    if opened:
+                        template_stack.append(len(open_stack))
+                    last = '{' if opened else '"'
+                    continue
+                kind = CLOSERS[ch]
+                depth[kind] -= 1
+                if open_stack and open_stack[-1][0] == kind:
+                    _, start = open_stack.pop()
+                    self.pairs[start] = i
+                    self.pairs[i] = start
+                else:
+                    self.unmatched.append(i)
+                self._record(i, depth)
+                last = ch
+                i += 1
+            else:
+                last = ch
+                i += 1
+
+        self.unmatched.extend(start for _, start in open_stack)
+        self.unmatched.sort()
+
+    def _record(self, offset: int, depth: List[int]):
+        self._event_offsets.append(offset)
+        self._event_depths.append(Depth(*depth))
+
+    def _index_lines(self):
+        """Depth at the start of every line, from one merge over the events"""
+        self._line_start: List[Depth] = []
+        current, e = ZERO, 0
+        for offset in self.line_offsets:
+            while e < len(self._event_offsets) and self._event_offsets[e] < offset:
+                current = self._event_depths[e]
+                e += 1
+            self._line_start.append(current)
+        self._final = self._event_depths[-1] if self._event_depths else ZERO
+
+    # -- queries ------------------------------------------------------------
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_offsets)
+
+    def line_start(self, line: int) -> Depth:
+        """Depth before the first character of line"""
+        return self._line_start[line]
+
+    def line_end(self, line: int) -> Depth:
+        """Depth after the last character of line"""
+        return self._line_start[line + 1] if line + 1 < len(self._line_start) else self._final
+
+    def counts_between(self, first_line: int, last_line: int) -> Depth:
+        """Net opens minus closes over lines first_line..last_line inclusive"""
+        if last_line < first_line:
+            return ZERO
+        return self.line_end(last_line) - self.line_start(first_line)
+
+    def depth_at(self, offset: int) -> Depth:
+        """Depth just before offset"""
+        e = bisect.bisect_left(self._event_offsets, offset)
+        return self._event_depths[e - 1] if e else ZERO
+
+    def line_of(self, offset: int) -> int:
+        return bisect.bisect_right(self.line_offsets, offset) - 1
+
+    def in_code(self, offset: int) -> bool:
+        """False inside strings, template text, regex literals and comments"""
+        s = bisect.bisect_right(self.skipped_spans, (offset, float('inf'))) - 1
+        return s < 0 or not (self.skipped_spans[s][0] <= offset < self.skipped_spans[s][1])
+
+    def matching(self, offset: int) -> Optional[int]:
+        """Offset of the bracket matching the one at offset, if any"""
+        return self.pairs.get(offset)
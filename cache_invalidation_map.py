@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Cache Invalidation Map
+Records, for every route, the Prisma models its GET handler reads and the
+models its POST / PUT / PATCH / DELETE handlers write, including models
+reached through relations (include / select on reads, nested create /
+update / upsert on writes, resolved with schema.prisma). Module-level
+helpers a handler calls are counted with it.
+
+Cached GET handlers contribute the key they cache under, as a redis glob
+(`orders:list:${page}:${limit}` -> orders:list:*:*), resolved through
+CacheKeys and the cache layers' prefixes: the query-cache wrappers store
+keys as given, cachedForWorkspace under workspace-cache:workspace:<id>:,
+a CacheService under its own prefix. Mutations contribute the globs they
+invalidate: InvalidateCache.<area>() expands to the patterns that helper
+deletes in lib/performance/query-cache.ts.
+
+The result is an invalidation map, model -> cache keys -> routes, and a
+finding for every mutation that writes a model a cached GET reads without
+invalidating that GET's key:
+
+    [STALE]    nothing the mutation invalidates matches the key
+    [PARTIAL]  it invalidates only some of the keys (analytics:sales:* for analytics:*:*)
+    [UNKNOWN]  the GET's key could not be resolved to a pattern
+
+--assume-cached ROUTE (or --assume-all-cached) treats uncached GET handlers
+as wrapped by query_cache_coverage.py --wrap, to see which mutations need an
+InvalidateCache call before caching is turned on.
+"""
+
+import argparse
+import json
+import re
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from bracket_index import BracketIndex
+from cache_library import (CACHE_SERVICE_DEFAULT_PREFIX, SERVICE_INSTANCE, CacheLibrary, covers, load_cache_library,
+                           template_glob)
+from prisma_calls import (PrismaCall, _skip_comments, call_argument_object, find_handlers, find_prisma_calls,
+                          object_properties, split_top_level)
+from query_cache_coverage import coverage_of, module_functions, reachable_spans, wrap_key_prefix
+from route_tree import API_DIR, REPO_ROOT, find_route_files, map_route_files
+
+SCHEMA_FILE = REPO_ROOT / "packages" / "database" / "prisma" / "schema.prisma"
+MUTATION_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+RAW_SQL = "(raw SQL)"
+
+# Object keys whose value holds fields of the same model
+SAME_MODEL_KEYS = {"read": {"include", "select"},
+                   "write": {"data", "create", "createMany", "update", "updateMany", "upsert", "connectOrCreate"}}
+NESTED_WRITES = {"create", "createMany", "update", "updateMany", "upsert", "delete", "deleteMany", "set",
+                 "connectOrCreate"}
+
+# Cache reads: (call pattern, index of the key argument, prefix the layer puts in front)
+CACHE_READS = (
+    (re.compile(r'\b(?:cachedQueryWithMetrics|cachedQuery)\s*\('), 0, ""),
+    (re.compile(r'\bcachedForWorkspace\s*\('), 1, "workspace-cache:workspace:*:"),
+    (re.compile(r'\bcachedForUser\s*\('), 1, "user-cache:user:*:"),
+    (re.compile(r'\bcachedPaginated\s*\('), 0, "cache:"),
+    (re.compile(r'(?<![\w$.])cached\s*\('), 0, "cache:"),
+)
+INVALIDATE_HELPER = re.compile(r'\bInvalidateCache\s*\.\s*(\w+)\s*\(')
+INVALIDATE_CALLS = (
+    (re.compile(r'\binvalidateWorkspaceCache\s*\('), None, "workspace-cache:workspace:*:*"),
+    (re.compile(r'\binvalidateUserCache\s*\('), None, "user-cache:user:*:*"),
+    (re.compile(r'\binvalidateCache\s*\('), 0, "cache:"),
+)
+SERVICE_CALL = re.compile(r'(?<![\w$.])([A-Za-z_$][\w$]*)\s*\.\s*(get|invalidatePattern|delete|clear)\s*\(')
+
+class Schema(NamedTuple):
+    # Client accessor (order, qCInspection) -> model name
+    models: Dict[str, str]
+    # Model name -> {relation field: related model name}
+    relations: Dict[str, Dict[str, str]]
+
+    def model(self, accessor: str) -> str:
+        return self.models.get(accessor, accessor)
+
+class HandlerAccess(NamedTuple):
+    file: str
+    method: str
+    line: int
+    reads: List[str]
+    writes: List[str]
+    # Globs the handler caches under (GET) or invalidates (mutations); None for a key not resolved
+    cache_keys: List[Optional[str]]
+    invalidates: List[str]
+    cached: bool
+
+class StaleWrite(NamedTuple):
+    kind: str
+    file: str
+    method: str
+    line: int
+    model: str
+    cached_route: str
+    cache_key: Optional[str]
+
+    def to_dict(self) -> Dict:
+        return self._asdict()
+
+def load_schema(path: Path = SCHEMA_FILE) -> Schema:
+    text = path.read_text(encoding='utf-8') if path.exists() else ""
+    blocks = re.findall(r'^model\s+(\w+)\s*\{(.*?)^\}', text, re.MULTILINE | re.DOTALL)
+    names = {name for name, _ in blocks}
+    relations = {}
+    for name, body in blocks:
+        fields = {}
+        for field, field_type in re.findall(r'^\s*(\w+)\s+(\w+)(?:\[\])?\??', body, re.MULTILINE):
+            if field_type in names:
+                fields[field] = field_type
+        relations[name] = fields
+    return Schema({name[0].lower() + name[1:]: name for name in names}, relations)
+
+def related_models(content: str, index: BracketIndex, brace: int, model: str, schema: Schema, mode: str,
+                   found: Set[str]):
+    """Add the models reached through relation fields of the object at brace to found"""
+    properties = object_properties(content, index, brace)
+    for name, (start, end) in (properties or {}).items():
+        value = content[start:end]
+        if name in SAME_MODEL_KEYS[mode]:
+            targets = [model]
+        elif name in schema.relations.get(model, {}):
+            related = schema.relations[model][name]
+            nested = object_properties(content, index, start) if value.startswith('{') else None
+            if mode == "read" and value != "false" or mode == "write" and nested and NESTED_WRITES & set(nested):
+                found.add(related)
+            targets = [related]
+        else:
+            continue
+        if value.startswith('{'):
+            related_models(content, index, start, targets[0], schema, mode, found)
+        elif value.startswith('[') and index.matching(start) is not None:
+            for item_start, item_end in split_top_level(content, index, start + 1, index.matching(start)):
+                item = _skip_comments(content, item_start, item_end)
+                if content.startswith('{', item):
+                    related_models(content, index, item, targets[0], schema, mode, found)
+
+def call_models(content: str, index: BracketIndex, call: PrismaCall, schema: Schema) -> Set[str]:
+    """The model a call reads or writes, plus those it reaches through relations"""
+    if call.model is None:
+        return {RAW_SQL}
+    model = schema.model(call.model)
+    found = {model}
+    if call_argument_object(content, index, call):
+        first = _skip_comments(content, call.open + 1, call.close)
+        related_models(content, index, first, model, schema, "write" if call.writes else "read", found)
+    return found
+
+def key_glob(content: str, index: BracketIndex, expression: str, before: int, cache_keys: Dict[str, str],
+             depth: int = 0) -> Optional[str]:
+    """Glob of the keys an expression evaluates to, following consts and CacheKeys helpers"""
+    expression = expression.strip()
+    if re.fullmatch(r'`[^`]*`|"[^"]*"|\'[^\']*\'', expression, re.DOTALL):
+        return template_glob(expression)
+    helper = re.match(r'CacheKeys\s*\.\s*(\w+)\s*\(', expression)
+    if helper:
+        return cache_keys.get(helper.group(1))
+    if depth < 3 and re.fullmatch(r'[A-Za-z_$][\w$]*', expression):
+        declarations = [match for match in re.finditer(
+            rf'\b(?:const|let)\s+{re.escape(expression)}\s*(?::[^=]+)?=\s*', content[:before])
+            if index.in_code(match.start())]
+        if declarations:
+            start = declarations[-1].end()
+            end = start
+            while end < len(content) and not (content[end] in ';\n' and index.in_code(end)):
+                if content[end] in '({[' and index.matching(end) is not None:
+                    end = index.matching(end)
+                end += 1
+            return key_glob(content, index, content[start:end], declarations[-1].start(), cache_keys, depth + 1)
+    return None
+
+def call_arguments(content: str, index: BracketIndex, open_paren: int) -> List[str]:
+    close = index.matching(open_paren)
+    if close is None:
+        return []
+    return [content[start:end] for start, end in split_top_level(content, index, open_paren + 1, close)]
+
+def cache_services(content: str, library: CacheLibrary) -> Dict[str, str]:
+    """CacheService instances usable in the file: imported ones and module-level new CacheService(...)"""
+    services = {name: prefix for name, prefix in library.services.items() if re.search(rf'\b{name}\b', content)}
+    services.update({match.group(1): match.group(2) or CACHE_SERVICE_DEFAULT_PREFIX
+                     for match in SERVICE_INSTANCE.finditer(content)})
+    return services
+
+def cache_reads(content: str, index: BracketIndex, spans: List[Tuple[int, int]],
+                services: Dict[str, str], library: CacheLibrary) -> List[Optional[str]]:
+    keys = []
+    for start, end in spans:
+        for pattern, position, prefix in CACHE_READS:
+            for match in pattern.finditer(content, start, end):
+                arguments = call_arguments(content, index, match.end() - 1)
+                if index.in_code(match.start()) and len(arguments) > position:
+                    glob = key_glob(content, index, arguments[position], match.start(), library.cache_keys)
+                    custom = re.search(r'\bprefix\s*:\s*["\']([^"\']*)["\']', ''.join(arguments[position + 1:]))
+                    if custom and prefix == "cache:":
+                        prefix = f"{custom.group(1)}:"
+                    keys.append(prefix + glob if glob is not None else None)
+        for match in SERVICE_CALL.finditer(content, start, end):
+            if match.group(1) in services and match.group(2) == "get" and index.in_code(match.start()):
+                arguments = call_arguments(content, index, match.end() - 1)
+                glob = key_glob(content, index, arguments[0], match.start(), library.cache_keys) if arguments else None
+                keys.append(f"{services[match.group(1)]}:{glob}" if glob is not None else None)
+    return keys
+
+def invalidations(content: str, index: BracketIndex, spans: List[Tuple[int, int]],
+                  services: Dict[str, str], library: CacheLibrary) -> List[str]:
+    globs = []
+    for start, end in spans:
+        for match in INVALIDATE_HELPER.finditer(content, start, end):
+            if index.in_code(match.start()):
+                globs.extend(library.invalidators.get(match.group(1), []))
+        for pattern, position, glob in INVALIDATE_CALLS:
+            for match in pattern.finditer(content, start, end):
+                if not index.in_code(match.start()):
+                    continue
+                if position is None:
+                    globs.append(glob)
+                    continue
+                arguments = call_arguments(content, index, match.end() - 1)
+                key = key_glob(content, index, arguments[0], match.start(), library.cache_keys) if arguments else None
+                prefix = (template_glob(arguments[1].strip()) if len(arguments) > 1 and arguments[1].strip()[0] in '"\'`'
+                          else glob.rstrip(':'))
+                globs.append(f"{prefix}:{key}" if key is not None else f"{prefix}:*")
+        for match in SERVICE_CALL.finditer(content, start, end):
+            name, operation = match.groups()
+            if name not in services or operation == "get" or not index.in_code(match.start()):
+                continue
+            arguments = call_arguments(content, index, match.end() - 1)
+            keys = [key_glob(content, index, argument, match.start(), library.cache_keys)
+                    for argument in arguments] or ["*"]
+            globs.extend(f"{services[name]}:{key if key is not None else '*'}" for key in keys)
+    return globs
+
+def access_content(content: str, relative: str, schema: Schema, library: CacheLibrary,
+                   assume_cached: bool) -> List[HandlerAccess]:
+    index = BracketIndex(content)
+    handlers = find_handlers(content, index)
+    functions = module_functions(content, index, handlers)
+    calls = find_prisma_calls(content, index)
+    services = cache_services(content, library)
+    accesses = []
+    for handler in handlers:
+        if handler.method != "GET" and handler.method not in MUTATION_METHODS:
+            continue
+        spans = reachable_spans(content, (handler.start, handler.end), functions)
+        reads: Set[str] = set()
+        writes: Set[str] = set()
+        for call in calls:
+            if any(start <= call.start < end for start, end in spans):
+                (writes if call.writes else reads).update(call_models(content, index, call, schema))
+        keys: List[Optional[str]] = []
+        invalidated: List[str] = []
+        cached = False
+        if handler.method == "GET":
+            cached = coverage_of(content, index, spans) != "uncached"
+            keys = cache_reads(content, index, spans, services, library) if cached else []
+            if cached and not keys:
+                keys = [None]
+            if not cached and assume_cached and reads:
+                cached, keys = True, [f"{wrap_key_prefix(relative)}*"]
+        else:
+            invalidated = invalidations(content, index, spans, services, library)
+        accesses.append(HandlerAccess(relative, handler.method, index.line_of(handler.start) + 1, sorted(reads),
+                                      sorted(writes), keys, invalidated, cached))
+    return accesses
+
+def access_worker(api_dir: Path, schema: Schema, library: CacheLibrary, assume_cached: Set[str],
+                  assume_all: bool, filepath: str) -> List[HandlerAccess]:
+    """Pool entry point for one route file"""
+    path = Path(filepath)
+    relative = path.relative_to(api_dir).as_posix()
+    return access_content(path.read_text(encoding='utf-8'), relative, schema, library,
+                          assume_all or relative in assume_cached)
+
+def overlaps(a: str, b: str) -> bool:
+    """Whether some key matches both globs"""
+    memo: Dict[Tuple[int, int], bool] = {}
+    def match(i: int, j: int) -> bool:
+        if (i, j) not in memo:
+            if i == len(a) and j == len(b):
+                result = True
+            elif i < len(a) and a[i] == '*':
+                result = match(i + 1, j) or (j < len(b) and match(i, j + 1))
+            elif j < len(b) and b[j] == '*':
+                result = match(i, j + 1) or (i < len(a) and match(i + 1, j))
+            else:
+                result = i < len(a) and j < len(b) and a[i] == b[j] and match(i + 1, j + 1)
+            memo[(i, j)] = result
+        return memo[(i, j)]
+    return match(0, 0)
+
+def stale_writes(accesses: List[HandlerAccess]) -> List[StaleWrite]:
+    cached_gets = [access for access in accesses if access.method == "GET" and access.cached]
+    findings = []
+    for mutation in accesses:
+        if mutation.method == "GET":
+            continue
+        for model in mutation.writes:
+            for get in cached_gets:
+                if model not in get.reads:
+                    continue
+                for key in get.cache_keys:
+                    if key is None:
+                        kind = "UNKNOWN" if "*" not in mutation.invalidates else ""
+                    elif any(covers(pattern, key) for pattern in mutation.invalidates):
+                        kind = ""
+                    elif any(overlaps(pattern, key) for pattern in mutation.invalidates):
+                        kind = "PARTIAL"
+                    else:
+                        kind = "STALE"
+                    if kind:
+                        findings.append(StaleWrite(kind, mutation.file, mutation.method, mutation.line, model,
+                                                   get.file, key))
+    return findings
+
+def invalidation_map(accesses: List[HandlerAccess]) -> Dict[str, Dict]:
+    """model -> {"cache_keys": {key: [GET routes]}, "written_by": [...]} for models a cached GET reads"""
+    models: Dict[str, Dict] = {}
+    for access in accesses:
+        if access.method == "GET" and access.cached:
+            for model in access.reads:
+                entry = models.setdefault(model, {"cache_keys": {}, "written_by": []})
+                for key in access.cache_keys:
+                    routes = entry["cache_keys"].setdefault(key if key is not None else "?", [])
+                    if access.file not in routes:
+                        routes.append(access.file)
+    for access in accesses:
+        if access.method == "GET":
+            continue
+        for model in access.writes:
+            if model in models:
+                models[model]["written_by"].append({"route": access.file, "method": access.method,
+                                                    "invalidates": access.invalidates})
+    return dict(sorted(models.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Map the models cached GET handlers read to the mutations "
+                                                 "that write them and the cache keys they invalidate")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    parser.add_argument("--schema", type=Path, default=SCHEMA_FILE, help="Prisma schema for relation fields")
+    parser.add_argument("--assume-cached", action="append", default=[], metavar="ROUTE",
+                        help="Treat this route's GET as wrapped in the query cache (route folder or file "
+                             "relative to the API dir); repeatable")
+    parser.add_argument("--assume-all-cached", action="store_true",
+                        help="Treat every GET handler that reads the database as cached")
+    parser.add_argument("--json", type=Path, metavar="FILE",
+                        help="Write the per-route access records, the invalidation map and the findings as JSON")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+
+    schema = load_schema(args.schema)
+    library = load_cache_library()
+    route_files = find_route_files(args.api_dir)
+    known = {Path(route_file).relative_to(args.api_dir).as_posix() for route_file in route_files}
+    assume = {route.strip('/') if route.endswith('.ts') else f"{route.strip('/')}/route.ts"
+              for route in args.assume_cached}
+    for route in sorted(assume - known):
+        parser.error(f"--assume-cached {route}: no such route file under {args.api_dir}")
+    worker = partial(access_worker, args.api_dir, schema, library, assume, args.assume_all_cached)
+
+    accesses: List[HandlerAccess] = []
+    for file_accesses in map_route_files(worker, route_files, args.jobs):
+        accesses.extend(file_accesses)
+    model_map = invalidation_map(accesses)
+    findings = stale_writes(accesses)
+
+    print("=" * 80)
+    print(" CACHE INVALIDATION MAP")
+    print("=" * 80)
+    for model, entry in model_map.items():
+        print(f"{model}")
+        for key, routes in entry["cache_keys"].items():
+            print(f"  {key}  <- GET {', '.join(routes)}")
+        for writer in entry["written_by"]:
+            invalidates = ', '.join(writer["invalidates"]) or "nothing"
+            print(f"  written by {writer['method']} {writer['route']} (invalidates {invalidates})")
+    if findings:
+        print()
+    for finding in findings:
+        key = finding.cache_key if finding.cache_key is not None else "an unresolved key"
+        print(f"[{finding.kind}] {finding.file}:{finding.line} {finding.method} writes {finding.model}, "
+              f"cached as {key} by GET {finding.cached_route}")
+
+    print("\n" + "=" * 80)
+    print(" SUMMARY")
+    print("=" * 80)
+    gets = [access for access in accesses if access.method == "GET"]
+    mutations = [access for access in accesses if access.method != "GET"]
+    print(f"Route files scanned: {len(route_files)}")
+    print(f"GET handlers: {len(gets)} ({sum(access.cached for access in gets)} cached); "
+          f"mutation handlers: {len(mutations)} ({sum(1 for access in mutations if access.invalidates)} "
+          f"invalidate a cache)")
+    print(f"Models read by cached GETs: {len(model_map)}")
+    for kind in ("STALE", "PARTIAL", "UNKNOWN"):
+        of_kind = [finding for finding in findings if finding.kind == kind]
+        print(f"  {kind:<8} {len(of_kind):4d} findings in "
+              f"{len({(finding.file, finding.method) for finding in of_kind})} mutation handlers")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                       "routes": [access._asdict() for access in accesses],
+                       "invalidation_map": model_map,
+                       "findings": [finding.to_dict() for finding in findings]}, f, indent=2)
+        print(f"Report written to {args.json}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Cache Library
+Reads the app's cache helpers as data: the key builders in CacheKeys and
+the patterns each InvalidateCache helper deletes, from
+lib/performance/query-cache.ts, and the CacheService instances exported
+by lib/redis/cache.ts with their prefixes. Keys and patterns are redis
+globs (`orders:list:${page}` -> orders:list:*).
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+from bracket_index import BracketIndex
+from prisma_calls import object_properties
+from route_import_graph import SOURCE_DIR
+
+QUERY_CACHE_FILE = SOURCE_DIR / "lib" / "performance" / "query-cache.ts"
+REDIS_CACHE_FILE = SOURCE_DIR / "lib" / "redis" / "cache.ts"
+
+SERVICE_INSTANCE = re.compile(
+    r'\b(?:export\s+)?const\s+([A-Za-z_$][\w$]*)\s*=\s*new\s+CacheService\s*\(\s*(?:["\']([^"\']*)["\'])?\s*\)')
+CACHE_SERVICE_DEFAULT_PREFIX = "ashley-ai"
+
+class CacheLibrary(NamedTuple):
+    # CacheKeys.<name> -> glob of the key it builds
+    cache_keys: Dict[str, str]
+    # InvalidateCache.<name> -> globs it deletes
+    invalidators: Dict[str, List[str]]
+    # CacheService instances exported by lib/redis/cache -> their prefix
+    services: Dict[str, str]
+
+    def invalidators_of(self, key: str) -> List[str]:
+        """InvalidateCache helpers that delete every key the glob stands for, not counting a full flush"""
+        return [name for name, patterns in self.invalidators.items()
+                if any(pattern != '*' and covers(pattern, key) for pattern in patterns)]
+
+def template_glob(literal: str) -> str:
+    """A string or template literal's text with every ${...} as *"""
+    body, out, i = literal[1:-1], [], 0
+    while i < len(body):
+        if body.startswith('${', i):
+            depth, i = 1, i + 2
+            while i < len(body) and depth:
+                depth += {'{': 1, '}': -1}.get(body[i], 0)
+                i += 1
+            out.append('*')
+        else:
+            out.append(body[i])
+            i += 1
+    return re.sub(r'\*+', '*', ''.join(out))
+
+def load_cache_library(query_cache: Path = QUERY_CACHE_FILE, redis_cache: Path = REDIS_CACHE_FILE) -> CacheLibrary:
+    cache_keys: Dict[str, str] = {}
+    invalidators: Dict[str, List[str]] = {}
+    content = query_cache.read_text(encoding='utf-8') if query_cache.exists() else ""
+    index = BracketIndex(content)
+    for name, target in (("CacheKeys", cache_keys), ("InvalidateCache", invalidators)):
+        match = re.search(rf'export\s+const\s+{name}\s*=\s*\{{', content)
+        properties = object_properties(content, index, match.end() - 1) if match else None
+        for key, (start, end) in (properties or {}).items():
+            value = content[start:end]
+            if name == "CacheKeys":
+                literal = re.search(r'`[^`]*`|"[^"]*"|\'[^\']*\'', value)
+                if literal:
+                    target[key] = template_glob(literal.group(0))
+            else:
+                target[key] = [template_glob(literal) for literal in
+                               re.findall(r'deletePattern\(\s*(`[^`]*`|"[^"]*"|\'[^\']*\')', value)]
+                target[key] += [cache_keys[helper] for helper in re.findall(r'\bdel\(\s*CacheKeys\.(\w+)', value)
+                                if helper in cache_keys]
+                if 'flushall' in value:
+                    target[key].append('*')
+    content = redis_cache.read_text(encoding='utf-8') if redis_cache.exists() else ""
+    services = {match.group(1): match.group(2) or CACHE_SERVICE_DEFAULT_PREFIX
+                for match in SERVICE_INSTANCE.finditer(content)}
+    return CacheLibrary(cache_keys, invalidators, services)
+
+def glob_regex(glob: str) -> re.Pattern:
+    return re.compile('.*'.join(map(re.escape, glob.split('*'))), re.DOTALL)
+
+def covers(pattern: str, key: str) -> bool:
+    """Whether deleting pattern removes every key the key glob stands for"""
+    # A wildcard in the key stands for values the pattern must accept whatever they are
+    return bool(glob_regex(pattern).fullmatch(key.replace('*', '\x00')))
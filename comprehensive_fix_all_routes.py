@@ -5,10 +5,23 @@ Fixes all syntax errors introduced by the automated security scripts.
 Based on patterns from health/route.ts and dashboard/stats/route.ts
 """
 
+import argparse
 import os
-import re
-from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from edit_buffer import EditBuffer
+from fixer_registry import apply_rules
+from route_tree import API_DIR, find_route_files, map_route_files
+
+def fix_route_syntax_content(content: str,
+                             buffers: Optional[List[EditBuffer]] = None) -> Tuple[str, List[str]]:
+    """
+    Fix all syntax errors in route source held in memory.
+    The rewrites are the "route_syntax" rules in fixer_registry; buffers,
+    when given, receives their edit spans.
+    Returns (new_content, list_of_fixes_applied)
+    """
+    return apply_rules(content, "route_syntax", buffers=buffers)
 
 def fix_route_syntax(filepath: str) -> Tuple[bool, List[str]]:
     """
@@ -17,83 +30,9 @@ def fix_route_syntax(filepath: str) -> Tuple[bool, List[str]]:
     """
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        original_content = content
-        fixes_applied = []
-
-        # Fix 1: Remove extra semicolon in function declarations
-        # Pattern: async (request: NextRequest) => {;
-        pattern1 = r'(async\s+\([^)]+\)\s*=>\s*\{);'
-        if re.search(pattern1, content):
-            content = re.sub(pattern1, r'\1', content)
-            fixes_applied.append("Removed extra semicolon in function declaration")
-
-        # Fix 2: Extra }); in Promise.all arrays between items
-        # Pattern: }),\n      });\n\n      // Comment
-        # Should be: }),\n\n      // Comment
-        pattern2 = r'\}\),\s*\n\s*\}\);\s*\n\s*\n\s*(//.+)'
-        if re.search(pattern2, content):
-            content = re.sub(pattern2, r'}),\n\n      \1', content)
-            fixes_applied.append("Fixed extra }); in Promise.all array")
-
-        # Fix 3: Extra }); after prisma calls before blank lines
-        # Pattern: }),\n      });\n\n      prisma
-        pattern3 = r'(\}\),)\s*\n\s*\}\);\s*\n\s*\n\s*(prisma|await|const|if|return)'
-        if re.search(pattern3, content):
-            content = re.sub(pattern3, r'\1\n\n      \2', content)
-            fixes_applied.append("Removed standalone }); before statements")
-
-        # Fix 4: Extra }); after await prisma calls
-        # Pattern: await prisma.*.count({\n  ...\n});\n});
-        pattern4 = r'(await\s+prisma\.\w+\.\w+\([^)]+\{[^}]+\},\s*\n\s*\}\),)\s*\n\s*\}\);'
-        if re.search(pattern4, content, re.DOTALL):
-            content = re.sub(pattern4, r'\1', content, flags=re.DOTALL)
-            fixes_applied.append("Removed extra }); after prisma calls")
-
-        # Fix 5: Missing closing brace for try-catch
-        # Pattern: { status: 500 }\n    );\n});\n
-        # Should be: { status: 500 }\n    );\n  }\n});\n
-        pattern5 = r'(\{\s*status:\s*\d+\s*\}\s*\n\s*\);)\s*\n(\}\);)\s*$'
-        if re.search(pattern5, content, re.MULTILINE):
-            content = re.sub(pattern5, r'\1\n  }\n\2', content, flags=re.MULTILINE)
-            fixes_applied.append("Added missing closing brace for try-catch")
-
-        # Fix 6: Extra }); after single prisma queries (not in Promise.all)
-        # Pattern: const result = await prisma...});\n      });
-        pattern6 = r'(const\s+\w+\s*=\s*await\s+prisma\.\w+\.\w+\([^;]+\}\),)\s*\n\s*\}\);'
-        if re.search(pattern6, content, re.DOTALL):
-            content = re.sub(pattern6, r'\1', content, flags=re.DOTALL)
-            fixes_applied.append("Removed extra }); after const prisma query")
-
-        # Fix 7: Extra }); in object parameters with gte/lte
-        # Pattern: where: {\n  field: { gte: value },\n},\n});\n});
-        pattern7 = r'(where:\s*\{[^}]+\},\s*\n\s*\}\),)\s*\n\s*\}\);'
-        if re.search(pattern7, content, re.DOTALL):
-            content = re.sub(pattern7, r'\1', content, flags=re.DOTALL)
-            fixes_applied.append("Removed extra }); after where clause")
-
-        # Fix 8: Multiple }); on same line or consecutive lines
-        # Pattern: });\n});
-        pattern8 = r'\}\);\s*\n\s*\}\);(?!\n\s*\n)'
-        if re.search(pattern8, content):
-            content = re.sub(pattern8, '});', content)
-            fixes_applied.append("Removed duplicate }); closures")
-
-        # Fix 9: Fix if blocks with return statements missing closing brace
-        # Pattern: if (condition) {\n  return ...\n  );\n}\n  });\n
-        # Should be: if (condition) {\n  return ...\n  );\n}\n
-        pattern9 = r'(\)\s*\n\s*\}\s*\n)\s*\}\);(?=\s*\n\s*(//.+|if|const|await|return))'
-        if re.search(pattern9, content):
-            content = re.sub(pattern9, r'\1', content)
-            fixes_applied.append("Removed extra }); after if blocks")
-
-        # Fix 10: Extra }); between Promise.all items and closing ]
-        # Pattern: ...\n  }),\n  });\n]);
-        pattern10 = r'(\},\n\s*\}\),)\s*\n\s*\}\);\s*\n(\s*\]\);)'
-        if re.search(pattern10, content):
-            content = re.sub(pattern10, r'\1\n\2', content)
-            fixes_applied.append("Removed extra }); before Promise.all closing")
+            original_content = f.read()
+
+        content, fixes_applied = fix_route_syntax_content(original_content)
 
         # Save if modified
         if content != original_content:
@@ -108,9 +47,14 @@ def fix_route_syntax(filepath: str) -> Tuple[bool, List[str]]:
         return False, []
 
 def main():
+    parser = argparse.ArgumentParser(description="Fix route syntax errors across all API routes")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+
     # Find all API route files
-    api_dir = Path(r"C:\Users\Khell\Desktop\Ashley AI\services\ash-admin\src\app\api")
-    route_files = list(api_dir.rglob("route.ts"))
+    api_dir = API_DIR
+    route_files = find_route_files(api_dir)
 
     print(f"Found {len(route_files)} API route files")
     print("=" * 80)
@@ -121,10 +65,10 @@ def main():
 
     fix_summary = {}
 
-    for filepath in route_files:
-        relative_path = filepath.relative_to(api_dir.parent.parent.parent)
+    results = map_route_files(fix_route_syntax, route_files, args.jobs)
 
-        was_modified, fixes = fix_route_syntax(str(filepath))
+    for filepath, (was_modified, fixes) in zip(route_files, results):
+        relative_path = filepath.relative_to(api_dir.parent.parent.parent)
 
         if was_modified:
             fixed_count += 1
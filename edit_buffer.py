@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Edit Buffer
+Fixers describe their changes as (start, end, replacement) spans against the
+text they were given instead of rebuilding the string after every edit.
+Overlapping spans are resolved by priority and the result is assembled in a
+single join. An EditLog composes the buffers of successive fixers back onto
+the original file, so the same spans drive dry-run diffs and per-fixer
+attribution.
+"""
+
+import bisect
+from collections import deque
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+class Edit(NamedTuple):
+    """Replace text[start:end] with replacement; source names the rule or pass"""
+    start: int
+    end: int
+    replacement: str
+    source: str
+    priority: int = 0
+
+def overlaps(a: Edit, b: Edit) -> bool:
+    """
+    Spans that share text conflict, as do two insertions at the same offset
+    (their order would be ambiguous) and an insertion strictly inside a span.
+    """
+    if a.start == a.end or b.start == b.end:
+        insertion, other = (a, b) if a.start == a.end else (b, a)
+        if other.start == other.end:
+            return insertion.start == other.start
+        return other.start < insertion.start < other.end
+    return a.start < b.end and b.start < a.end
+
+class EditBuffer:
+    """Spans against one fixed text, applied together"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.edits: List[Edit] = []
+        self.rejected: List[Edit] = []
+        self._resolved: Optional[List[Edit]] = None
+
+    def add(self, start: int, end: int, replacement: str, source: str, priority: int = 0):
+        if not 0 <= start <= end <= len(self.text):
+            raise ValueError(f"Edit span {start}:{end} outside text of length {len(self.text)}")
+        self.edits.append(Edit(start, end, replacement, source, priority))
+        self._resolved = None
+
+    def __len__(self) -> int:
+        return len(self.edits)
+
+    def resolve(self) -> List[Edit]:
+        """
+        Accepted edits in text order. Higher priority wins an overlap; on a
+        tie the edit added first wins. Losers are kept in self.rejected.
+        """
+        if self._resolved is not None:
+            return self._resolved
+
+        order = sorted(range(len(self.edits)), key=lambda k: (-self.edits[k].priority, k))
+        accepted: List[Edit] = []
+        keys: List[Tuple[int, int]] = []
+        self.rejected = []
+        for k in order:
+            edit = self.edits[k]
+            # Accepted edits are sorted and disjoint, so only the two
+            # neighbours of the insertion point can overlap a new one
+            pos = bisect.bisect_left(keys, (edit.start, edit.end))
+            if any(overlaps(edit, other) for other in accepted[max(0, pos - 1):pos + 1]):
+                self.rejected.append(edit)
+                continue
+            accepted.insert(pos, edit)
+            keys.insert(pos, (edit.start, edit.end))
+
+        self._resolved = accepted
+        return accepted
+
+    def apply(self) -> str:
+        """The text with every accepted edit applied, built in one join"""
+        pieces = []
+        cursor = 0
+        for edit in self.resolve():
+            pieces.append(self.text[cursor:edit.start])
+            pieces.append(edit.replacement)
+            cursor = edit.end
+        if not pieces:
+            return self.text
+        pieces.append(self.text[cursor:])
+        return ''.join(pieces)
+
+    def changes_text(self) -> bool:
+        """True if some accepted edit actually alters the text"""
+        return any(self.text[edit.start:edit.end] != edit.replacement for edit in self.resolve())
+
+class EditLog:
+    """
+    Piece table over a file's original text. Each recorded buffer is applied
+    to the pieces rather than to a string, so after a chain of fixers the
+    net edits against the original, and who made them, can be read back.
+    """
+
+    def __init__(self, original: str):
+        self.original = original
+        # (orig_start, orig_end, inserted_text, sources); inserted_text is None for original text
+        self.pieces: List[Tuple[int, int, Optional[str], FrozenSet[str]]] = [(0, len(original), None, frozenset())]
+        self.rejected: List[Tuple[str, Edit]] = []
+
+    @staticmethod
+    def _length(piece) -> int:
+        start, end, text, _ = piece
+        return end - start if text is None else len(text)
+
+    @staticmethod
+    def _split(piece, cut: int):
+        """The piece's current text split at cut, as two pieces"""
+        start, end, text, sources = piece
+        if text is None:
+            return (start, start + cut, None, sources), (start + cut, end, None, sources)
+        return (start, end, text[:cut], sources), (start, end, text[cut:], sources)
+
+    def record(self, buffer: EditBuffer, label: str = ""):
+        """Fold one buffer (spans against the current text) into the log"""
+        if sum(self._length(piece) for piece in self.pieces) != len(buffer.text):
+            raise ValueError("EditBuffer was not made against the log's current text")
+        self.rejected.extend((label, edit) for edit in buffer.rejected)
+
+        queue = deque(self.pieces)
+        new_pieces = []
+        pos = 0
+
+        def advance(to: int, keep: bool) -> FrozenSet[str]:
+            """Move past the current text up to offset to, keeping or dropping it"""
+            nonlocal pos
+            dropped: FrozenSet[str] = frozenset()
+            while pos < to:
+                piece = queue.popleft()
+                length = self._length(piece)
+                if pos + length > to:
+                    piece, rest = self._split(piece, to - pos)
+                    queue.appendleft(rest)
+                    length = to - pos
+                if keep:
+                    new_pieces.append(piece)
+                elif piece[2] is not None:
+                    dropped |= piece[3]
+                pos += length
+            return dropped
+
+        for edit in buffer.resolve():
+            advance(edit.start, keep=True)
+            dropped = advance(edit.end, keep=False) if edit.end > edit.start else frozenset()
+            source = f"{label}/{edit.source}" if label else edit.source
+            # Inserted text carries every source that shaped it; an empty
+            # replacement still marks who deleted the text around it
+            new_pieces.append((0, 0, edit.replacement, dropped | {source}))
+        new_pieces.extend(queue)
+        self.pieces = new_pieces
+
+    def net_edits(self) -> List[Edit]:
+        """Edits against the original text, sources joined per span"""
+        result = []
+        cursor = 0
+        texts: List[str] = []
+        sources: set = set()
+
+        def flush(upto: int):
+            replacement = ''.join(texts)
+            # Text removed by one fixer and put back by another is no net edit
+            if self.original[cursor:upto] != replacement:
+                result.append(Edit(cursor, upto, replacement, ", ".join(sorted(sources))))
+
+        for start, end, text, piece_sources in self.pieces:
+            if text is None:
+                flush(start)
+                texts, sources = [], set()
+                cursor = end
+            else:
+                texts.append(text)
+                sources |= piece_sources
+        flush(len(self.original))
+        return result
+
+    def text(self) -> str:
+        return ''.join(self.original[s:e] if t is None else t for s, e, t, _ in self.pieces)
+
+def attribution(edits: List[Edit]) -> Dict[str, Dict[str, int]]:
+    """Per-source edit counts and characters removed/inserted"""
+    report: Dict[str, Dict[str, int]] = {}
+    for edit in edits:
+        for source in edit.source.split(", "):
+            counts = report.setdefault(source, {"edits": 0, "removed": 0, "inserted": 0})
+            counts["edits"] += 1
+            counts["removed"] += edit.end - edit.start
+            counts["inserted"] += len(edit.replacement)
+    return report
+
+def unified_diff(original: str, edits: List[Edit], path: str = "file", context: int = 3) -> List[str]:
+    """
+    Unified diff of original against the given non-overlapping edits, built
+    from the spans alone, that applies with patch -p1. Lines an edit covers
+    but leaves as they were count as context, so every hunk has exactly
+    context lines before and after its changes. The sources that touched a
+    hunk go in its header's section heading, the slot diff -p fills with the
+    enclosing function name and that patch ignores.
+    """
+    if not edits:
+        return []
+    line_offsets = [0] + [i + 1 for i, ch in enumerate(original) if ch == '\n']
+    lines = original.splitlines(keepends=True)
+
+    def line_of(offset: int) -> int:
+        return bisect.bisect_right(line_offsets, offset) - 1
+
+    def line_end(line: int) -> int:
+        return line_offsets[line + 1] if line + 1 < len(line_offsets) else len(original)
+
+    # Merge edits that touch the same lines into blocks: (first, last, [edits])
+    blocks: List[Tuple[int, int, List[Edit]]] = []
+    for edit in sorted(edits):
+        first = line_of(edit.start)
+        last = line_of(edit.end - 1) if edit.end > edit.start else first
+        if edit.end > edit.start and edit.end == line_end(last) and edit.end < len(original):
+            # The edit takes the newline, so the next line joins this block
+            last += 1
+        last = max(first, last)
+        if blocks and first <= blocks[-1][1]:
+            blocks[-1] = (blocks[-1][0], max(last, blocks[-1][1]), blocks[-1][2] + [edit])
+        else:
+            blocks.append((first, last, [edit]))
+
+    # Each block as the lines it really changes: (first old line, old line count, new lines, sources)
+    changes: List[Tuple[int, int, List[str], Set[str]]] = []
+    for first, last, block_edits in blocks:
+        new_parts = []
+        pos = line_offsets[first]
+        for edit in block_edits:
+            new_parts.append(original[pos:edit.start])
+            new_parts.append(edit.replacement)
+            pos = edit.end
+        new_parts.append(original[pos:line_end(last)])
+        old_lines = original[line_offsets[first]:line_end(last)].splitlines(keepends=True)
+        new_lines = ''.join(new_parts).splitlines(keepends=True)
+        head = 0
+        while head < min(len(old_lines), len(new_lines)) and old_lines[head] == new_lines[head]:
+            head += 1
+        tail = 0
+        while tail < min(len(old_lines), len(new_lines)) - head and old_lines[-1 - tail] == new_lines[-1 - tail]:
+            tail += 1
+        if head == len(old_lines) == len(new_lines):
+            continue
+        sources = {source for edit in block_edits for source in edit.source.split(", ")}
+        changes.append((first + head, len(old_lines) - head - tail, new_lines[head:len(new_lines) - tail], sources))
+
+    # Group changes whose context windows touch into hunks
+    hunks: List[List[Tuple[int, int, List[str], Set[str]]]] = []
+    for change in changes:
+        if hunks and change[0] - (hunks[-1][-1][0] + hunks[-1][-1][1]) <= 2 * context:
+            hunks[-1].append(change)
+        else:
+            hunks.append([change])
+
+    output = [f"--- a/{path}\n", f"+++ b/{path}\n"]
+    delta = 0
+    for hunk in hunks:
+        body = []
+        old_count = new_count = 0
+        hunk_sources: Set[str] = set()
+        start_line = max(0, hunk[0][0] - context)
+        cursor_line = start_line
+        for first, count, new_lines, sources in hunk:
+            body.extend(' ' + line for line in lines[cursor_line:first])
+            body.extend('-' + line for line in lines[first:first + count])
+            body.extend('+' + line for line in new_lines)
+            old_count += first - cursor_line + count
+            new_count += first - cursor_line + len(new_lines)
+            hunk_sources |= sources
+            cursor_line = first + count
+        trailing = lines[cursor_line:min(len(lines), cursor_line + context)]
+        body.extend(' ' + line for line in trailing)
+        old_count += len(trailing)
+        new_count += len(trailing)
+
+        old_start = start_line + 1 if old_count else start_line
+        new_start = start_line + 1 + delta if new_count else start_line + delta
+        output.append(f"@@ -{old_start},{old_count} +{new_start},{new_count} @@ {', '.join(sorted(hunk_sources))}\n")
+        output.extend(line if line.endswith('\n') else line + '\n\\ No newline at end of file\n' for line in body)
+        delta += new_count - old_count
+    return output
+
+def apply_edits(buffer: EditBuffer, buffers: Optional[List[EditBuffer]] = None) -> str:
+    """Apply buffer, handing it to buffers (when given) if it holds any edits"""
+    if len(buffer) and buffers is not None:
+        buffers.append(buffer)
+    return buffer.apply()
@@ -5,11 +5,13 @@ Fixes the exact pattern causing 90% of compilation errors:
 Missing }); before } catch (error) {
 """
 
+import argparse
 import os
 import re
-from pathlib import Path
 from typing import List, Tuple
 
+from route_tree import API_DIR, find_route_files, map_route_files
+
 def fix_missing_closure_before_catch(filepath: str) -> Tuple[bool, List[str]]:
     """
     Fix missing }); before } catch (error) {
@@ -58,9 +60,14 @@ def fix_missing_closure_before_catch(filepath: str) -> Tuple[bool, List[str]]:
         return False, []
 
 def main():
+    parser = argparse.ArgumentParser(description="Fix missing closures before catch blocks across all API routes")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+
     # Find all API route files
-    api_dir = Path(r"C:\Users\Khell\Desktop\Ashley AI\services\ash-admin\src\app\api")
-    route_files = list(api_dir.rglob("route.ts"))
+    api_dir = API_DIR
+    route_files = find_route_files(api_dir)
 
     print(f"Scanning {len(route_files)} route files for missing closures before catch...")
     print("=" * 80)
@@ -69,10 +76,10 @@ def main():
     skipped_count = 0
     fix_summary = {}
 
-    for filepath in route_files:
-        relative_path = filepath.relative_to(api_dir.parent.parent.parent)
+    results = map_route_files(fix_missing_closure_before_catch, route_files, args.jobs)
 
-        was_modified, fixes = fix_missing_closure_before_catch(str(filepath))
+    for filepath, (was_modified, fixes) in zip(route_files, results):
+        relative_path = filepath.relative_to(api_dir.parent.parent.parent)
 
         if was_modified:
             fixed_count += 1
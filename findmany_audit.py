@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Unbounded findMany Audit
+Flags every Prisma findMany call whose arguments have no take, skip or
+cursor, so the endpoint returns however many rows the table holds. Findings
+are ranked by exposure: calls on a GET handler come first, then by how
+little the where clause narrows the rows (nothing, the workspace only, other
+filters, a parent record's key).
+
+With --apply (or --diff to preview) the top-ranked kind is paginated: the
+GET handler gets the shared getPagination() helper from lib/route-helpers,
+which reads ?page= and ?limit= and clamps limit to a maximum. The call gets
+skip/take from it and an orderBy that ends on id, so pages neither repeat
+nor drop rows. A count of the same where clause feeds buildPaginationMeta(),
+whose result goes into the response next to the rows as pagination, so
+callers can tell that there are more pages.
+
+Calls whose rows are presumably all needed are left alone:
+- calls in loops;
+- calls scoped to a parent record;
+- distinct lookups;
+- calls whose rows are used for anything but a top-level response property
+  (mapped, counted, scored, returned as the bare body);
+- calls in handlers that already read page/limit themselves;
+- calls on stats-style and reference-list routes, such as categories or
+  leave types, which load whole into a dropdown.
+"""
+
+import argparse
+import json
+import re
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from bracket_index import BracketIndex
+from edit_buffer import EditBuffer, unified_diff
+from n_plus_one_audit import find_loops, innermost_loop
+from parallel_await_audit import PRINT_WIDTH, STATEMENT_TAIL, reindent
+from prisma_calls import Handler, PrismaCall, call_argument_object, find_handlers, find_prisma_calls, \
+    handler_for, object_properties, split_top_level
+from route_fix_cache import cache_key
+from route_tree import API_DIR, find_route_files, map_route_files
+
+BOUNDING_ARGUMENTS = {"take", "skip", "cursor"}
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+# How much of the table a where clause can return, most exposed first
+SCOPES = ("none", "workspace", "filtered", "parent")
+TENANT_KEYS = {"workspace_id", "workspaceId"}
+
+# Route folders whose handlers aggregate every row rather than list them
+AGGREGATE_SEGMENT = re.compile(r'(^|/)[^/]*(stats|analytics|reports?|export|dashboard|summary|metrics)[^/]*(/|$)')
+# Reference lists a form loads whole into a dropdown or picker
+LOOKUP_SEGMENT = re.compile(
+    r'(^|/)[^/]*(categories|brands|types|locations|suppliers|departments|positions|units|tags|options|lookups?)(/|$)')
+PAGE_PARAMS = re.compile(r'searchParams\.get\(\s*["\'](?:page|limit)["\']|\bgetPagination\s*\(')
+PROPERTY_COLON = re.compile(r'\s*:(?!:)')
+IMPORT_LINE = re.compile(r'^import\b[^;]*;[ \t]*\n', re.MULTILINE)
+# First parameter of the handler function when it is a plain name: (request: NextRequest, ...)
+FIRST_PARAMETER = re.compile(r'\s*([A-Za-z_$][\w$]*)\s*(?::\s*[\w$.<>\[\]]+\s*)?(?:,|$)')
+# Calls that build the handler's response body
+RESPONSE_CALL = re.compile(r'\b(?:NextResponse\.json|createSuccessResponse|apiSuccess)\s*\(')
+PAGING_NAME = "paging"
+TOTAL_NAME = "total"
+PAGINATION_KEY = "pagination"
+# Every model has an id primary key; it breaks ties so pages neither skip nor repeat rows
+ORDER_KEY = "id"
+HELPERS_MODULE = "@/lib/route-helpers"
+
+class UnboundedQuery(NamedTuple):
+    file: str
+    line: int
+    call: str
+    model: str
+    method: str
+    scope: str
+    include: bool
+    in_loop: bool
+    # Why the pagination codemod does not apply, or "" when it does
+    codemod: str
+
+    @property
+    def rank(self) -> Tuple:
+        return (self.method != "GET", self.in_loop, SCOPES.index(self.scope), not self.include, self.file, self.line)
+
+    def to_dict(self) -> Dict:
+        return {**self._asdict(), "codemod": self.codemod or "paginate"}
+
+def where_scope(content: str, index: BracketIndex, arguments: Optional[Dict[str, Tuple[int, int]]]) -> str:
+    """How far the call's where clause narrows the rows (one of SCOPES)"""
+    if not arguments or "where" not in arguments:
+        return "none"
+    start, end = arguments["where"]
+    where = object_properties(content, index, start)
+    if where is None:
+        # A where object built elsewhere (where: whereClause); usually workspace plus filters
+        return "filtered"
+    keys = set(where) - {"..."}
+    if any((key == "id" or key.endswith("_id") or key.endswith("Id")) and key not in TENANT_KEYS
+           for key in keys) or re.search(r'\bin\s*:', content[start:end]):
+        return "parent"
+    if not keys - TENANT_KEYS:
+        return "workspace" if keys else "none"
+    return "filtered"
+
+def handler_function(content: str, index: BracketIndex, handler: Handler) -> Optional[Tuple[int, int]]:
+    """
+    Offsets of the ( opening the handler function's parameter list and the {
+    opening its body, for export async function GET(...) { and for
+    export const GET = requireAuth(async (...) => {.
+    """
+    function = re.compile(r'\bfunction\s*[\w$]*\s*\(').search(content, handler.start, handler.end)
+    arrow = content.find('=>', handler.start, handler.end)
+    while arrow >= 0 and not index.in_code(arrow):
+        arrow = content.find('=>', arrow + 2, handler.end)
+    if function and (arrow < 0 or function.start() < arrow):
+        parameters = function.end() - 1
+        close = index.matching(parameters)
+        body = content.find('{', close, handler.end) if close is not None else -1
+    elif arrow >= 0:
+        close = arrow - 1
+        while close > handler.start and content[close].isspace():
+            close -= 1
+        parameters = index.matching(close) if content[close] == ')' else None
+        body = arrow + 2
+        while body < handler.end and content[body].isspace():
+            body += 1
+    else:
+        return None
+    if parameters is None or body < 0 or content[body] != '{' or index.matching(body) is None:
+        return None
+    return parameters, body
+
+def request_parameter(content: str, index: BracketIndex, handler: Handler) -> Optional[str]:
+    """Name the handler's request argument goes by, if it takes one"""
+    function = handler_function(content, index, handler)
+    if function is None:
+        return None
+    match = FIRST_PARAMETER.match(content, function[0] + 1, index.matching(function[0]))
+    return match.group(1) if match else None
+
+def result_binding(content: str, call: PrismaCall) -> Optional[str]:
+    """Name in const name = await <call>, if the call is bound that way"""
+    match = re.search(r'\b(?:const|let)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*await\s*$',
+                      content[max(0, call.start - 200):call.start])
+    return match.group(1) if match else None
+
+def response_objects(content: str, index: BracketIndex, handler: Handler, name: str,
+                     after: int) -> Optional[List[int]]:
+    """
+    Offsets of the { opening each response body that carries the rows bound
+    to name as a top-level property value (data: rows, or { rows }). None if
+    the rows are used in any other way past offset after (mapped, filtered,
+    counted, returned as the bare body), since those uses need every row.
+    """
+    carriers: Dict[int, int] = {}
+    for match in RESPONSE_CALL.finditer(content, handler.start, handler.end):
+        close = index.matching(match.end() - 1)
+        if close is None or not index.in_code(match.start()):
+            continue
+        first = match.end()
+        while first < close and content[first].isspace():
+            first += 1
+        for start, end in (object_properties(content, index, first) or {}).values():
+            if content[start:end] == name:
+                carriers[start] = first
+    objects = set()
+    for use in re.compile(rf'(?<![\w$.]){re.escape(name)}\b').finditer(content, after, handler.end):
+        if not index.in_code(use.start()):
+            continue
+        before = use.start() - 1
+        while before > 0 and content[before].isspace():
+            before -= 1
+        if content[before] in '{,' and PROPERTY_COLON.match(content, use.end()):
+            # A property key that happens to share the name
+            continue
+        if use.start() not in carriers:
+            return None
+        objects.add(carriers[use.start()])
+    return sorted(objects) or None
+
+def codemod_blocker(content: str, index: BracketIndex, relative: str, call: PrismaCall,
+                    handler: Optional[Handler], scope: str, in_loop: bool, arguments) -> str:
+    if handler is None or handler.method != "GET":
+        return "not on a GET handler"
+    if in_loop:
+        return "inside a loop"
+    if scope == "parent":
+        return "scoped to a parent record"
+    if AGGREGATE_SEGMENT.search(relative):
+        return "stats-style route reads every row"
+    if LOOKUP_SEGMENT.search(relative):
+        return "reference list is loaded whole"
+    if arguments is None or "..." in (arguments or {}):
+        return "arguments are not a plain object literal"
+    if "distinct" in arguments:
+        return "distinct lookup reads every value"
+    if "orderBy" in arguments and content[arguments["orderBy"][0]] not in '{[':
+        return "orderBy is built elsewhere"
+    if PAGE_PARAMS.search(content, handler.start, handler.end):
+        return "handler reads page/limit itself"
+    binding = result_binding(content, call)
+    if binding is None:
+        return "result is not bound to a name"
+    if not STATEMENT_TAIL.match(content, call.close + 1):
+        return "statement does not end with the call"
+    objects = response_objects(content, index, handler, binding, call.close)
+    if objects is None:
+        return "rows are used beyond the response value"
+    if any(PAGINATION_KEY in object_properties(content, index, brace) for brace in objects):
+        return f"response already has {PAGINATION_KEY}"
+    if handler_function(content, index, handler) is None:
+        return "handler body not found"
+    if request_parameter(content, index, handler) is None:
+        return "handler takes no request argument"
+    for name in (PAGING_NAME, TOTAL_NAME):
+        if re.search(rf'\b{name}\b', content[handler.start:handler.end]):
+            return f"{name} is already defined"
+    return ""
+
+def quote_style(content: str) -> str:
+    """The string quote the file's imports use"""
+    imports = IMPORT_LINE.findall(content)
+    return "'" if imports and "'" in imports[-1] and '"' not in imports[-1] else '"'
+
+def add_import(content: str, buffer: EditBuffer, names: Sequence[str], module: str, source: str):
+    """Import names from module, joining an existing import of that module if there is one"""
+    existing = re.search(r'import\s*\{([^}]*)\}\s*from\s*["\']' + re.escape(module) + r'["\'];?', content)
+    if existing:
+        missing = [name for name in names if not re.search(rf'\b{re.escape(name)}\b', existing.group(1))]
+        if missing:
+            current = existing.group(1).rstrip().rstrip(',')
+            if '\n' in current:
+                indent = re.search(r'\n([ \t]*)\S', current).group(1)
+                text = current + ''.join(f",\n{indent}{name}" for name in missing) + ",\n"
+            else:
+                text = f"{current}, {', '.join(missing)}" + (" " if current.startswith(' ') else "")
+            buffer.add(existing.start(1), existing.end(1), text, source)
+        return
+    imports = list(IMPORT_LINE.finditer(content))
+    at = imports[-1].end() if imports else 0
+    quote = quote_style(content)
+    line = f'import {{ {", ".join(names)} }} from {quote}{module}{quote};'
+    if len(line) > PRINT_WIDTH:
+        line = "import {\n" + ''.join(f"  {name},\n" for name in names) + f"}} from {quote}{module}{quote};"
+    buffer.add(at, at, line + "\n", source)
+
+def line_indent(content: str, offset: int) -> str:
+    line_start = content.rfind('\n', 0, offset) + 1
+    return re.match(r'[ \t]*', content[line_start:]).group(0)
+
+def fits(content: str, start: int, end: int, text: str) -> bool:
+    """Whether text in place of content[start:end] keeps its line within the print width"""
+    line_start = content.rfind('\n', 0, start) + 1
+    line_end = content.find('\n', end)
+    line_end = len(content) if line_end < 0 else line_end
+    return '\n' not in text and (start - line_start) + len(text) + (line_end - end) <= PRINT_WIDTH
+
+def add_properties(content: str, index: BracketIndex, brace: int, first: Sequence[str], last: Sequence[str],
+                   replaced: Dict[Tuple[int, int], str], buffer: EditBuffer, source: str):
+    """
+    Put properties first and last in the object literal opening at brace,
+    with the value spans in replaced rewritten, laid out the way prettier
+    would: a one-line object that grows too long gets one property per line.
+    """
+    close = index.matching(brace)
+    if '\n' in content[brace:close]:
+        for (start, end), text in replaced.items():
+            buffer.add(start, end, text, source)
+        inner = line_indent(content, content.find('\n', brace) + 1)
+        if first:
+            buffer.add(brace + 1, brace + 1, ''.join(f"\n{inner}{item}," for item in first), source)
+        if last:
+            tail = close - 1
+            while content[tail].isspace():
+                tail -= 1
+            buffer.add(tail + 1, tail + 1,
+                       ("" if content[tail] in ',{' else ",") + ''.join(f"\n{inner}{item}," for item in last), source)
+        return
+    items = []
+    for start, end in split_top_level(content, index, brace + 1, close):
+        text = content[start:end]
+        for (value_start, value_end), value in replaced.items():
+            if start <= value_start and value_end <= end:
+                text = content[start:value_start] + value + content[value_end:end]
+        if text.strip():
+            items.append(text.strip())
+    items = [*first, *items, *last]
+    text = "{ " + ", ".join(items) + " }"
+    if not fits(content, brace, close + 1, text):
+        indent = line_indent(content, brace)
+        text = "{\n" + ''.join(f"{indent}  {item},\n" for item in items) + indent + "}"
+    buffer.add(brace, close + 1, text, source)
+
+def stable_order(content: str, index: BracketIndex, span: Tuple[int, int], quote: str) -> Optional[str]:
+    """The orderBy value with the id tiebreaker appended, None if it already ends on id"""
+    start, end = span
+    if content[start] == '{':
+        if ORDER_KEY in (object_properties(content, index, start) or {}):
+            return None
+        elements = [content[start:end]]
+        extra = "  "
+    else:
+        elements = [content[a:b].strip() for a, b in split_top_level(content, index, start + 1, end - 1)]
+        elements = [element for element in elements if element]
+        if elements and re.match(rf'\{{\s*{ORDER_KEY}\s*:', elements[-1]):
+            return None
+        extra = ""
+    elements.append(f"{{ {ORDER_KEY}: {quote}asc{quote} }}")
+    text = "[" + ", ".join(elements) + "]"
+    if fits(content, start, end, text):
+        return text
+    indent = line_indent(content, start)
+    if extra:
+        elements[0] = reindent(content, index, start, end, extra)
+    return "[\n" + ''.join(f"{indent}  {element},\n" for element in elements) + indent + "]"
+
+def paginate_call(content: str, index: BracketIndex, call: PrismaCall, arguments: Dict[str, Tuple[int, int]],
+                  buffer: EditBuffer, quote: str):
+    """Give the call skip/take from the handler's paging values and an order that ends on id"""
+    front = [f"skip: {PAGING_NAME}.offset", f"take: {PAGING_NAME}.limit"]
+    replaced = {}
+    if "orderBy" not in arguments:
+        front.append(f"orderBy: {{ {ORDER_KEY}: {quote}asc{quote} }}")
+    else:
+        order = stable_order(content, index, arguments["orderBy"], quote)
+        if order is not None:
+            replaced[arguments["orderBy"]] = order
+    first = call.open + 1
+    while first < call.close and content[first].isspace():
+        first += 1
+    if first == call.close:
+        text = "{ " + ", ".join(front) + " }"
+        if not fits(content, call.open + 1, call.close, text):
+            indent = line_indent(content, call.open)
+            text = "{\n" + ''.join(f"{indent}  {item},\n" for item in front) + indent + "}"
+        buffer.add(call.open + 1, call.close, text, "findmany:paginate")
+        return
+    add_properties(content, index, first, front, [], replaced, buffer, "findmany:paginate")
+
+def count_statement(content: str, call: PrismaCall, arguments: Dict[str, Tuple[int, int]]) -> Tuple[int, str]:
+    """Offset just past the findMany statement, and the count of the same where clause to insert there"""
+    indent = line_indent(content, call.start)
+    where = arguments.get("where")
+    if where is None:
+        count = ""
+    elif content[where[0]:where[1]] == "where":
+        count = "{ where }"
+    else:
+        count = f"{{ where: {content[where[0]:where[1]]} }}"
+    statement = f"{indent}const {TOTAL_NAME} = await {call.client}.{call.model}.count({count});"
+    if where is not None and count != "{ where }" and ('\n' in count or len(statement) > PRINT_WIDTH):
+        statement = (f"{indent}const {TOTAL_NAME} = await {call.client}.{call.model}.count({{\n"
+                     f"{indent}  where: {content[where[0]:where[1]]},\n{indent}}});")
+    tail = STATEMENT_TAIL.match(content, call.close + 1)
+    return min(tail.end() + 1, len(content)), statement + "\n"
+
+def audit_content(content: str, relative: str, default_limit: int = DEFAULT_PAGE_LIMIT,
+                  max_limit: int = MAX_PAGE_LIMIT) -> Tuple[List[UnboundedQuery], EditBuffer]:
+    """Findings for one file, and the buffer holding the pagination codemod"""
+    index = BracketIndex(content)
+    handlers = find_handlers(content, index)
+    loops = find_loops(content, index)
+    buffer = EditBuffer(content)
+    quote = quote_style(content)
+    paginated: Dict[int, Handler] = {}
+    findings = []
+    for call in find_prisma_calls(content, index):
+        if call.operation != "findMany":
+            continue
+        arguments = call_argument_object(content, index, call)
+        if arguments is not None and BOUNDING_ARGUMENTS & set(arguments):
+            continue
+        handler = handler_for(handlers, call.start)
+        in_loop = innermost_loop(loops, call.start) is not None
+        scope = where_scope(content, index, arguments)
+        blocker = codemod_blocker(content, index, relative, call, handler, scope, in_loop, arguments)
+        if not blocker and handler.start in paginated:
+            # One pagination block per response
+            blocker = "handler already paginates another list"
+        if not blocker:
+            paginate_call(content, index, call, arguments, buffer, quote)
+            at, statement = count_statement(content, call, arguments)
+            buffer.add(at, at, statement, "findmany:paginate")
+            meta = f"{PAGINATION_KEY}: buildPaginationMeta({TOTAL_NAME}, {PAGING_NAME}.page, {PAGING_NAME}.limit)"
+            for brace in response_objects(content, index, handler, result_binding(content, call), call.close):
+                add_properties(content, index, brace, [], [meta], {}, buffer, "findmany:paginate")
+            paginated[handler.start] = handler
+        findings.append(UnboundedQuery(relative, call.line, call.label, call.model,
+                                       handler.method if handler else "-", scope,
+                                       bool(arguments and "include" in arguments), in_loop, blocker))
+
+    for handler in paginated.values():
+        body = handler_function(content, index, handler)[1]
+        line_end = content.find('\n', body) + 1
+        indent = re.match(r'[ \t]*', content[line_end:]).group(0)
+        buffer.add(line_end, line_end,
+                   f"{indent}const {PAGING_NAME} = getPagination({request_parameter(content, index, handler)}, 1, "
+                   f"{default_limit}, {max_limit});\n", "findmany:paginate")
+    if paginated:
+        add_import(content, buffer, ["getPagination", "buildPaginationMeta"], HELPERS_MODULE, "findmany:paginate")
+    return findings, buffer
+
+def audit_worker(api_dir: Path, default_limit: int, max_limit: int, apply: bool, diff: bool, filepath: str):
+    """
+    Pool entry point for one route file.
+    Returns (findings, diff_lines) and writes the codemod when apply is set.
+    """
+    path = Path(filepath)
+    content = path.read_text(encoding='utf-8')
+    findings, buffer = audit_content(content, path.relative_to(api_dir).as_posix(), default_limit, max_limit)
+    diff_lines: List[str] = []
+    if len(buffer) and (apply or diff):
+        edits = buffer.resolve()
+        if diff:
+            diff_lines = unified_diff(content, edits, cache_key(path))
+        if apply:
+            path.write_text(buffer.apply(), encoding='utf-8')
+    return findings, diff_lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Find findMany calls with no take/skip/cursor")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    parser.add_argument("--json", type=Path, metavar="FILE", help="Write the ranked findings as JSON")
+    parser.add_argument("--diff", action="store_true", help="Show the pagination codemod as a diff")
+    parser.add_argument("--apply", action="store_true", help="Write the pagination codemod")
+    parser.add_argument("--default-limit", type=int, default=DEFAULT_PAGE_LIMIT,
+                        help=f"Page size when ?limit= is absent (default {DEFAULT_PAGE_LIMIT})")
+    parser.add_argument("--max-limit", type=int, default=MAX_PAGE_LIMIT,
+                        help=f"Largest ?limit= honoured (default {MAX_PAGE_LIMIT})")
+    parser.add_argument("--top", type=int, default=0, help="List only the N highest-ranked findings")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+    if not 1 <= args.default_limit <= args.max_limit:
+        parser.error("--default-limit must be between 1 and --max-limit")
+
+    route_files = find_route_files(args.api_dir)
+    worker = partial(audit_worker, args.api_dir, args.default_limit, args.max_limit, args.apply, args.diff)
+
+    findings: List[UnboundedQuery] = []
+    diffs: List[str] = []
+    for file_findings, diff_lines in map_route_files(worker, route_files, args.jobs):
+        findings.extend(file_findings)
+        diffs.extend(diff_lines)
+    findings.sort(key=lambda finding: finding.rank)
+
+    print("=" * 80)
+    print(" UNBOUNDED findMany AUDIT")
+    print("=" * 80)
+    for finding in findings[:args.top] if args.top else findings:
+        tags = [finding.method, f"where: {finding.scope}"] + (["include"] if finding.include else []) \
+            + (["in loop"] if finding.in_loop else [])
+        fix = " -> paginate" if not finding.codemod else ""
+        print(f"[UNBOUNDED] {finding.file}:{finding.line} {finding.call} [{', '.join(tags)}]{fix}")
+    if diffs:
+        print()
+        print(''.join(diffs), end='')
+
+    print("\n" + "=" * 80)
+    print(" SUMMARY")
+    print("=" * 80)
+    files = {finding.file for finding in findings}
+    on_get = [finding for finding in findings if finding.method == "GET"]
+    print(f"Route files scanned: {len(route_files)}")
+    print(f"Unbounded findMany calls: {len(findings)} in {len(files)} files ({len(on_get)} on GET handlers)")
+    for scope in SCOPES:
+        print(f"  where {scope:<10} {sum(1 for f in on_get if f.scope == scope):4d} on GET")
+    codemod = [finding for finding in findings if not finding.codemod]
+    print(f"Paginated by the codemod: {len(codemod)} calls in {len({f.file for f in codemod})} files"
+          + (" (written)" if args.apply and codemod else ""))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                       "default_limit": args.default_limit,
+                       "max_limit": args.max_limit,
+                       "findings": [finding.to_dict() for finding in findings]}, f, indent=2)
+        print(f"Report written to {args.json}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
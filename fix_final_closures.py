@@ -4,10 +4,80 @@ Fix Missing Final Closures
 Ensures all route files end with proper }); to close requireAuth/withErrorHandling wrappers
 """
 
+import argparse
 import os
 import re
-from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Optional
+
+from edit_buffer import EditBuffer, apply_edits
+
+from route_tree import API_DIR, find_route_files, map_route_files
+
+def fix_final_closure_content(content: str,
+                              buffers: Optional[List[EditBuffer]] = None) -> Tuple[str, Optional[str]]:
+    """
+    Fix missing final }); closure in route source held in memory
+    Every fix replaces the trailing whitespace with a closing suffix; buffers,
+    when given, receives that edit span.
+    Returns (new_content, fix_description)
+    """
+    fix_desc = None
+    suffix = None
+    source = None
+
+    # Remove trailing whitespace and newlines
+    content_stripped = content.rstrip()
+
+    # Check if file ends with });
+    if content_stripped.endswith('});'):
+        return content, None  # Already correct
+
+    # Pattern 1: File ends with }); but missing newline
+    if content_stripped.endswith('}):'):
+        suffix, source = ';\n', "final_closure.semicolon"
+        fix_desc = "Added missing semicolon and newline"
+
+    # Pattern 2: File ends with ); but needs })
+    elif content_stripped.endswith(');'):
+        # Check if this is inside createSuccessResponse or similar
+        # Look at last 10 lines to understand context
+        lines = content_stripped.split('\n')
+        last_lines = lines[-10:]
+
+        # Check if we're inside a return statement
+        has_return = any('return' in line for line in last_lines)
+        has_create_success = any('createSuccessResponse' in line or 'NextResponse.json' in line for line in last_lines)
+
+        if has_return and has_create_success:
+            # This is a return statement, needs });
+            suffix, source = '\n});\n', "final_closure.after_return"
+            fix_desc = "Added missing }); closure for wrapper function"
+
+    # Pattern 3: File ends with } but needs });
+    elif content_stripped.endswith('}'):
+        # Check last 20 lines for context
+        lines = content_stripped.split('\n')
+        last_lines = lines[-20:]
+
+        # Check if this looks like end of try-catch block
+        has_try_catch = any('catch' in line and 'error' in line for line in last_lines)
+
+        if has_try_catch:
+            # This is end of catch block, needs })
+            suffix, source = '\n});\n', "final_closure.after_catch"
+            fix_desc = "Added missing }); closure for wrapper function after catch block"
+
+    # Pattern 4: File ends with unexpected closure like } ) or } ;
+    elif re.search(r'\}\s*\)\s*$', content_stripped) or re.search(r'\}\s*;\s*$', content_stripped):
+        suffix, source = '\n});\n', "final_closure.malformed"
+        fix_desc = "Fixed malformed closure and added proper });"
+
+    if suffix is not None:
+        buffer = EditBuffer(content)
+        buffer.add(len(content_stripped), len(content), suffix, source)
+        content = apply_edits(buffer, buffers)
+
+    return content, fix_desc
 
 def fix_final_closure(filepath: str) -> Tuple[bool, str]:
     """
@@ -16,57 +86,9 @@ def fix_final_closure(filepath: str) -> Tuple[bool, str]:
     """
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        original_content = content
-        fix_desc = None
-
-        # Remove trailing whitespace and newlines
-        content_stripped = content.rstrip()
-
-        # Check if file ends with });
-        if content_stripped.endswith('});'):
-            return False, None  # Already correct
-
-        # Pattern 1: File ends with }); but missing newline
-        if content_stripped.endswith('}):'):
-            content = content_stripped + ';\n'
-            fix_desc = "Added missing semicolon and newline"
-
-        # Pattern 2: File ends with ); but needs })
-        elif content_stripped.endswith(');'):
-            # Check if this is inside createSuccessResponse or similar
-            # Look at last 10 lines to understand context
-            lines = content_stripped.split('\n')
-            last_lines = lines[-10:]
-
-            # Check if we're inside a return statement
-            has_return = any('return' in line for line in last_lines)
-            has_create_success = any('createSuccessResponse' in line or 'NextResponse.json' in line for line in last_lines)
-
-            if has_return and has_create_success:
-                # This is a return statement, needs });
-                content = content_stripped + '\n});\n'
-                fix_desc = "Added missing }); closure for wrapper function"
-
-        # Pattern 3: File ends with } but needs });
-        elif content_stripped.endswith('}'):
-            # Check last 20 lines for context
-            lines = content_stripped.split('\n')
-            last_lines = lines[-20:]
-
-            # Check if this looks like end of try-catch block
-            has_try_catch = any('catch' in line and 'error' in line for line in last_lines)
-
-            if has_try_catch:
-                # This is end of catch block, needs })
-                content = content_stripped + '\n});\n'
-                fix_desc = "Added missing }); closure for wrapper function after catch block"
-
-        # Pattern 4: File ends with unexpected closure like } ) or } ;
-        elif re.search(r'\}\s*\)\s*$', content_stripped) or re.search(r'\}\s*;\s*$', content_stripped):
-            content = content_stripped + '\n});\n'
-            fix_desc = "Fixed malformed closure and added proper });"
+            original_content = f.read()
+
+        content, fix_desc = fix_final_closure_content(original_content)
 
         # Save if modified
         if content != original_content and fix_desc:
@@ -81,9 +103,14 @@ def fix_final_closure(filepath: str) -> Tuple[bool, str]:
         return False, None
 
 def main():
+    parser = argparse.ArgumentParser(description="Fix missing final closures across all API routes")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+
     # Find all API route files
-    api_dir = Path(r"C:\Users\Khell\Desktop\Ashley AI\services\ash-admin\src\app\api")
-    route_files = list(api_dir.rglob("route.ts"))
+    api_dir = API_DIR
+    route_files = find_route_files(api_dir)
 
     print(f"Checking {len(route_files)} route files for missing final closures...")
     print("=" * 80)
@@ -92,10 +119,10 @@ def main():
     skipped_count = 0
     fix_summary = {}
 
-    for filepath in route_files:
-        relative_path = filepath.relative_to(api_dir.parent.parent.parent)
+    results = map_route_files(fix_final_closure, route_files, args.jobs)
 
-        was_modified, fix_desc = fix_final_closure(str(filepath))
+    for filepath, (was_modified, fix_desc) in zip(route_files, results):
+        relative_path = filepath.relative_to(api_dir.parent.parent.parent)
 
         if was_modified:
             fixed_count += 1
@@ -5,12 +5,15 @@ Fix missing }); after function calls like logAuthEvent, prisma calls, etc.
 import re
 from pathlib import Path
 
+from bracket_index import BracketIndex
+
 def fix_missing_closures(filepath):
     """Fix missing }); closures"""
     with open(filepath, 'r', encoding='utf-8') as f:
         lines = f.readlines()
 
     original = ''.join(lines)
+    index = BracketIndex(original)
     fixed_lines = []
     i = 0
 
@@ -51,14 +54,9 @@ def fix_missing_closures(filepath):
                     # - await prisma.xxx.yyy({
                     # - await createSession(
                     has_unclosed_call = False
-                    paren_count = 0
-                    brace_count = 0
-
-                    for j in range(max(0, i - 30), i + 1):
-                        check_line = lines[j]
-                        # Count braces and parens
-                        paren_count += check_line.count('(') - check_line.count(')')
-                        brace_count += check_line.count('{') - check_line.count('}')
+                    counts = index.counts_between(max(0, i - 30), i)
+                    paren_count = counts.paren
+                    brace_count = counts.brace
 
                     # If we have unclosed parens/braces, add });
                     if paren_count > 0 or brace_count > 0:
@@ -5,92 +5,86 @@ Fix syntax errors in route files caused by automated conversion
 import os
 import re
 from pathlib import Path
-
-def fix_route_file(filepath):
-    """Fix syntax errors in a route file"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    original_content = content
+from typing import List, Optional, Tuple
+
+from edit_buffer import EditBuffer, apply_edits
+from fixer_registry import HTTP_METHODS, apply_rules, procedural_can_match
+
+# Compiled once at import rather than per file and per method
+IMPORT_LINE = re.compile(r'^import.*?from.*?;$', re.MULTILINE)
+NEXT_EXPORT = re.compile(r'\nexport (const|async function)')
+WRAPPER_OPEN = {
+    method: re.compile(rf'(export const {method} = requireAuth\(async[^)]*?\) => \{{)')
+    for method in HTTP_METHODS
+}
+
+def fix_route_content(content: str, buffers: Optional[List[EditBuffer]] = None) -> Tuple[str, List[str]]:
+    """Fix syntax errors in route source held in memory.
+    buffers, when given, receives the edit spans of each pass.
+    Returns (new_content, list_of_changes_made)"""
     changes_made = []
 
     # Fix 1: Ensure requireAuth import exists
     if 'requireAuth' in content and 'from "@/lib/auth-middleware"' not in content:
         # Find the position after last import
-        import_matches = list(re.finditer(r'^import.*?from.*?;$', content, re.MULTILINE))
+        import_matches = list(IMPORT_LINE.finditer(content))
         if import_matches:
             last_import_end = import_matches[-1].end()
-            content = (content[:last_import_end] +
-                      '\nimport { requireAuth } from "@/lib/auth-middleware";' +
-                      content[last_import_end:])
+            buffer = EditBuffer(content)
+            buffer.add(last_import_end, last_import_end,
+                       '\nimport { requireAuth } from "@/lib/auth-middleware";', "route_file.import")
+            content = apply_edits(buffer, buffers)
             changes_made.append('Added requireAuth import')
 
     # Fix 2: Fix incomplete requireAuth wrapping - find patterns like:
     # export const GET = requireAuth(async (request: NextRequest) {
     # that are missing the closing });
 
-    # Count opening and closing for each export const
-    methods = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']
-    for method in methods:
-        # Pattern: export const METHOD = requireAuth(async
-        pattern = rf'export const {method} = requireAuth\(async'
-        if re.search(pattern, content):
-            # Find the export const line
-            match = re.search(rf'(export const {method} = requireAuth\(async[^)]*?\) => \{{)', content)
-            if match:
-                start_pos = match.start()
-
-                # Find the next export const or end of file
-                next_export = re.search(r'\nexport (const|async function)', content[match.end():])
-                if next_export:
-                    end_pos = match.end() + next_export.start()
-                else:
-                    end_pos = len(content)
-
-                # Get the function body
-                function_body = content[match.end():end_pos]
-
-                # Check if it ends with }); or just }
-                if function_body.rstrip().endswith('}'):
-                    # Check if we need to add );
-                    if not function_body.rstrip().endswith('});'):
-                        # Replace the last } with });
-                        last_brace_pos = function_body.rstrip().rfind('}')
-                        function_body = function_body[:last_brace_pos] + '});' + function_body[last_brace_pos+1:]
-                        content = content[:match.end()] + function_body + content[end_pos:]
-                        changes_made.append(f'Fixed {method} closing bracket')
+    # Count opening and closing for each export const. Each method's body
+    # ends before the next export, so the closings are batched as one pass
+    buffer = EditBuffer(content)
+    for method in HTTP_METHODS:
+        if not procedural_can_match(content, f"route_file.wrapper_close.{method}"):
+            continue
+
+        # Find the export const METHOD = requireAuth(async ... => { line
+        match = WRAPPER_OPEN[method].search(content)
+        if match:
+            # Find the next export const or end of file
+            next_export = NEXT_EXPORT.search(content, match.end())
+            if next_export:
+                end_pos = next_export.start()
+            else:
+                end_pos = len(content)
+
+            # Get the function body
+            function_body = content[match.end():end_pos]
+
+            # Check if it ends with }); or just }
+            if function_body.rstrip().endswith('}'):
+                # Check if we need to add );
+                if not function_body.rstrip().endswith('});'):
+                    # Replace the last } with });
+                    last_brace_pos = match.end() + function_body.rstrip().rfind('}')
+                    buffer.add(last_brace_pos, last_brace_pos + 1, '});', f"route_file.wrapper_close.{method}")
+                    changes_made.append(f'Fixed {method} closing bracket')
+    content = apply_edits(buffer, buffers)
 
     # Fix 3: Fix incorrect patterns like "export const GET = requireAuth(async (request: NextRequest) {"
     # Should be "export const GET = requireAuth(async (request: NextRequest, user) => {"
+    # Fix 4: Fix routes with params pattern (like [id] routes) missing the user parameter
+    # Both are the per-method "fix_route_file" rules in fixer_registry
+    content, rule_changes = apply_rules(content, "fix_route_file", buffers=buffers)
+    changes_made.extend(rule_changes)
+
+    return content, changes_made
+
+def fix_route_file(filepath):
+    """Fix syntax errors in a route file"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        original_content = f.read()
 
-    # Pattern without user parameter
-    for method in methods:
-        # Fix missing user parameter
-        pattern1 = rf'export const {method} = requireAuth\(async \(request: NextRequest\) \{{'
-        replacement1 = rf'export const {method} = requireAuth(async (request: NextRequest, user) => {{'
-        if re.search(pattern1, content):
-            content = re.sub(pattern1, replacement1, content)
-            changes_made.append(f'Added user param to {method}')
-
-        pattern2 = rf'export const {method} = requireAuth\(async \(req: NextRequest\) \{{'
-        replacement2 = rf'export const {method} = requireAuth(async (req: NextRequest, user) => {{'
-        if re.search(pattern2, content):
-            content = re.sub(pattern2, replacement2, content)
-            changes_made.append(f'Added user param to {method} (req)')
-
-    # Fix 4: Fix routes with params pattern (like [id] routes)
-    # Pattern: export const GET = requireAuth(async (
-    #   request: NextRequest,
-    #   { params }
-    # Should add user parameter
-
-    for method in methods:
-        # Multi-line pattern with params but no user
-        pattern = rf'export const {method} = requireAuth\(async \(\n  request: NextRequest,\n  \{{\{{ params \}}\}}'
-        replacement = rf'export const {method} = requireAuth(async (\n  request: NextRequest,\n  user,\n  {{\{{ params \}}}}'
-        if re.search(pattern, content):
-            content = re.sub(pattern, replacement, content)
-            changes_made.append(f'Added user param to {method} with params')
+    content, changes_made = fix_route_content(original_content)
 
     # Write back if changes were made
     if content != original_content:
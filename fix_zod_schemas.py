@@ -4,10 +4,23 @@ Fix Zod Schema Definitions
 Fixes missing closing ); in z.object({...}) schemas
 """
 
+import argparse
 import os
-import re
-from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from edit_buffer import EditBuffer
+from fixer_registry import apply_rules
+from route_tree import API_DIR, find_route_files, map_route_files
+
+def fix_zod_schemas_content(content: str,
+                            buffers: Optional[List[EditBuffer]] = None) -> Tuple[str, List[str]]:
+    """
+    Fix Zod schema definitions in route source held in memory.
+    The rewrites are the "fix_zod_schemas" rules in fixer_registry; buffers,
+    when given, receives their edit spans.
+    Returns (new_content, list_of_fixes_applied)
+    """
+    return apply_rules(content, "fix_zod_schemas", buffers=buffers)
 
 def fix_zod_schemas(filepath: str) -> Tuple[bool, List[str]]:
     """
@@ -16,47 +29,9 @@ def fix_zod_schemas(filepath: str) -> Tuple[bool, List[str]]:
     """
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        original_content = content
-        fixes_applied = []
-
-        # Fix 1: z.object({...}) missing closing );
-        # Pattern: const SomeSchema = z.object({\n  ...\n}\n\nexport
-        # Should be: const SomeSchema = z.object({\n  ...\n});\n\nexport
-        pattern1 = r'(const\s+\w+Schema\s*=\s*z\.object\(\{[^}]+\})\s*\n\s*\n\s*(export|const|//)'
-        matches = list(re.finditer(pattern1, content, re.DOTALL))
-        if matches:
-            for match in reversed(matches):  # Reverse to preserve positions
-                if not match.group(1).endswith(');'):
-                    content = content[:match.end(1)] + ');\n\n' + match.group(2) + content[match.end(2):]
-                    fixes_applied.append(f"Fixed Zod schema missing closing );")
-
-        # Fix 2: Transaction callback missing closing });
-        # Pattern: return { workspace, user };\n\nconst { workspace, user } = result;
-        # Should be: return { workspace, user };\n});\n\nconst { workspace, user } = result;
-        pattern2 = r'(return\s*\{[^}]+\};)\s*\n\s*\n\s*(const\s*\{[^}]+\}\s*=\s*result;)'
-        if re.search(pattern2, content):
-            content = re.sub(pattern2, r'\1\n});\n\n\2', content)
-            fixes_applied.append("Fixed transaction callback missing closing });")
-
-        # Fix 3: Function calls missing closing );
-        # Pattern: await someFunction(...{\n  ...\n}\n\nconst
-        pattern3 = r'(await\s+\w+\([^)]+\{[^}]+\})\s*\n\s*\n\s*(const|console|return)'
-        matches3 = list(re.finditer(pattern3, content, re.DOTALL))
-        if matches3:
-            for match in reversed(matches3):
-                if not match.group(1).endswith(');'):
-                    content = content[:match.end(1)] + ');\n\n' + match.group(2) + content[match.end(2):]
-                    fixes_applied.append("Fixed function call missing closing );")
-
-        # Fix 4: Console.log calls missing closing );
-        # Pattern: console.log(...{\n  ...\n  });
-        # The issue is extra }); instead of just );
-        pattern4 = r'(console\.log\([^)]+\{[^}]+\})\s*\);'
-        if re.search(pattern4, content, re.DOTALL):
-            content = re.sub(pattern4, r'\1);', content, flags=re.DOTALL)
-            fixes_applied.append("Fixed console.log closing);")
+            original_content = f.read()
+
+        content, fixes_applied = fix_zod_schemas_content(original_content)
 
         # Save if modified
         if content != original_content:
@@ -71,9 +46,14 @@ def fix_zod_schemas(filepath: str) -> Tuple[bool, List[str]]:
         return False, []
 
 def main():
+    parser = argparse.ArgumentParser(description="Fix Zod schema definitions across all API routes")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+
     # Find all API route files
-    api_dir = Path(r"C:\Users\Khell\Desktop\Ashley AI\services\ash-admin\src\app\api")
-    route_files = list(api_dir.rglob("route.ts"))
+    api_dir = API_DIR
+    route_files = find_route_files(api_dir)
 
     print(f"Scanning {len(route_files)} route files for Zod schema issues...")
     print("=" * 80)
@@ -82,10 +62,10 @@ def main():
     skipped_count = 0
     fix_summary = {}
 
-    for filepath in route_files:
-        relative_path = filepath.relative_to(api_dir.parent.parent.parent)
+    results = map_route_files(fix_zod_schemas, route_files, args.jobs)
 
-        was_modified, fixes = fix_zod_schemas(str(filepath))
+    for filepath, (was_modified, fixes) in zip(route_files, results):
+        relative_path = filepath.relative_to(api_dir.parent.parent.parent)
 
         if was_modified:
             fixed_count += 1
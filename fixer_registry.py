@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Fixer Registry
+Every regex rewrite used by the route fixers, declared as data and compiled
+once at import. Fixers call apply_rules() with a scope instead of building
+and compiling patterns per file.
+
+Each rule also declares anchors: literals that every match must contain.
+The anchors present in a file's content are found once, and a rule whose
+anchors are not all there is skipped without running its regex.
+
+Run directly to list the registered rules, with --cost to measure what each
+rule costs (and how often the prefilter skips it) over the API route tree,
+or with --verify-anchors to check the declared anchors against real matches.
+"""
+
+import argparse
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Pattern, Tuple
+
+from edit_buffer import EditBuffer
+from fixpoint_engine import FixpointBudget, apply_fixpoint
+
+HTTP_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']
+
+SMART_FIX_CALLS = ['generateTokenPair', 'prisma.user.update', 'prisma.user.findFirst',
+                   'prisma.user.create', 'logAuthEvent', 'authLogger.info',
+                   'authLogger.error', 'response.cookies.set', 'createSession']
+
+class FixRule(NamedTuple):
+    """
+    One declarative rewrite.
+    scope: the rule group a fixer applies, in declaration order
+    anchors: literals every match contains; the rule is skipped unless all are present
+    mode: "sub" runs one re.sub pass; "fixpoint" repeats until nothing matches
+    """
+    name: str
+    scope: str
+    pattern: str
+    replacement: str
+    description: str
+    anchors: Tuple[str, ...]
+    flags: int = 0
+    mode: str = "sub"
+
+class CompiledRule(NamedTuple):
+    rule: FixRule
+    regex: Pattern
+
+RULES: List[FixRule] = [
+    # comprehensive_fix_all_routes.fix_route_syntax
+    FixRule("route_syntax.arrow_semicolon", "route_syntax",
+            r'(async\s+\([^)]+\)\s*=>\s*\{);', r'\1',
+            "Removed extra semicolon in function declaration", ("async", "=>", "{;")),
+    FixRule("route_syntax.promise_all_item", "route_syntax",
+            r'\}\),\s*\n\s*\}\);\s*\n\s*\n\s*(//.+)', r'}),\n\n      \1',
+            "Fixed extra }); in Promise.all array", ("}),", "});", "//")),
+    FixRule("route_syntax.standalone_before_statement", "route_syntax",
+            r'(\}\),)\s*\n\s*\}\);\s*\n\s*\n\s*(prisma|await|const|if|return)', r'\1\n\n      \2',
+            "Removed standalone }); before statements", ("}),", "});")),
+    FixRule("route_syntax.after_await_prisma", "route_syntax",
+            r'(await\s+prisma\.\w+\.\w+\([^)]+\{[^}]+\},\s*\n\s*\}\),)\s*\n\s*\}\);', r'\1',
+            "Removed extra }); after prisma calls", ("await", "prisma.", "}),", "});"), re.DOTALL),
+    FixRule("route_syntax.try_catch_brace", "route_syntax",
+            r'(\{\s*status:\s*\d+\s*\}\s*\n\s*\);)\s*\n(\}\);)\s*$', r'\1\n  }\n\2',
+            "Added missing closing brace for try-catch", ("status:", "});"), re.MULTILINE),
+    FixRule("route_syntax.after_const_prisma", "route_syntax",
+            r'(const\s+\w+\s*=\s*await\s+prisma\.\w+\.\w+\([^;]+\}\),)\s*\n\s*\}\);', r'\1',
+            "Removed extra }); after const prisma query", ("const", "await", "prisma.", "}),", "});"), re.DOTALL),
+    FixRule("route_syntax.after_where", "route_syntax",
+            r'(where:\s*\{[^}]+\},\s*\n\s*\}\),)\s*\n\s*\}\);', r'\1',
+            "Removed extra }); after where clause", ("where:", "}),", "});"), re.DOTALL),
+    FixRule("route_syntax.duplicate_closure", "route_syntax",
+            r'\}\);\s*\n\s*\}\);(?!\n\s*\n)', '});',
+            "Removed duplicate }); closures", ("});",)),
+    FixRule("route_syntax.after_if_block", "route_syntax",
+            r'(\)\s*\n\s*\}\s*\n)\s*\}\);(?=\s*\n\s*(//.+|if|const|await|return))', r'\1',
+            "Removed extra }); after if blocks", ("});",)),
+    FixRule("route_syntax.before_promise_all_close", "route_syntax",
+            r'(\},\n\s*\}\),)\s*\n\s*\}\);\s*\n(\s*\]\);)', r'\1\n\2',
+            "Removed extra }); before Promise.all closing", ("},\n", "}),", "});", "]);")),
+
+    # ultimate_zod_fix
+    FixRule("zod.mid_schema_close", "ultimate_zod_fix",
+            r'(const\s+\w+Schema\s*=\s*z\.object\(\{[^}]*?)\s*\}\);\s*\n\s*\n\s*([a-zA-Z_][\w]*:\s*z\.)',
+            r'\1,\n\n  \2',
+            "Removed extra }); in middle of Zod schema", ("Schema", "z.object({", "});"), re.DOTALL, "fixpoint"),
+    FixRule("zod.between_fields", "ultimate_zod_fix",
+            r'([a-zA-Z_][\w]*:\s*z\.[^,]+,)\s*\n\s*\}\);\s*\n\s*\n\s*(//[^\n]*\n\s*)?([a-zA-Z_][\w]*:\s*z\.)',
+            r'\1\n\n  \2\3',
+            "Removed extra }); between schema fields", ("z.", "});"), re.DOTALL, "fixpoint"),
+    # [^}]+ cannot contain a closing brace, so the schema body is always unclosed here
+    FixRule("zod.missing_final_close", "ultimate_zod_fix",
+            r'(const\s+\w+Schema\s*=\s*z\.object\(\{[^}]+)\}\s*\n\s*(export|const|//)',
+            r'\1});\n\n\2',
+            "Fixed Zod schema missing closing });", ("Schema", "z.object({"), re.DOTALL),
+    FixRule("zod.regex_refine", "ultimate_zod_fix",
+            r'(\.(regex|refine)\([^)]+\),)\s*\n\s*\}\);\s*\n\s*\n\s*([a-zA-Z_][\w]*:\s*z\.)',
+            r'\1\n\n  \3',
+            "Fixed regex/refine with extra });", (".re", "),", "});", "z."), re.DOTALL, "fixpoint"),
+    FixRule("zod.optional", "ultimate_zod_fix",
+            r'(:\s*z\.\w+\(\)[^,]*\.optional\(\),)\s*\n\s*\}\);\s*\n\s*\n\s*//',
+            r'\1\n\n  //',
+            "Fixed optional() with extra });", ("z.", ".optional(),", "});", "//"), 0, "fixpoint"),
+    # "Any char that does not start });" is spelled [^}]|\}(?!\);) rather than
+    # a tempered (?!\}\);). so the lookahead only runs at } characters
+    FixRule("zod.standalone_within_schema", "ultimate_zod_fix",
+            r'(const\s+\w+Schema\s*=\s*z\.object\(\{(?:[^}]|\}(?!\);))*?)\s*\}\);\s*\n\s*\n\s*([a-zA-Z_][\w]*:)',
+            r'\1\n\n  \2',
+            "Removed standalone }); within schema", ("Schema", "z.object({", "});"), re.DOTALL, "fixpoint"),
+
+    # fix_zod_schemas
+    FixRule("zod_schemas.missing_close_paren", "fix_zod_schemas",
+            r'(const\s+\w+Schema\s*=\s*z\.object\(\{[^}]+\})\s*\n\s*\n\s*(export|const|//)',
+            r'\1);\n\n\2',
+            "Fixed Zod schema missing closing );", ("Schema", "z.object({"), re.DOTALL),
+    FixRule("zod_schemas.transaction_callback", "fix_zod_schemas",
+            r'(return\s*\{[^}]+\};)\s*\n\s*\n\s*(const\s*\{[^}]+\}\s*=\s*result;)',
+            r'\1\n});\n\n\2',
+            "Fixed transaction callback missing closing });", ("return", "};", "result;")),
+    FixRule("zod_schemas.await_call", "fix_zod_schemas",
+            r'(await\s+\w+\([^)]+\{[^}]+\})\s*\n\s*\n\s*(const|console|return)',
+            r'\1);\n\n\2',
+            "Fixed function call missing closing );", ("await",), re.DOTALL),
+    FixRule("zod_schemas.console_log", "fix_zod_schemas",
+            r'(console\.log\([^)]+\{[^}]+\})\s*\);', r'\1);',
+            "Fixed console.log closing);", ("console.log(",), re.DOTALL),
+
+    # smart_pattern_fix.smart_fix (regex patterns 1, 2, 3 and 5)
+    FixRule("smart.early_return_brace", "smart_fix",
+            r'(\{ status: \d+ \}\s*\n\s*\);[^\n]*\n)\s*\n\s*(//[^\n]*\n\s*(?:const|if|await|return))',
+            r'\1    }\n\n    \2',
+            "Added closing brace after early return", ("{ status: ", ");", "//")),
+    *[FixRule(f"smart.call_closure.{func}", "smart_fix",
+              rf'({re.escape(func)}\([^)]+\{{[^}}]+\}}\s*)\}}\);', r'\1});',
+              f"Normalized {func}() closure", (f"{func}(", "});"))
+      for func in SMART_FIX_CALLS],
+    FixRule("smart.error_message_if", "smart_fix",
+            r'(errorMessage \+= [^;]+;)\s*\n\s*\n\s*(return NextResponse)',
+            r'\1\n      }\n\n      \2',
+            "Closed errorMessage if block", ("errorMessage += ", "return NextResponse")),
+    FixRule("smart.cookies_set", "smart_fix",
+            r'(response\.cookies\.set\([^)]+,\s*\{[^}]+\})\s*\}\);', r'\1});',
+            "Normalized response.cookies.set() closure", ("response.cookies.set(", "});")),
+
+    # fix_route_syntax.fix_route_file (fixes 3 and 4)
+    *[rule
+      for method in HTTP_METHODS
+      for rule in (
+          FixRule(f"route_file.user_param.{method}", "fix_route_file",
+                  rf'export const {method} = requireAuth\(async \(request: NextRequest\) \{{',
+                  rf'export const {method} = requireAuth(async (request: NextRequest, user) => {{',
+                  f"Added user param to {method}",
+                  (f"export const {method} = requireAuth(async (request: NextRequest) {{",)),
+          FixRule(f"route_file.user_param_req.{method}", "fix_route_file",
+                  rf'export const {method} = requireAuth\(async \(req: NextRequest\) \{{',
+                  rf'export const {method} = requireAuth(async (req: NextRequest, user) => {{',
+                  f"Added user param to {method} (req)",
+                  (f"export const {method} = requireAuth(async (req: NextRequest) {{",)),
+      )],
+    *[FixRule(f"route_file.user_param_params.{method}", "fix_route_file",
+              rf'export const {method} = requireAuth\(async \(\n  request: NextRequest,\n  \{{\{{ params \}}\}}',
+              rf'export const {method} = requireAuth(async (\n  request: NextRequest,\n  user,\n  {{\{{ params \}}}}',
+              f"Added user param to {method} with params",
+              (f"export const {method} = requireAuth(async (\n  request: NextRequest,\n", "params"))
+      for method in HTTP_METHODS],
+]
+
+# Anchors for the procedural (non-regex-rule) passes inside the fixers, so
+# they can be gated by the same per-file scan
+PROCEDURAL_ANCHORS: Dict[str, Tuple[str, ...]] = {
+    **{f"route_file.wrapper_close.{method}": (f"export const {method} = requireAuth(async",)
+       for method in HTTP_METHODS},
+    "smart.wrapper_close": ("export const", "requireAuth("),
+    "smart.error_message_block": ("errorMessage +=", "return NextResponse"),
+}
+
+def compile_rules(rules: List[FixRule]) -> Dict[str, List[CompiledRule]]:
+    """Compile every rule once, grouped by scope in declaration order"""
+    names = set()
+    registry: Dict[str, List[CompiledRule]] = {}
+    for rule in rules:
+        if not rule.anchors:
+            raise ValueError(f"Fix rule {rule.name} declares no anchors")
+        if rule.name in names:
+            raise ValueError(f"Duplicate fix rule name: {rule.name}")
+        if rule.mode not in ("sub", "fixpoint"):
+            raise ValueError(f"Unknown mode {rule.mode!r} for {rule.name}")
+        names.add(rule.name)
+        registry.setdefault(rule.scope, []).append(CompiledRule(rule, re.compile(rule.pattern, rule.flags)))
+    return registry
+
+REGISTRY = compile_rules(RULES)
+REGISTRY_BY_NAME = {compiled.rule.name: compiled for scope in REGISTRY.values() for compiled in scope}
+
+# Every literal the prefilter looks for, longest first
+ANCHORS: Tuple[str, ...] = tuple(sorted(
+    {anchor for rule in RULES for anchor in rule.anchors} |
+    {anchor for anchors in PROCEDURAL_ANCHORS.values() for anchor in anchors},
+    key=lambda anchor: (-len(anchor), anchor)))
+
+@lru_cache(maxsize=32)
+def anchors_present(content: str) -> FrozenSet[str]:
+    """
+    The registered anchors that occur in content, found in one scan per
+    distinct content. Each anchor is a C-level substring search; on the route
+    tree that is ~10x cheaper than a single-pass alternation regex, and a
+    pure Python Aho-Corasick automaton would be slower still.
+    """
+    return frozenset(anchor for anchor in ANCHORS if anchor in content)
+
+def can_match(content: str, anchors: Tuple[str, ...]) -> bool:
+    """True if every anchor occurs in content, i.e. a gated pass may fire"""
+    present = anchors_present(content)
+    return all(anchor in present for anchor in anchors)
+
+def procedural_can_match(content: str, name: str) -> bool:
+    """Prefilter check for a procedural pass declared in PROCEDURAL_ANCHORS"""
+    return can_match(content, PROCEDURAL_ANCHORS[name])
+
+def rule_edits(compiled: CompiledRule, content: str) -> EditBuffer:
+    """One re.sub pass of a rule, as spans against content"""
+    buffer = EditBuffer(content)
+    for match in compiled.regex.finditer(content):
+        new_text = match.expand(compiled.rule.replacement)
+        if new_text != match.group(0):
+            buffer.add(match.start(), match.end(), new_text, compiled.rule.name)
+    return buffer
+
+def apply_rules(content: str, scope: str, budget: Optional[FixpointBudget] = None,
+                stats: Optional[Dict[str, Dict[str, float]]] = None,
+                prefilter: bool = True, buffers: Optional[List[EditBuffer]] = None) -> Tuple[str, List[str]]:
+    """
+    Run every rule in scope over content, in declaration order.
+    Rules whose anchors are not all present are skipped (unless prefilter is
+    False). A rule's description is reported once if it changed the content.
+    stats, when given, accumulates per-rule calls, skips, rewrites and seconds.
+    buffers, when given, receives the EditBuffer of every applied rewrite pass.
+    Returns (new_content, list_of_fixes_applied)
+    """
+    budget = budget or FixpointBudget()
+    fixes_applied = []
+
+    for compiled in REGISTRY[scope]:
+        rule = compiled.rule
+        if stats is not None:
+            rule_stats = stats.setdefault(rule.name, {"calls": 0, "skipped": 0, "rewrites": 0, "seconds": 0.0})
+            rule_stats["calls"] += 1
+        if prefilter and not can_match(content, rule.anchors):
+            if stats is not None:
+                rule_stats["skipped"] += 1
+            continue
+
+        started = time.perf_counter()
+        if rule.mode == "fixpoint":
+            new_content, count = apply_fixpoint(compiled.regex, rule.replacement, content,
+                                                budget=budget, rule=rule.name, buffers=buffers)
+        else:
+            buffer = rule_edits(compiled, content)
+            new_content, count = buffer.apply(), len(buffer)
+            if count and buffers is not None:
+                buffers.append(buffer)
+
+        if stats is not None:
+            rule_stats["rewrites"] += count
+            rule_stats["seconds"] += time.perf_counter() - started
+
+        if new_content != content:
+            fixes_applied.append(rule.description)
+            content = new_content
+
+    return content, fixes_applied
+
+def measure_rule_costs(route_files: List[Path], prefilter: bool = True) -> Tuple[Dict[str, Dict[str, float]], float]:
+    """
+    Run each scope over every route file in isolation and collect per-rule stats.
+    Returns (stats, total_seconds); the total includes the anchor scans.
+    """
+    stats: Dict[str, Dict[str, float]] = {}
+    sources = [path.read_text(encoding='utf-8') for path in route_files]
+    anchors_present.cache_clear()
+    started = time.perf_counter()
+    for content in sources:
+        for scope in REGISTRY:
+            apply_rules(content, scope, stats=stats, prefilter=prefilter)
+    return stats, time.perf_counter() - started
+
+def verify_anchors(route_files: List[Path]) -> List[Tuple[str, str, str]]:
+    """
+    Check the declared anchors against every real match in the route tree.
+    Returns (rule, file, missing_anchor) for each match lacking an anchor.
+    """
+    problems = []
+    for path in route_files:
+        content = path.read_text(encoding='utf-8')
+        for rule in RULES:
+            for match in REGISTRY_BY_NAME[rule.name].regex.finditer(content):
+                for anchor in rule.anchors:
+                    if anchor not in match.group(0):
+                        problems.append((rule.name, path.name, anchor))
+    return problems
+
+def print_skip_report(stats: Dict[str, Dict[str, float]], seconds: float, unfiltered_seconds: float):
+    """Prefilter skip rates per fixer scope, and what they save"""
+    print("\nPrefilter skip rates per fixer:")
+    print(f"  {'Fixer':<20} {'Rules':>6} {'Executions':>11} {'Skipped':>9} {'Skip rate':>10}")
+    total_calls = total_skipped = 0
+    for scope, compiled_rules in REGISTRY.items():
+        scope_stats = [stats.get(c.rule.name, {}) for c in compiled_rules]
+        calls = sum(s.get("calls", 0) for s in scope_stats)
+        skipped = sum(s.get("skipped", 0) for s in scope_stats)
+        total_calls += calls
+        total_skipped += skipped
+        rate = 100 * skipped / calls if calls else 0
+        print(f"  {scope:<20} {len(compiled_rules):>6} {calls:>11} {skipped:>9} {rate:>9.1f}%")
+    rate = 100 * total_skipped / total_calls if total_calls else 0
+    print(f"  {'TOTAL':<20} {len(RULES):>6} {total_calls:>11} {total_skipped:>9} {rate:>9.1f}%")
+    print(f"\nRegex executions avoided: {total_skipped} of {total_calls}")
+    print(f"Rule time with prefilter: {seconds * 1000:.1f} ms (anchor scans included), "
+          f"without: {unfiltered_seconds * 1000:.1f} ms")
+
+def main():
+    from route_tree import API_DIR, find_route_files
+
+    parser = argparse.ArgumentParser(description="List registered fix rules and their cost")
+    parser.add_argument("--cost", action="store_true",
+                        help="Measure each rule and its prefilter skip rate over the API route tree")
+    parser.add_argument("--verify-anchors", action="store_true",
+                        help="Check every real match contains its rule's declared anchors")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    args = parser.parse_args()
+
+    route_files = find_route_files(args.api_dir)
+
+    if args.verify_anchors:
+        problems = verify_anchors(route_files)
+        for name, filename, anchor in problems:
+            print(f"[ERR] {name}: match in {filename} lacks anchor {anchor!r}")
+        print(f"{len(problems)} anchor problem(s) across {len(route_files)} files")
+        raise SystemExit(1 if problems else 0)
+
+    stats, seconds = measure_rule_costs(route_files) if args.cost else ({}, 0.0)
+
+    print("=" * 100)
+    print(f" FIX RULE REGISTRY ({len(RULES)} rules in {len(REGISTRY)} scopes, {len(ANCHORS)} anchors)")
+    print("=" * 100)
+    for scope, compiled_rules in REGISTRY.items():
+        print(f"\n[{scope}]")
+        for compiled in compiled_rules:
+            rule = compiled.rule
+            line = f"  {rule.name:<45} {rule.mode:<8}"
+            if stats:
+                rule_stats = stats.get(rule.name, {"calls": 0, "skipped": 0, "rewrites": 0, "seconds": 0.0})
+                skip_rate = 100 * rule_stats["skipped"] / rule_stats["calls"] if rule_stats["calls"] else 0
+                line += (f" {rule_stats['seconds'] * 1000:>8.2f} ms {rule_stats['rewrites']:>4d} rewrites"
+                         f" {skip_rate:>6.1f}% skipped")
+            print(line)
+            print(f"      {rule.description}")
+
+    if stats:
+        total = sum(s["seconds"] for s in stats.values())
+        print(f"\nTotal regex time over the tree: {total * 1000:.1f} ms")
+        print("Most expensive rules:")
+        for name, rule_stats in sorted(stats.items(), key=lambda x: -x[1]["seconds"])[:10]:
+            print(f"  {rule_stats['seconds'] * 1000:>8.2f} ms  {name}")
+        _, unfiltered_seconds = measure_rule_costs(route_files, prefilter=False)
+        print_skip_report(stats, seconds, unfiltered_seconds)
+    print("=" * 100)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Fixpoint Engine
+Applies a rewrite rule until it no longer matches, batching each sweep's
+edits instead of rebuilding the file after every one, and under a per-file
+time/iteration budget.
+"""
+
+import re
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Pattern, Tuple, Union
+
+from edit_buffer import EditBuffer
+
+DEFAULT_MAX_SECONDS = 2.0
+DEFAULT_MAX_ITERATIONS = 5000
+
+class FixpointBudgetExceeded(Exception):
+    """Raised when a file uses up its fixpoint budget"""
+
+    def __init__(self, rule: str, iterations: int, elapsed: float, reason: str):
+        super().__init__(f"{rule}: {reason} after {iterations} iterations in {elapsed:.2f}s")
+        self.rule = rule
+        self.iterations = iterations
+        self.elapsed = elapsed
+        self.reason = reason
+
+class FixpointBudget:
+    """Time and iteration allowance shared by every rule applied to one file"""
+
+    def __init__(self, max_seconds: float = DEFAULT_MAX_SECONDS,
+                 max_iterations: int = DEFAULT_MAX_ITERATIONS):
+        self.max_seconds = max_seconds
+        self.max_iterations = max_iterations
+        self.started = time.perf_counter()
+        self.iterations = 0
+
+    def expired(self, rule: str) -> FixpointBudgetExceeded:
+        return FixpointBudgetExceeded(rule, self.iterations, time.perf_counter() - self.started,
+                                      f"time budget of {self.max_seconds:.1f}s exceeded")
+
+    @contextmanager
+    def guard(self, rule: str) -> Iterator[None]:
+        """
+        Enforce the time budget inside a single search as well. charge() only
+        runs between matches, but re checks for signals while it backtracks,
+        so a SIGALRM armed for the remaining time interrupts a runaway match.
+        Off the main thread, or where there is no SIGALRM, only charge() applies.
+        """
+        if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+            yield
+            return
+        remaining = self.max_seconds - (time.perf_counter() - self.started)
+
+        def expire(signum, frame):
+            raise self.expired(rule)
+
+        previous = signal.signal(signal.SIGALRM, expire)
+        signal.setitimer(signal.ITIMER_REAL, max(remaining, 0.001))
+        try:
+            yield
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, signal.SIG_DFL if previous is None else previous)
+
+    def charge(self, rule: str):
+        """Count one search; raise once the file is over budget"""
+        self.iterations += 1
+        elapsed = time.perf_counter() - self.started
+        if self.iterations > self.max_iterations:
+            raise FixpointBudgetExceeded(rule, self.iterations, elapsed,
+                                         f"iteration budget of {self.max_iterations} exceeded")
+        if elapsed > self.max_seconds:
+            raise self.expired(rule)
+
+def apply_fixpoint(pattern: Union[str, Pattern], replacement: str, content: str,
+                   flags: int = 0, budget: Optional[FixpointBudget] = None, rule: str = "",
+                   buffers: Optional[List[EditBuffer]] = None, left_context: int = 0) -> Tuple[str, int]:
+    """
+    Rewrite every match of pattern until none is left.
+    Equivalent to `while re.search(p, s): s = re.sub(p, r, s)`. Each sweep
+    collects its rewrites as spans in an EditBuffer and builds the new text
+    in one join, instead of copying the whole file once per edit. Text before
+    a sweep's first rewrite did not change, so the next sweep resumes there,
+    left_context characters earlier for patterns that can start a match
+    before the text they rewrite. When a resumed sweep finds nothing, one
+    sweep over the whole file confirms the fixpoint, so a left_context that
+    is too small costs a sweep rather than a missed match. Matches whose
+    replacement is identical to the matched text are skipped rather than
+    spun on.
+    buffers, when given, receives every applied sweep's EditBuffer.
+    Returns (new_content, number_of_rewrites)
+    """
+    regex = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+    budget = budget or FixpointBudget()
+    rule = rule or regex.pattern[:40]
+    rewrites = 0
+    resume = 0
+
+    with budget.guard(rule):
+        while True:
+            budget.charge(rule)
+            buffer = EditBuffer(content)
+            first_edit = None
+            for match in regex.finditer(content, resume):
+                budget.charge(rule)
+                new_text = match.expand(replacement)
+                if new_text != match.group(0):
+                    buffer.add(match.start(), match.end(), new_text, rule)
+                    if first_edit is None:
+                        first_edit = match.start()
+
+            if not len(buffer):
+                # A full sweep with no rewrites confirms the fixpoint
+                if resume == 0:
+                    return content, rewrites
+                resume = 0
+                continue
+
+            content = buffer.apply()
+            rewrites += len(buffer)
+            if buffers is not None:
+                buffers.append(buffer)
+            resume = max(0, first_edit - left_context)
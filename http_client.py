@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Async HTTP Client
+Minimal asyncio HTTP/1.1 client for hitting the local dev server: a small
+pool of keep-alive connections per base URL, per-request timeouts, and
+Content-Length / chunked / read-to-close bodies, gzip and deflate
+content-encodings. Standard library only.
+"""
+
+import asyncio
+import ssl
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_BASE_URL = "http://localhost:3001"
+DEFAULT_TIMEOUT = 10.0
+
+class TransferStats(NamedTuple):
+    """Timing and size of one response; bytes are body bytes, headers excluded"""
+    ttfb: float
+    total: float
+    wire_bytes: int
+    body_bytes: int
+    encoding: str
+
+    @property
+    def transfer(self) -> float:
+        """Time from the first response byte to the last"""
+        return self.total - self.ttfb
+
+def decode_body(body: bytes, encoding: str) -> bytes:
+    """
+    Undo a gzip / deflate content-encoding. Encodings the standard library
+    cannot decode (br, zstd) and corrupt bodies are returned as received.
+    """
+    encoding = encoding.strip().lower()
+    if not body or encoding in ("", "identity"):
+        return body
+    try:
+        if encoding in ("gzip", "x-gzip"):
+            return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        if encoding == "deflate":
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header
+                return zlib.decompress(body, -zlib.MAX_WBITS)
+    except zlib.error:
+        pass
+    return body
+
+class HttpResponse(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    # As received: still compressed if a content-encoding was applied
+    body: bytes
+    ttfb: float
+    elapsed: float
+
+    def decoded_body(self) -> bytes:
+        return decode_body(self.body, self.headers.get("content-encoding", ""))
+
+    def text(self) -> str:
+        return self.decoded_body().decode('utf-8', errors='replace')
+
+    def transfer_stats(self) -> TransferStats:
+        return TransferStats(self.ttfb, self.elapsed, len(self.body), len(self.decoded_body()),
+                             self.headers.get("content-encoding", "identity").lower() or "identity")
+
+class HttpError(Exception):
+    """Connection failure or malformed response"""
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.requests = 0
+
+    def close(self):
+        self.writer.close()
+
+class ConnectionPool:
+    """
+    Keep-alive connections to one base URL. At most max_connections are open
+    at a time; callers beyond that wait for a connection to come back.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, max_connections: int = 8,
+                 timeout: float = DEFAULT_TIMEOUT):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {base_url}")
+        self.base_url = base_url.rstrip('/')
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.host_header = parts.netloc
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle: List[_Connection] = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.opened = 0
+
+    async def __aenter__(self) -> 'ConnectionPool':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+    async def _open(self) -> _Connection:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    async def request(self, method: str, path: str, headers: Optional[Dict[str, str]] = None,
+                      body: Optional[bytes] = None, timeout: Optional[float] = None) -> HttpResponse:
+        """
+        Send one request on a pooled connection and read the whole response.
+        Raises asyncio.TimeoutError past the timeout and HttpError on
+        connection or protocol failures.
+        """
+        async with self._slots:
+            return await asyncio.wait_for(self._request(method, path, headers or {}, body),
+                                          timeout if timeout is not None else self.timeout)
+
+    async def _request(self, method: str, path: str, headers: Dict[str, str],
+                       body: Optional[bytes]) -> HttpResponse:
+        payload = self._encode(method, path, headers, body)
+        # A reused connection may have been closed by the server while idle;
+        # that shows up before any response byte and is retried once fresh
+        for attempt in range(2):
+            reused = bool(self._idle) and attempt == 0
+            connection = self._idle.pop() if reused else await self._open()
+            try:
+                started = time.perf_counter()
+                try:
+                    connection.writer.write(payload)
+                    await connection.writer.drain()
+                    status_line = await connection.reader.readline()
+                    if not status_line:
+                        raise ConnectionResetError("connection closed before response")
+                except (ConnectionError, OSError) as e:
+                    connection.close()
+                    if reused:
+                        continue
+                    raise HttpError(f"{method} {path}: {e}") from e
+
+                ttfb = time.perf_counter() - started
+                try:
+                    status, response_headers, response_body, keep_alive = await self._read_response(
+                        connection.reader, status_line, method)
+                except (ConnectionError, OSError, ValueError, asyncio.IncompleteReadError) as e:
+                    raise HttpError(f"{method} {path}: {e}") from e
+                elapsed = time.perf_counter() - started
+            except BaseException:
+                # Timeouts cancel mid-response; never hand such a connection back
+                connection.close()
+                raise
+
+            connection.requests += 1
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection.close()
+            return HttpResponse(status, response_headers, response_body, ttfb, elapsed)
+
+        raise HttpError(f"{method} {path}: connection lost")
+
+    def _encode(self, method: str, path: str, headers: Dict[str, str], body: Optional[bytes]) -> bytes:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host_header}", "Connection: keep-alive"]
+        names = {name.lower() for name in headers}
+        if "accept" not in names:
+            lines.append("Accept: */*")
+        if body is not None and "content-length" not in names:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (body or b"")
+
+    async def _read_response(self, reader: asyncio.StreamReader, status_line: bytes,
+                             method: str) -> Tuple[int, Dict[str, str], bytes, bool]:
+        parts = status_line.decode('latin-1').split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ValueError(f"malformed status line {status_line!r}")
+        version, status = parts[0], int(parts[1])
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            name = name.strip().lower()
+            value = value.strip()
+            # Repeated headers (set-cookie) are joined the way HTTP allows
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        connection_header = headers.get("connection", "").lower()
+        keep_alive = "close" not in connection_header and (version != "HTTP/1.0" or "keep-alive" in connection_header)
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            return status, headers, b"", keep_alive
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            return status, headers, await self._read_chunked(reader), keep_alive
+        if "content-length" in headers:
+            return status, headers, await reader.readexactly(int(headers["content-length"])), keep_alive
+        # No framing: the body runs to the end of the connection
+        return status, headers, await reader.read(), False
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                # Trailers end with a blank line
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
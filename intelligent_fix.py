@@ -6,6 +6,8 @@ import subprocess
 import re
 from pathlib import Path
 
+from bracket_index import BracketIndex
+
 def get_eslint_errors():
     """Run ESLint and parse errors"""
     result = subprocess.run(
@@ -71,14 +73,10 @@ def fix_error(filepath, line_num, error_msg):
         if line.strip() == '});':
             # Check if this should be here
             # Count braces in previous lines
-            open_count = 0
-            close_count = 0
-            for i in range(max(0, line_num - 50), line_num - 1):
-                open_count += lines[i].count('{') + lines[i].count('(')
-                close_count += lines[i].count('}') + lines[i].count(')')
+            counts = BracketIndex(''.join(lines)).counts_between(max(0, line_num - 50), line_num - 2)
 
             # If balanced, this }); might be extra
-            if open_count <= close_count:
+            if counts.brace + counts.paren <= 0:
                 line = ''  # Remove the line
 
     elif "Expression expected" in error_msg:
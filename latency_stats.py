@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Latency Statistics
+HDR-style log-linear latency histogram with percentile queries, plus the
+baseline comparison and latency budget checks used by the route tester.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+# 2^7 sub-buckets per power of two: values below 128 us are exact, larger
+# ones are kept to within 1/64 (~1.6%) of their true value
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+PERCENTILES = [50, 90, 99]
+
+def bucket_index(value_us: int) -> int:
+    """Histogram bucket holding a value in microseconds"""
+    if value_us < SUB_BUCKET_COUNT:
+        return value_us
+    shift = value_us.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + ((value_us >> shift) - SUB_BUCKET_HALF)
+
+def bucket_bounds(index: int):
+    """(lowest, highest) microsecond values that land in a bucket"""
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    shift = (index - SUB_BUCKET_COUNT) // SUB_BUCKET_HALF + 1
+    top = (index - SUB_BUCKET_COUNT) % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+    return top << shift, ((top + 1) << shift) - 1
+
+class LatencyHistogram:
+    """Sparse log-linear histogram of latencies, recorded in seconds"""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    def record(self, seconds: float):
+        value_us = max(0, int(round(seconds * 1e6)))
+        index = bucket_index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: 'LatencyHistogram'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percent: float) -> float:
+        """
+        Latency in milliseconds at or below which percent of samples fall.
+        Like HDR histograms this reports the top of the matching bucket,
+        capped at the largest value recorded.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        """Percentiles, min, mean and max in milliseconds"""
+        result = {f"p{p}": round(self.percentile(p), 3) for p in PERCENTILES}
+        result["min"] = round((self.min_us or 0) / 1000, 3)
+        result["mean"] = round(self.total_us / self.count / 1000, 3) if self.count else 0.0
+        result["max"] = round(self.max_us / 1000, 3)
+        return result
+
+    def to_dict(self) -> Dict:
+        """JSON form: summary plus bucket counts keyed by the bucket's lowest value in us"""
+        return {
+            "count": self.count,
+            "latency_ms": self.summary(),
+            "histogram_us": {str(bucket_bounds(index)[0]): self.counts[index] for index in sorted(self.counts)},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls()
+        for lowest, count in data.get("histogram_us", {}).items():
+            index = bucket_index(int(lowest))
+            histogram.counts[index] = histogram.counts.get(index, 0) + count
+            histogram.count += count
+        summary = data.get("latency_ms", {})
+        histogram.min_us = int(summary.get("min", 0) * 1000) if histogram.count else None
+        histogram.max_us = int(summary.get("max", 0) * 1000)
+        histogram.total_us = int(summary.get("mean", 0) * 1000 * histogram.count)
+        return histogram
+
+    def bars(self, width: int = 40, rows: int = 12) -> List[str]:
+        """Text histogram, buckets merged into at most `rows` log-spaced rows"""
+        if not self.count:
+            return []
+        indices = sorted(self.counts)
+        lowest = max(1, bucket_bounds(indices[0])[0])
+        highest = max(lowest + 1, bucket_bounds(indices[-1])[1])
+        ratio = (highest / lowest) ** (1 / rows)
+        edges = [lowest * ratio ** i for i in range(rows + 1)]
+        totals = [0] * rows
+        for index in indices:
+            value = bucket_bounds(index)[0]
+            row = min(rows - 1, max(0, int(math.log(max(value, lowest) / lowest, ratio)) if ratio > 1 else 0))
+            totals[row] += self.counts[index]
+        peak = max(totals)
+        return [f"{edges[i] / 1000:>10.2f} ms |{'#' * max(1 if totals[i] else 0, round(width * totals[i] / peak)):<{width}}| {totals[i]}"
+                for i in range(rows) if totals[i]]
+
+class Regression(NamedTuple):
+    route: str
+    baseline_p90: float
+    current_p90: float
+
+    @property
+    def change(self) -> float:
+        return (self.current_p90 - self.baseline_p90) / self.baseline_p90 if self.baseline_p90 else math.inf
+
+def load_results(path: Path) -> Dict[str, Dict]:
+    """Per-route entries of a results JSON written by the route tester"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get("routes", {})
+
+def find_regressions(current: Dict[str, Dict], baseline: Dict[str, Dict],
+                     threshold: float, min_delta_ms: float = 0.0) -> List[Regression]:
+    """
+    Routes whose p90 grew by more than threshold (a fraction, 0.2 = 20%) and
+    by at least min_delta_ms over the baseline. Routes missing from either
+    side, or without samples, are not compared.
+    """
+    regressions = []
+    for route, entry in current.items():
+        base = baseline.get(route)
+        if not base or not entry.get("count") or not base.get("count"):
+            continue
+        base_p90 = base["latency_ms"]["p90"]
+        current_p90 = entry["latency_ms"]["p90"]
+        if current_p90 > base_p90 * (1 + threshold) and current_p90 - base_p90 >= min_delta_ms:
+            regressions.append(Regression(route, base_p90, current_p90))
+    return sorted(regressions, key=lambda r: -r.change)
+
+class BudgetViolation(NamedTuple):
+    route: str
+    metric: str
+    budget_ms: float
+    actual_ms: float
+
+def load_budgets(path: Path) -> Dict[str, Dict[str, float]]:
+    """
+    Latency budgets in milliseconds, keyed by "METHOD /path", "/path" (any
+    method) or "default". A bare number is a p90 budget; an object may set
+    any of p50, p90, p99, max and mean.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    return {key: ({"p90": float(value)} if isinstance(value, (int, float)) else
+                  {metric: float(limit) for metric, limit in value.items()})
+            for key, value in raw.items()}
+
+def budget_for(route: str, budgets: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Most specific budget for a "METHOD /path" route key"""
+    path = route.split(" ", 1)[-1]
+    return budgets.get(route) or budgets.get(path) or budgets.get("default", {})
+
+def check_budgets(results: Dict[str, Dict], budgets: Dict[str, Dict[str, float]]) -> List[BudgetViolation]:
+    violations = []
+    for route, entry in results.items():
+        if not entry.get("count"):
+            continue
+        for metric, limit in budget_for(route, budgets).items():
+            actual = entry["latency_ms"].get(metric)
+            if actual is not None and actual > limit:
+                violations.append(BudgetViolation(route, metric, limit, actual))
+    return violations
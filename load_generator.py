@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Open-Loop Load Generator
+Drives a target request rate with Poisson arrivals over a weighted route mix
+for a fixed duration. Arrival times are drawn up front and every request is
+sent at its scheduled time whether or not earlier ones have finished, so a
+slow server faces a growing backlog instead of a politely slowed client
+(no coordinated omission). Latency is measured from the scheduled send time,
+so time spent waiting for a free connection counts against the server.
+"""
+
+import asyncio
+import bisect
+import json
+import random
+import time
+from itertools import accumulate
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from latency_stats import LatencyHistogram
+
+# How late the scheduler may fire before the generator itself is the bottleneck
+SCHEDULER_LAG_WARNING = 0.025
+
+Route = Tuple[str, str, str]
+Outcome = Tuple[bool, int, str, float]
+
+class RouteLoad:
+    """Counters and latency for one route under load"""
+
+    def __init__(self, route: Route):
+        self.route = route
+        self.sent = 0
+        self.completed = 0
+        self.errors = 0
+        self.unfinished = 0
+        self.statuses: Dict[int, int] = {}
+        self.first_error = ""
+        # From scheduled send time to the end of the response
+        self.latency = LatencyHistogram()
+        # From the request hitting the wire to the end of the response
+        self.service = LatencyHistogram()
+
+    def record(self, outcome: Outcome, latency: float):
+        success, status, message, seconds = outcome[:4]
+        self.completed += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not success:
+            self.errors += 1
+            self.first_error = self.first_error or message
+        if status:
+            self.latency.record(latency)
+            self.service.record(seconds)
+
+    def record_unfinished(self, latency: float):
+        """
+        A request still outstanding when the run ended. It counts as an error
+        and its wait so far goes into the latency histogram as a lower bound;
+        dropping it would hide exactly the slowest requests.
+        """
+        self.unfinished += 1
+        self.errors += 1
+        self.first_error = self.first_error or "Unfinished at end of run"
+        self.latency.record(latency)
+
+class LoadReport(NamedTuple):
+    rate: float
+    duration: float
+    elapsed: float
+    routes: List[RouteLoad]
+    max_lag: float
+    late: int
+    unfinished: int
+
+    @property
+    def sent(self) -> int:
+        return sum(r.sent for r in self.routes)
+
+    @property
+    def completed(self) -> int:
+        return sum(r.completed for r in self.routes)
+
+    @property
+    def errors(self) -> int:
+        return sum(r.errors for r in self.routes)
+
+    def total_latency(self) -> LatencyHistogram:
+        total = LatencyHistogram()
+        for route in self.routes:
+            total.merge(route.latency)
+        return total
+
+class WeightedMix:
+    """Routes picked at random in proportion to their weights"""
+
+    def __init__(self, weighted: List[Tuple[Route, float]]):
+        weighted = [(route, weight) for route, weight in weighted if weight > 0]
+        if not weighted:
+            raise ValueError("Route mix has no route with a positive weight")
+        self.routes = [route for route, _ in weighted]
+        self.weights = [weight for _, weight in weighted]
+        self._cumulative = list(accumulate(self.weights))
+
+    def pick(self, rng: random.Random) -> int:
+        """Index into self.routes"""
+        return bisect.bisect_right(self._cumulative, rng.random() * self._cumulative[-1])
+
+def load_mix(path: Path, routes: List[Route]) -> List[Tuple[Route, float]]:
+    """
+    Route weights from a JSON object keyed by "METHOD /path" or "/path" (GET).
+    Keys that are not among routes are added with the key as description.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    known = {(method, path): (method, path, description) for method, path, description in routes}
+    weighted = []
+    for key, weight in raw.items():
+        method, _, path = key.partition(' ') if ' ' in key else ("GET", "", key)
+        route = known.get((method.upper(), path), (method.upper(), path, key))
+        weighted.append((route, float(weight)))
+    return weighted
+
+def poisson_schedule(rate: float, duration: float, rng: random.Random) -> List[float]:
+    """Send offsets in seconds for a Poisson process of `rate` per second"""
+    offsets = []
+    t = rng.expovariate(rate)
+    while t < duration:
+        offsets.append(t)
+        t += rng.expovariate(rate)
+    return offsets
+
+async def run_open_loop(send: Callable[[Route], Awaitable[Outcome]], mix: WeightedMix,
+                        rate: float, duration: float, drain_timeout: float = 10.0,
+                        seed: Optional[int] = None) -> LoadReport:
+    """
+    Fire send(route) at Poisson arrival times for duration seconds, then wait
+    up to drain_timeout for requests still in flight. send must not raise;
+    it reports failures in its outcome like test_route_async does.
+    """
+    rng = random.Random(seed)
+    offsets = poisson_schedule(rate, duration, rng)
+    picks = [mix.pick(rng) for _ in offsets]
+    loads = [RouteLoad(route) for route in mix.routes]
+    tasks: Dict[asyncio.Task, Tuple[int, float]] = {}
+    max_lag = 0.0
+    late = 0
+
+    async def fire(index: int, intended: float):
+        outcome = await send(mix.routes[index])
+        loads[index].record(outcome, time.perf_counter() - intended)
+
+    started = time.perf_counter()
+    for offset, index in zip(offsets, picks):
+        intended = started + offset
+        delay = intended - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lag = time.perf_counter() - intended
+        max_lag = max(max_lag, lag)
+        late += lag > SCHEDULER_LAG_WARNING
+        loads[index].sent += 1
+        task = asyncio.create_task(fire(index, intended))
+        tasks[task] = (index, intended)
+        task.add_done_callback(tasks.pop)
+
+    unfinished = 0
+    if tasks:
+        _, pending = await asyncio.wait(set(tasks), timeout=drain_timeout)
+        unfinished = len(pending)
+        now = time.perf_counter()
+        for task in pending:
+            index, intended = tasks[task]
+            loads[index].record_unfinished(now - intended)
+            task.cancel()
+    elapsed = time.perf_counter() - started
+    return LoadReport(rate, duration, elapsed, loads, max_lag, late, unfinished)
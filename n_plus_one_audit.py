@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+N+1 Query Audit
+Finds Prisma calls that run once per element: calls lexically inside a
+for / while / do loop body or inside a .map / .forEach / ... callback. The
+loop that matters is the innermost one around the call; callbacks under
+Promise.all (and forEach(async ...), whose promises nobody awaits) run
+concurrently rather than one round trip after another, which is noted.
+
+The mechanical case, a per-key findUnique directly in a for...of body,
+
+    for (const item of items) {
+      const variant = await prisma.productVariant.findUnique({ where: { id: item.variant_id } });
+
+gets a rewrite to one findMany over all the keys plus a Map lookup:
+
+    const variantKeys = items
+      .map(item => item.variant_id)
+      .filter((value): value is NonNullable<typeof value> => value != null);
+    const variantRows = await prisma.productVariant.findMany({ where: { id: { in: variantKeys } } });
+    const variantById = new Map(variantRows.map(row => [row.id, row] as const));
+    for (const item of items) {
+      const variant = item.variant_id == null ? null : variantById.get(item.variant_id) ?? null;
+
+Null keys are left out of the prefetch and resolve to null in the loop.
+
+Rewrites are shown with --diff and only written with --apply.
+"""
+
+import argparse
+import json
+import re
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bracket_index import BracketIndex
+from edit_buffer import EditBuffer, unified_diff
+from prisma_calls import (PrismaCall, call_argument_object, find_handlers, find_prisma_calls, handler_for,
+                          object_properties)
+from route_fix_cache import cache_key
+from route_tree import API_DIR, find_route_files, map_route_files
+
+LOOP_KEYWORD = re.compile(r'\b(?:(for)\s*(await\s*)?\(|(while)\s*\(|(do)\s*\{)')
+ITERATOR_CALL = re.compile(r'\.\s*(map|forEach|flatMap|reduce|filter|some|every|find)\s*\(')
+PROMISE_ALL = re.compile(r'\bPromise\s*\.\s*(?:all|allSettled)\s*\(')
+FOR_OF_HEAD = re.compile(r'^\s*(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s+of\s+(.+?)\s*$', re.DOTALL)
+FOR_IN_HEAD = re.compile(r'^\s*(?:const|let|var)\s+\S+\s+in\s+', re.DOTALL)
+IDENTIFIER_CHAIN = r'[A-Za-z_$][\w$]*(?:\??\.[A-Za-z_$][\w$]*)*'
+AWAITED_BINDING = re.compile(r'\b(const|let)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(await)\s*$')
+
+class Loop(NamedTuple):
+    kind: str
+    start: int
+    body_start: int
+    body_end: int
+    line: int
+    # Iterations run side by side (Promise.all / forEach callbacks), not in sequence
+    concurrent: bool
+    # for (const <variable> of <iterable>) with a plain identifier binding
+    variable: Optional[str] = None
+    iterable: Optional[str] = None
+
+class LoopQuery(NamedTuple):
+    file: str
+    line: int
+    call: str
+    model: Optional[str]
+    operation: str
+    loop_kind: str
+    loop_line: int
+    method: str
+    concurrent: bool
+    # Why the batched rewrite does not apply, or "" when it does
+    rewrite: str
+
+    def to_dict(self) -> Dict:
+        return {**self._asdict(), "rewrite": self.rewrite or "batched findMany"}
+
+def _statement_end(content: str, index: BracketIndex, i: int) -> int:
+    """End of the single statement starting at i (a loop body without braces)"""
+    while i < len(content):
+        ch = content[i]
+        if ch in '({[' and index.in_code(i) and index.matching(i) is not None:
+            i = index.matching(i) + 1
+        elif ch == ';' and index.in_code(i):
+            return i + 1
+        elif ch in ')}]' and index.in_code(i):
+            return i
+        else:
+            i += 1
+    return i
+
+def find_loops(content: str, index: BracketIndex) -> List[Loop]:
+    """Every loop and iteration callback in the file, in file order"""
+    loops = []
+    concurrent_spans = [(m.end() - 1, index.matching(m.end() - 1)) for m in PROMISE_ALL.finditer(content)
+                        if index.in_code(m.start()) and index.matching(m.end() - 1) is not None]
+
+    for match in LOOP_KEYWORD.finditer(content):
+        if not index.in_code(match.start()):
+            continue
+        line = index.line_of(match.start()) + 1
+        if match.group(4):
+            brace = match.end() - 1
+            if index.matching(brace) is not None:
+                loops.append(Loop("do...while", match.start(), brace, index.matching(brace), line, False))
+            continue
+        head_open = match.end() - 1
+        head_close = index.matching(head_open)
+        if head_close is None:
+            continue
+        body = head_close + 1
+        while body < len(content) and content[body].isspace():
+            body += 1
+        if content.startswith(';', body):
+            # The while (...) closing a do...while, or an empty loop
+            continue
+        body_end = index.matching(body) if content.startswith('{', body) else None
+        if body_end is None:
+            body_end = _statement_end(content, index, body)
+        head = content[head_open + 1:head_close]
+        variable = iterable = None
+        if match.group(3):
+            kind = "while"
+        elif FOR_OF_HEAD.match(head):
+            kind = "for await...of" if match.group(2) else "for...of"
+            variable, iterable = FOR_OF_HEAD.match(head).groups()
+        elif FOR_IN_HEAD.match(head):
+            kind = "for...in"
+        else:
+            kind = "for"
+        loops.append(Loop(kind, match.start(), body, body_end, line, False, variable, iterable))
+
+    for match in ITERATOR_CALL.finditer(content):
+        if not index.in_code(match.start()):
+            continue
+        open_paren = match.end() - 1
+        close = index.matching(open_paren)
+        if close is None:
+            continue
+        callback = content[open_paren + 1:close].lstrip()
+        if '=>' not in callback and not callback.startswith(('function', 'async function')):
+            continue
+        is_async = callback.startswith('async')
+        name = match.group(1)
+        concurrent = (name == "forEach" and is_async) or \
+            any(start < match.start() < end for start, end in concurrent_spans)
+        loops.append(Loop(f"{name}(async)" if is_async else name, match.start(), open_paren, close,
+                          index.line_of(match.start()) + 1, concurrent))
+
+    loops.sort(key=lambda loop: loop.body_start)
+    return loops
+
+def innermost_loop(loops: List[Loop], offset: int) -> Optional[Loop]:
+    enclosing = [loop for loop in loops if loop.body_start < offset < loop.body_end]
+    return max(enclosing, key=lambda loop: loop.body_start) if enclosing else None
+
+def _pascal(name: str) -> str:
+    return ''.join(part[:1].upper() + part[1:] for part in re.split(r'[_\W]+', name) if part)
+
+class BatchRewrite(NamedTuple):
+    # Statements to put before the loop
+    prefetch: str
+    # (start, end, replacement) for the awaited findUnique
+    lookup: Tuple[int, int, str]
+
+def destructured_from(content: str, loop: Loop, before: int, name: str) -> Optional[str]:
+    """
+    loop.variable.<field> when name was destructured from the loop variable
+    earlier in the body (const { material_id, quantity } = material;)
+    """
+    pattern = re.compile(r'\b(?:const|let)\s*\{([^{}]*)\}\s*=\s*' + re.escape(loop.variable) + r'\s*;')
+    for match in pattern.finditer(content, loop.body_start, before):
+        for part in match.group(1).split(','):
+            field, _, alias = (piece.strip() for piece in part.partition(':'))
+            if (alias or field).split('=')[0].strip() == name and re.fullmatch(r'[A-Za-z_$][\w$]*', field):
+                return f"{loop.variable}.{field}"
+    return None
+
+def batch_rewrite(content: str, index: BracketIndex, call: PrismaCall, loop: Loop,
+                  calls: List[PrismaCall]) -> Tuple[Optional[BatchRewrite], str]:
+    """
+    The findMany + Map rewrite for a call, or None and the reason it does not
+    apply. calls are the file's Prisma calls: a loop that also writes the
+    model would read its own writes, which prefetched rows cannot reflect.
+    """
+    if call.operation != "findUnique":
+        return None, f"{call.operation} is not a per-key lookup"
+    if loop.kind != "for...of" or not loop.variable:
+        return None, f"only for...of loops are rewritten, not {loop.kind}"
+    if not re.fullmatch(IDENTIFIER_CHAIN, loop.iterable or ""):
+        return None, "the iterable is an expression, not a variable"
+    if not content.startswith('{', loop.body_start):
+        return None, "the loop body is not a block"
+    if index.depth_at(call.start) != index.depth_at(loop.body_start + 1):
+        return None, "the call is nested below the loop body"
+    if any(other.writes and other.model == call.model and loop.body_start < other.start < loop.body_end
+           for other in calls):
+        return None, f"the loop also writes {call.model}"
+    statement_start = content.rfind('\n', 0, call.start) + 1
+    binding = AWAITED_BINDING.search(content, statement_start, call.start)
+    if not binding:
+        return None, "the result is not bound with const/let = await"
+    arguments = call_argument_object(content, index, call)
+    if not arguments or "where" not in arguments or set(arguments) - {"where", "select", "include"}:
+        return None, "arguments other than where/select/include"
+    where_start, _ = arguments["where"]
+    where = object_properties(content, index, where_start)
+    if not where or len(where) != 1:
+        return None, "where is not a single key"
+    (key, (value_start, value_end)), = where.items()
+    key_expr = content[value_start:value_end]
+    # The key as computed from the loop variable alone, for the prefetch
+    element_key = key_expr
+    if not re.fullmatch(re.escape(loop.variable) + r'(?:\??\.[A-Za-z_$][\w$]*)*', key_expr):
+        element_key = destructured_from(content, loop, call.start, key_expr)
+        if element_key is None:
+            return None, f"the key is not read from {loop.variable}"
+    if "select" in arguments:
+        selected = object_properties(content, index, arguments["select"][0])
+        if selected is None or key not in selected:
+            return None, f"select does not include {key}"
+
+    name = binding.group(2)
+    keys, rows, lookup = f"{name}Keys", f"{name}Rows", f"{name}By{_pascal(key)}"
+    taken = [identifier for identifier in (keys, rows, lookup) if re.search(rf'\b{identifier}\b', content)]
+    if taken:
+        return None, f"{taken[0]} is already defined"
+
+    loop_line_start = content.rfind('\n', 0, loop.start) + 1
+    indent = re.match(r'[ \t]*', content[loop_line_start:]).group(0)
+    extra = ''.join(f"{indent}  {prop}: {content[start:end]},\n"
+                    for prop, (start, end) in arguments.items() if prop != "where")
+    # An optional key is null on some elements: findUnique rejected those one at a time, but { in }
+    # rejects the whole list, and a Map keyed by the non-null type will not take them in get()
+    present = "(value): value is NonNullable<typeof value> => value != null"
+    keys_line = f"{indent}const {keys} = {loop.iterable}.map({loop.variable} => {element_key}).filter({present});"
+    if len(keys_line) > 80:
+        keys_line = (f"{indent}const {keys} = {loop.iterable}\n"
+                     f"{indent}  .map({loop.variable} => {element_key})\n"
+                     f"{indent}  .filter({present});")
+    prefetch = (f"{keys_line}\n"
+                f"{indent}const {rows} = await {call.client}.{call.model}.findMany({{\n"
+                f"{indent}  where: {{ {key}: {{ in: {keys} }} }},\n"
+                f"{extra}"
+                f"{indent}}});\n"
+                f"{indent}const {lookup} = new Map({rows}.map(row => [row.{key}, row] as const));\n")
+    lookup_expr = f"{key_expr} == null ? null : {lookup}.get({key_expr}) ?? null"
+    return BatchRewrite(prefetch, (binding.start(3), call.close + 1, lookup_expr)), ""
+
+def audit_content(content: str, relative: str) -> Tuple[List[LoopQuery], EditBuffer]:
+    """Findings for one file, and the buffer holding the rewrites that apply"""
+    index = BracketIndex(content)
+    loops = find_loops(content, index)
+    handlers = find_handlers(content, index)
+    buffer = EditBuffer(content)
+    prefetches: Dict[int, List[str]] = {}
+    findings = []
+    calls = find_prisma_calls(content, index)
+    for call in calls:
+        loop = innermost_loop(loops, call.start)
+        if loop is None:
+            continue
+        rewrite, reason = batch_rewrite(content, index, call, loop, calls)
+        if rewrite:
+            start, end, replacement = rewrite.lookup
+            buffer.add(start, end, replacement, "n_plus_one:batch_find_unique")
+            # Several lookups in one loop share one insertion point
+            prefetches.setdefault(content.rfind('\n', 0, loop.start) + 1, []).append(rewrite.prefetch)
+        handler = handler_for(handlers, call.start)
+        findings.append(LoopQuery(relative, call.line, call.label, call.model, call.operation, loop.kind,
+                                  loop.line, handler.method if handler else "-", loop.concurrent, reason))
+    for offset, texts in prefetches.items():
+        buffer.add(offset, offset, ''.join(texts), "n_plus_one:batch_find_unique")
+    return findings, buffer
+
+def audit_worker(api_dir: Path, apply: bool, diff: bool, filepath: str):
+    """
+    Pool entry point for one route file.
+    Returns (findings, diff_lines) and writes the rewrites when apply is set.
+    """
+    path = Path(filepath)
+    content = path.read_text(encoding='utf-8')
+    findings, buffer = audit_content(content, path.relative_to(api_dir).as_posix())
+    diff_lines: List[str] = []
+    if len(buffer) and (apply or diff):
+        edits = buffer.resolve()
+        if diff:
+            diff_lines = unified_diff(content, edits, cache_key(path))
+        if apply:
+            path.write_text(buffer.apply(), encoding='utf-8')
+    return findings, diff_lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Find Prisma calls made once per loop iteration")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    parser.add_argument("--diff", action="store_true", help="Show the batched findMany rewrites as a diff")
+    parser.add_argument("--apply", action="store_true", help="Write the batched findMany rewrites")
+    parser.add_argument("--json", type=Path, metavar="FILE", help="Write the findings as JSON")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+
+    route_files = find_route_files(args.api_dir)
+    worker = partial(audit_worker, args.api_dir, args.apply, args.diff)
+
+    print("=" * 80)
+    print(" N+1 QUERY AUDIT")
+    print("=" * 80)
+    findings: List[LoopQuery] = []
+    for file_findings, diff_lines in map_route_files(worker, route_files, args.jobs):
+        for finding in file_findings:
+            tags = [finding.method] + (["concurrent"] if finding.concurrent else [])
+            fix = " -> batched findMany" if not finding.rewrite else ""
+            print(f"[N+1] {finding.file}:{finding.line} {finding.call} in {finding.loop_kind} "
+                  f"(line {finding.loop_line}) [{', '.join(tags)}]{fix}")
+        if diff_lines:
+            print(''.join(diff_lines), end='')
+        findings.extend(file_findings)
+
+    print("\n" + "=" * 80)
+    print(" SUMMARY")
+    print("=" * 80)
+    files = {finding.file for finding in findings}
+    sequential = [finding for finding in findings if not finding.concurrent]
+    print(f"Route files scanned: {len(route_files)}")
+    print(f"Prisma calls inside loops: {len(findings)} in {len(files)} files "
+          f"({len(sequential)} sequential, {len(findings) - len(sequential)} concurrent)")
+    for title, field in (("By loop kind", "loop_kind"), ("By model", "model")):
+        counts: Dict[str, int] = {}
+        for finding in findings:
+            value = getattr(finding, field) or "(raw SQL)"
+            counts[value] = counts.get(value, 0) + 1
+        print(f"\n{title}:")
+        for value, count in sorted(counts.items(), key=lambda x: (-x[1], x[0]))[:15]:
+            print(f"  {count:3d}x {value}")
+    rewritable = [finding for finding in findings if not finding.rewrite]
+    print(f"\nBatched findMany rewrites available: {len(rewritable)}"
+          + (" (written)" if args.apply and rewritable else ""))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([finding.to_dict() for finding in findings], f, indent=2)
+        print(f"Findings written to {args.json}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Sequential Await Audit
+Finds runs of Prisma reads awaited one after another where no call uses
+what an earlier one returned, e.g.
+
+    const totalOrders = await prisma.order.count({ where });
+    const totalClients = await prisma.client.count({ where });
+
+Each await is a full database round trip, so the handler's latency is the
+sum of them. A run is statements directly following each other (only blank
+lines and comments in between) of the form const|let <binding> = await
+<read>; a statement whose arguments mention a binding from the current run
+starts a new one. Transaction clients (tx, trx) are left out: an
+interactive transaction runs its queries on one connection in turn anyway.
+
+With --apply (or --diff to preview) each run becomes one destructured
+Promise.all, which costs a single round trip of the slowest query:
+
+    const [totalOrders, totalClients] = await Promise.all([
+      prisma.order.count({ where }),
+      prisma.client.count({ where }),
+    ]);
+"""
+
+import argparse
+import json
+import re
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bracket_index import BracketIndex
+from edit_buffer import EditBuffer, unified_diff
+from prisma_calls import PrismaCall, READ_OPERATIONS, find_handlers, find_prisma_calls, handler_for
+from route_fix_cache import cache_key
+from route_tree import API_DIR, find_route_files, map_route_files
+
+# Clients whose queries can run side by side
+PARALLEL_CLIENTS = ('prisma', 'db', 'prismaRaw')
+PARALLEL_OPERATIONS = READ_OPERATIONS + ('$queryRaw', '$queryRawUnsafe')
+PRINT_WIDTH = 80
+
+# const total = await | const { _sum } = await | let [first] = await, on the call's own line
+AWAITED_STATEMENT = re.compile(
+    r'^([ \t]*)(const|let)\s+([A-Za-z_$][\w$]*|\{[^{}\n]*\}|\[[^\[\]\n]*\])\s*=\s*await\s+$')
+STATEMENT_TAIL = re.compile(r'[ \t]*;?[ \t]*(?=\n|$)')
+TOP_LEVEL_FUNCTION = re.compile(
+    r'^(?:export\s+)?(?:(?:async\s+)?function\s+([A-Za-z_$][\w$]*)|const\s+([A-Za-z_$][\w$]*)\s*=)',
+    re.MULTILINE)
+
+class AwaitedRead(NamedTuple):
+    call: PrismaCall
+    # From the start of the statement's line to just past its ;
+    start: int
+    end: int
+    indent: str
+    keyword: str
+    pattern: str
+    names: Tuple[str, ...]
+    # Lines between this statement and the previous one: comments, "" for a blank line
+    comments: Tuple[str, ...] = ()
+
+class SequentialRun(NamedTuple):
+    file: str
+    line: int
+    handler: str
+    calls: List[str]
+
+    @property
+    def saved(self) -> int:
+        return len(self.calls) - 1
+
+    def to_dict(self) -> Dict:
+        return {**self._asdict(), "round_trips": len(self.calls), "round_trips_saved": self.saved}
+
+def binding_names(pattern: str) -> Tuple[str, ...]:
+    """Names a binding pattern declares: total, { _sum, _count: counts } -> (_sum, counts)"""
+    if pattern[0] not in '{[':
+        return (pattern,)
+    names = []
+    for item in pattern[1:-1].split(','):
+        # { key: alias = fallback } declares alias; { key } declares key
+        target = item.split(':')[-1].split('=')[0].strip().lstrip('.')
+        if re.fullmatch(r'[A-Za-z_$][\w$]*', target):
+            names.append(target)
+    return tuple(names)
+
+def awaited_read(content: str, index: BracketIndex, call: PrismaCall) -> Optional[AwaitedRead]:
+    """The call as the whole right-hand side of a const/let declaration, if it is one"""
+    if not call.awaited or call.client not in PARALLEL_CLIENTS or call.operation not in PARALLEL_OPERATIONS:
+        return None
+    line_start = content.rfind('\n', 0, call.start) + 1
+    head = AWAITED_STATEMENT.match(content[line_start:call.start])
+    tail = STATEMENT_TAIL.match(content, call.close + 1)
+    if not head or not tail:
+        return None
+    return AwaitedRead(call, line_start, tail.end(), head.group(1), head.group(2), head.group(3),
+                       binding_names(head.group(3)))
+
+def comment_lines(content: str, index: BracketIndex, start: int, end: int) -> Optional[Tuple[str, ...]]:
+    """The comment lines in content[start:end], led by "" if a blank line separates them; None if it holds code"""
+    lines = []
+    for line in content[start:end].split('\n')[1:-1]:
+        text = line.strip()
+        if text and not text.startswith(('//', '/*', '*')):
+            return None
+        if text:
+            lines.append(text)
+        elif not lines:
+            lines = [""]
+    at = start
+    while at < end and content[at].isspace():
+        at += 1
+    # A /* ... */ that opened in code ends with */ inside a comment, never in code
+    if at < end and index.in_code(at) and not content.startswith(('//', '/*'), at):
+        return None
+    return tuple(lines)
+
+def find_runs(content: str, index: BracketIndex, calls: List[PrismaCall]) -> List[List[AwaitedRead]]:
+    """Groups of two or more adjacent, mutually independent awaited reads"""
+    runs: List[List[AwaitedRead]] = []
+    current: List[AwaitedRead] = []
+    for call in calls:
+        read = awaited_read(content, index, call)
+        if read is None:
+            continue
+        if current:
+            previous = current[-1]
+            between = comment_lines(content, index, previous.end, read.start)
+            arguments = content[call.open:call.close + 1]
+            bound = {name for member in current for name in member.names}
+            depends = any(re.search(rf'(?<![\w$.]){re.escape(name)}\b', arguments) for name in bound)
+            clashes = bool(bound & set(read.names))
+            if between is not None and read.keyword == previous.keyword and not depends and not clashes:
+                current.append(read._replace(comments=between))
+                continue
+            if len(current) > 1:
+                runs.append(current)
+        current = [read]
+    if len(current) > 1:
+        runs.append(current)
+    return runs
+
+def reindent(content: str, index: BracketIndex, start: int, end: int, extra: str) -> str:
+    """content[start:end] with extra added to every continuation line outside template text"""
+    lines = content[start:end].split('\n')
+    offset = start
+    for i, line in enumerate(lines):
+        if i and line.strip() and index.in_code(offset):
+            lines[i] = extra + line
+        offset += len(line) + 1
+    return '\n'.join(lines)
+
+def promise_all(content: str, index: BracketIndex, run: List[AwaitedRead]) -> str:
+    """The Promise.all statement replacing the run, formatted the way prettier would"""
+    indent, keyword = run[0].indent, run[0].keyword
+    inner = indent + "  "
+    header = f"{indent}{keyword} [{', '.join(read.pattern for read in run)}] = await Promise.all(["
+    if len(header) > PRINT_WIDTH:
+        header = (f"{indent}{keyword} [\n" + ''.join(f"{inner}{read.pattern},\n" for read in run)
+                  + f"{indent}] = await Promise.all([")
+    elements = []
+    for read in run:
+        elements.extend(f"{inner}{comment}" if comment else "" for comment in read.comments)
+        elements.append(inner + reindent(content, index, read.call.start, read.call.close + 1, "  ") + ",")
+    return '\n'.join([header] + elements + [f"{indent}]);"])
+
+def function_name(content: str, handlers, offset: int) -> str:
+    """The handler's method, or the name of the module-level function around offset"""
+    handler = handler_for(handlers, offset)
+    if handler:
+        return handler.method
+    name = "-"
+    for match in TOP_LEVEL_FUNCTION.finditer(content, 0, offset):
+        name = match.group(1) or match.group(2)
+    return name
+
+def audit_content(content: str, relative: str) -> Tuple[List[SequentialRun], EditBuffer]:
+    """Runs found in one file, and the buffer holding their Promise.all rewrites"""
+    index = BracketIndex(content)
+    handlers = find_handlers(content, index)
+    buffer = EditBuffer(content)
+    findings = []
+    for run in find_runs(content, index, find_prisma_calls(content, index)):
+        findings.append(SequentialRun(relative, run[0].call.line, function_name(content, handlers, run[0].start),
+                                      [read.call.label for read in run]))
+        buffer.add(run[0].start, run[-1].end, promise_all(content, index, run), "parallel:promise-all")
+    return findings, buffer
+
+def audit_worker(api_dir: Path, apply: bool, diff: bool, filepath: str):
+    """
+    Pool entry point for one route file.
+    Returns (findings, diff_lines) and writes the rewrites when apply is set.
+    """
+    path = Path(filepath)
+    content = path.read_text(encoding='utf-8')
+    findings, buffer = audit_content(content, path.relative_to(api_dir).as_posix())
+    diff_lines: List[str] = []
+    if len(buffer) and (apply or diff):
+        edits = buffer.resolve()
+        if diff:
+            diff_lines = unified_diff(content, edits, cache_key(path))
+        if apply:
+            path.write_text(buffer.apply(), encoding='utf-8')
+    return findings, diff_lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Find independent Prisma reads awaited one after another")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    parser.add_argument("--diff", action="store_true", help="Show the Promise.all rewrites as a diff")
+    parser.add_argument("--apply", action="store_true", help="Write the Promise.all rewrites")
+    parser.add_argument("--round-trip-ms", type=float, default=0.0,
+                        help="Typical query round trip in ms, to express the saving as time")
+    parser.add_argument("--json", type=Path, metavar="FILE", help="Write the findings as JSON")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+
+    route_files = find_route_files(args.api_dir)
+    worker = partial(audit_worker, args.api_dir, args.apply, args.diff)
+
+    print("=" * 80)
+    print(" SEQUENTIAL AWAIT AUDIT")
+    print("=" * 80)
+    findings: List[SequentialRun] = []
+    for file_findings, diff_lines in map_route_files(worker, route_files, args.jobs):
+        for finding in file_findings:
+            print(f"[SEQUENTIAL] {finding.file}:{finding.line} {finding.handler}: "
+                  f"{len(finding.calls)} awaits -> 1 ({', '.join(finding.calls)})")
+        if diff_lines:
+            print(''.join(diff_lines), end='')
+        findings.extend(file_findings)
+
+    print("\n" + "=" * 80)
+    print(" ROUND TRIPS SAVED PER HANDLER")
+    print("=" * 80)
+    per_handler: Dict[Tuple[str, str], List[SequentialRun]] = {}
+    for finding in findings:
+        per_handler.setdefault((finding.file, finding.handler), []).append(finding)
+    ranked = sorted(per_handler.items(), key=lambda item: (-sum(run.saved for run in item[1]), item[0]))
+    for (file, handler), runs in ranked:
+        before = sum(len(run.calls) for run in runs)
+        saved = sum(run.saved for run in runs)
+        time = f" (~{saved * args.round_trip_ms:g} ms)" if args.round_trip_ms else ""
+        print(f"  {saved:3d} saved{time}  {file} {handler}: {before} sequential awaits -> {before - saved}")
+
+    print("\n" + "=" * 80)
+    print(" SUMMARY")
+    print("=" * 80)
+    saved = sum(finding.saved for finding in findings)
+    print(f"Route files scanned: {len(route_files)}")
+    print(f"Sequential runs: {len(findings)} in {len(per_handler)} handlers "
+          f"({len({finding.file for finding in findings})} files)")
+    print(f"Round trips saved by Promise.all: {saved}"
+          + (f" (~{saved * args.round_trip_ms:g} ms over one call of each handler)" if args.round_trip_ms else "")
+          + (" (written)" if args.apply and findings else ""))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([finding.to_dict() for finding in findings], f, indent=2)
+        print(f"Findings written to {args.json}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
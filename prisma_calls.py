@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Prisma Call Index
+Finds the Prisma client calls in a route file (prisma.order.findMany(...),
+tx.stockLedger.create(...), db.$queryRaw`...`) together with the handler
+that makes them, on top of the BracketIndex scan so that calls inside
+strings and comments are ignored and argument lists are exact.
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from bracket_index import BracketIndex
+from route_discovery import HANDLER_EXPORT
+
+# Names the Prisma client goes by in the route files: the shared client from
+# lib/db (prisma, db, prismaRaw) and interactive transaction clients
+PRISMA_CLIENTS = ('prisma', 'db', 'prismaRaw', 'tx', 'trx')
+
+READ_OPERATIONS = ('findUnique', 'findUniqueOrThrow', 'findFirst', 'findFirstOrThrow', 'findMany',
+                   'count', 'aggregate', 'groupBy')
+WRITE_OPERATIONS = ('create', 'createMany', 'update', 'updateMany', 'upsert', 'delete', 'deleteMany')
+RAW_OPERATIONS = ('$queryRaw', '$queryRawUnsafe', '$executeRaw', '$executeRawUnsafe')
+
+MODEL_CALL = re.compile(
+    r'\b(' + '|'.join(PRISMA_CLIENTS) + r')\s*\.\s*([a-zA-Z]\w*)\s*\.\s*('
+    + '|'.join(READ_OPERATIONS + WRITE_OPERATIONS) + r')\s*\(')
+RAW_CALL = re.compile(
+    r'\b(' + '|'.join(PRISMA_CLIENTS) + r')\s*\.\s*(' + '|'.join(re.escape(op) for op in RAW_OPERATIONS)
+    + r')\s*(\(|`)')
+
+class PrismaCall(NamedTuple):
+    start: int
+    # Offsets of the argument list's ( and ), or of a tagged template's backticks
+    open: int
+    close: int
+    client: str
+    # None for raw SQL
+    model: Optional[str]
+    operation: str
+    line: int
+    awaited: bool
+
+    @property
+    def label(self) -> str:
+        return f"{self.client}.{self.model}.{self.operation}" if self.model else f"{self.client}.{self.operation}"
+
+    @property
+    def writes(self) -> bool:
+        return self.operation in WRITE_OPERATIONS or self.operation.startswith('$execute')
+
+class Handler(NamedTuple):
+    method: str
+    start: int
+    end: int
+
+def find_prisma_calls(content: str, index: Optional[BracketIndex] = None) -> List[PrismaCall]:
+    """Every Prisma client call in code, in file order"""
+    index = index or BracketIndex(content)
+    calls = []
+    for match in MODEL_CALL.finditer(content):
+        if not index.in_code(match.start()):
+            continue
+        open_paren = match.end() - 1
+        close = index.matching(open_paren)
+        if close is None:
+            continue
+        calls.append(PrismaCall(match.start(), open_paren, close, match.group(1), match.group(2),
+                                match.group(3), index.line_of(match.start()) + 1,
+                                _awaited(content, match.start())))
+    for match in RAW_CALL.finditer(content):
+        if not index.in_code(match.start()):
+            continue
+        open_at = match.end() - 1
+        if match.group(3) == '(':
+            close = index.matching(open_at)
+        else:
+            close = content.find('`', open_at + 1)
+        if close is None or close < 0:
+            continue
+        calls.append(PrismaCall(match.start(), open_at, close, match.group(1), None, match.group(2),
+                                index.line_of(match.start()) + 1, _awaited(content, match.start())))
+    calls.sort()
+    return calls
+
+def _awaited(content: str, start: int) -> bool:
+    return content[max(0, start - 12):start].rstrip().endswith('await')
+
+def _skip_space(content: str, i: int) -> int:
+    while i < len(content) and content[i].isspace():
+        i += 1
+    return i
+
+def _skip_comments(content: str, i: int, end: int) -> int:
+    """Offset of the first character in content[i:end] that is not whitespace or a comment"""
+    while i < end:
+        i = _skip_space(content, i)
+        if content.startswith('//', i):
+            newline = content.find('\n', i)
+            i = end if newline < 0 else newline
+        elif content.startswith('/*', i):
+            close = content.find('*/', i + 2)
+            i = end if close < 0 else close + 2
+        else:
+            break
+    return min(i, end)
+
+def _next_opener(content: str, index: BracketIndex, i: int) -> Optional[int]:
+    while i < len(content):
+        if content[i] in '({[' and index.in_code(i) and index.matching(i) is not None:
+            return i
+        i += 1
+    return None
+
+def statement_end(content: str, index: BracketIndex, start: int) -> int:
+    """
+    End of a handler definition starting at start: bracket groups are
+    followed while they chain on (=> body, : return type, .call, (args)),
+    which covers both export async function GET(...) { ... } and
+    export const GET = requireAuth(async (...) => { ... }).
+    """
+    i = start
+    while True:
+        opener = _next_opener(content, index, i)
+        if opener is None:
+            return len(content)
+        close = index.matching(opener)
+        after = _skip_space(content, close + 1)
+        if content.startswith(('=>', '{', '(', '.', ':'), after):
+            i = close + 1
+            continue
+        return close + 1
+
+def find_handlers(content: str, index: Optional[BracketIndex] = None) -> List[Handler]:
+    """Exported HTTP method handlers with the span of their definition"""
+    index = index or BracketIndex(content)
+    handlers = []
+    for match in HANDLER_EXPORT.finditer(content):
+        if not index.in_code(match.start()):
+            continue
+        # For the function form the match ends just past its parameter list's (
+        start = match.end() - 1 if match.group(2) else match.end()
+        handlers.append(Handler(match.group(1) or match.group(2), match.start(),
+                                statement_end(content, index, start)))
+    return handlers
+
+def handler_for(handlers: List[Handler], offset: int) -> Optional[Handler]:
+    for handler in handlers:
+        if handler.start <= offset < handler.end:
+            return handler
+    return None
+
+def split_top_level(content: str, index: BracketIndex, start: int, end: int) -> List[Tuple[int, int]]:
+    """(start, end) spans of the comma-separated items in content[start:end], brackets skipped"""
+    items = []
+    item_start = i = start
+    while i < end:
+        ch = content[i]
+        if ch in '({[' and index.in_code(i) and index.matching(i) is not None:
+            i = index.matching(i) + 1
+            continue
+        if ch == ',' and index.in_code(i):
+            items.append((item_start, i))
+            item_start = i + 1
+        i += 1
+    if content[item_start:end].strip():
+        items.append((item_start, end))
+    return items
+
+PROPERTY = re.compile(r'\s*([A-Za-z_$][\w$]*|"[^"]*"|\'[^\']*\')\s*(:)?', re.DOTALL)
+
+def object_properties(content: str, index: BracketIndex, open_brace: int) -> Optional[Dict[str, Tuple[int, int]]]:
+    """
+    Top-level properties of the object literal opening at open_brace, as
+    {name: (value_start, value_end)}. Shorthand properties map to their own
+    name's span; spreads are listed under "...". None if not an object.
+    """
+    if content[open_brace] != '{' or index.matching(open_brace) is None:
+        return None
+    properties: Dict[str, Tuple[int, int]] = {}
+    for item_start, item_end in split_top_level(content, index, open_brace + 1, index.matching(open_brace)):
+        item_start = _skip_comments(content, item_start, item_end)
+        text = content[item_start:item_end]
+        if text.strip().startswith('...'):
+            properties["..."] = (item_start, item_end)
+            continue
+        match = PROPERTY.match(text)
+        if not match:
+            continue
+        name = match.group(1).strip('"\'')
+        if match.group(2):
+            value_start = _skip_space(content, item_start + match.end())
+            value_end = item_end
+            while value_end > value_start and content[value_end - 1].isspace():
+                value_end -= 1
+            properties[name] = (value_start, value_end)
+        else:
+            properties[name] = (item_start + match.start(1), item_start + match.end(1))
+    return properties
+
+def call_argument_object(content: str, index: BracketIndex, call: PrismaCall) -> Optional[Dict[str, Tuple[int, int]]]:
+    """Properties of a call's single object literal argument, {} for no arguments"""
+    if call.model is None:
+        return None
+    arguments = split_top_level(content, index, call.open + 1, call.close)
+    if not arguments:
+        return {}
+    if len(arguments) != 1:
+        return None
+    first = _skip_space(content, arguments[0][0])
+    return object_properties(content, index, first)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Query Attribution
+Ties the Prisma queries a dev server logs to the test request that caused
+them. The log carries no request context (a request id header would never
+reach Prisma's log lines), so requests are serialized: each one is sent
+alone, and every query logged between its send and a short settle after its
+response is charged to it. Test-user logins and token refreshes happen
+before that window opens, so their queries are not charged to the route.
+lib/db.ts logs plain "prisma:query <SQL>" lines in development; with
+PRISMA_LOG_QUERY_TIMING=1, which it honours in development only, it logs
+durations and params too. That gives DB time and tells exact duplicates from
+the same statement run with different values (the N+1 shape).
+"""
+
+import asyncio
+import os
+import re
+import signal
+import socket
+import subprocess
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Awaitable, Callable, Deque, Dict, IO, List, NamedTuple, Optional, Tuple
+
+from route_import_graph import SERVICE_DIR
+
+TIMING_ENV = "PRISMA_LOG_QUERY_TIMING"
+
+# Wait after a response for its last query lines to be flushed to the log
+DEFAULT_SETTLE = 0.15
+# Sent with a token the server rejected; retried once with a renewed one
+AUTH_REJECTED = 401
+# A statement run this many times within one request is reported as N+1
+DEFAULT_REPEAT_THRESHOLD = 3
+DEFAULT_STARTUP_TIMEOUT = 120.0
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+QUERY_LINE = re.compile(r'prisma:query\s+(?:\((\d+(?:\.\d+)?)ms\)\s+)?(.*?)(?:\s+params=(.*))?\s*$')
+# IN (?, ?, ?) / IN ($1,$2) lists vary in length with the data, not the code
+PLACEHOLDER_LIST = re.compile(r'(?:\?|\$\d+)(?:\s*,\s*(?:\?|\$\d+))+')
+WHITESPACE = re.compile(r'\s+')
+
+Route = Tuple[str, str, str]
+Outcome = Tuple[bool, int, str, float]
+
+class QueryEvent(NamedTuple):
+    sql: str
+    duration_ms: Optional[float]
+    params: Optional[str]
+
+def parse_query_line(line: str) -> Optional[QueryEvent]:
+    match = QUERY_LINE.search(ANSI_ESCAPE.sub('', line))
+    if not match:
+        return None
+    duration, sql, params = match.groups()
+    return QueryEvent(sql, float(duration) if duration else None, params)
+
+def statement_shape(sql: str) -> str:
+    """SQL with whitespace collapsed and placeholder lists of any length made equal"""
+    return PLACEHOLDER_LIST.sub('?, ...', WHITESPACE.sub(' ', sql).strip())
+
+class LogTail:
+    """
+    Lines of a server's output, collected on a background thread: either a
+    child process's stdout or a log file another process is writing, which
+    is followed from its current end like tail -f.
+    """
+
+    def __init__(self, stream: IO[str], follow: bool = False, keep: int = 200):
+        self._stream = stream
+        self._follow = follow
+        self._pending: List[str] = []
+        # Recent lines, for showing why a server failed to start
+        self.recent: Deque[str] = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'LogTail':
+        stream = open(path, 'r', encoding='utf-8', errors='replace')
+        stream.seek(0, os.SEEK_END)
+        return cls(stream, follow=True)
+
+    def _read(self):
+        while not self._stopped.is_set():
+            line = self._stream.readline()
+            if not line:
+                if not self._follow:
+                    return
+                time.sleep(0.02)
+                continue
+            with self._lock:
+                self._pending.append(line)
+                self.recent.append(line)
+
+    def take(self) -> List[str]:
+        """Lines read since the previous take"""
+        with self._lock:
+            lines, self._pending = self._pending, []
+        return lines
+
+    def close(self):
+        self._stopped.set()
+        if self._follow:
+            self._thread.join(timeout=1)
+            self._stream.close()
+
+class DevServer:
+    """next dev on the given port with query timing on, for one run"""
+
+    def __init__(self, port: int, service_dir: Path = SERVICE_DIR,
+                 startup_timeout: float = DEFAULT_STARTUP_TIMEOUT):
+        self.port = port
+        self.service_dir = service_dir
+        self.startup_timeout = startup_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.tail: Optional[LogTail] = None
+
+    def _accepting(self) -> bool:
+        try:
+            with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                return True
+        except OSError:
+            return False
+
+    def start(self) -> LogTail:
+        if self._accepting():
+            raise RuntimeError(f"Port {self.port} is already in use; stop that server "
+                               f"or attach to its log with --server-log")
+        env = dict(os.environ, NODE_ENV="development", **{TIMING_ENV: "1"})
+        # --no-install: fail rather than fetch a next that is not the project's
+        self.process = subprocess.Popen(["npx", "--no-install", "next", "dev", "-p", str(self.port)],
+                                        cwd=self.service_dir, env=env, text=True, bufsize=1,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        start_new_session=True)
+        self.tail = LogTail(self.process.stdout)
+        deadline = time.monotonic() + self.startup_timeout
+        try:
+            while not self._accepting():
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"next dev exited with {self.process.returncode}:\n"
+                                       + "".join(self.tail.recent)[-2000:])
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"next dev did not listen on port {self.port} "
+                                       f"within {self.startup_timeout:g}s")
+                time.sleep(0.25)
+        except BaseException:
+            self.stop()
+            raise
+        self.tail.take()
+        return self.tail
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        # npx runs next in a child; signal the whole session
+        os.killpg(self.process.pid, signal.SIGTERM)
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+
+class RouteQueries:
+    """Queries charged to one route over all its requests"""
+
+    def __init__(self, route: Route):
+        self.route = route
+        self.requests = 0
+        self.failed = 0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.timed = 0
+        self.exact_duplicates = 0
+        # Statement shape -> most executions seen within a single request
+        self.repeats: Counter = Counter()
+
+    def record(self, outcome: Outcome, events: List[QueryEvent]):
+        self.requests += 1
+        self.failed += not outcome[0]
+        self.queries += len(events)
+        for event in events:
+            if event.duration_ms is not None:
+                self.timed += 1
+                self.db_ms += event.duration_ms
+        shapes = Counter(statement_shape(event.sql) for event in events)
+        for shape, count in shapes.items():
+            if count > 1:
+                self.repeats[shape] = max(self.repeats[shape], count)
+        with_params = [(event.sql, event.params) for event in events if event.params is not None]
+        self.exact_duplicates += len(with_params) - len(set(with_params))
+
+    @property
+    def queries_per_request(self) -> float:
+        return self.queries / self.requests if self.requests else 0.0
+
+    @property
+    def db_ms_per_request(self) -> Optional[float]:
+        """None when the log had no durations"""
+        return self.db_ms / self.requests if self.requests and self.timed else None
+
+    def worst_repeat(self) -> Tuple[str, int]:
+        return self.repeats.most_common(1)[0] if self.repeats else ("", 0)
+
+    def to_dict(self) -> Dict:
+        return {"requests": self.requests,
+                "failed": self.failed,
+                "queries": self.queries,
+                "queries_per_request": round(self.queries_per_request, 2),
+                "db_ms_per_request": (round(self.db_ms_per_request, 2)
+                                      if self.db_ms_per_request is not None else None),
+                "exact_duplicates": self.exact_duplicates,
+                "repeated_statements": [{"sql": sql, "max_per_request": count}
+                                        for sql, count in self.repeats.most_common()]}
+
+class QueryReport(NamedTuple):
+    routes: List[RouteQueries]
+    # Logged while no request was in flight: cron jobs, other clients
+    unattributed: int
+    timed: bool
+    # Logged by test-user logins and refreshes, and by requests whose token was rejected
+    auth: int = 0
+    # The outcome kept for each route, round after round; a 401 that was retried is not among them
+    outcomes: Tuple[Outcome, ...] = ()
+
+async def settled_queries(tail: LogTail, settle: float) -> List[QueryEvent]:
+    """Query lines logged up to a settle from now"""
+    await asyncio.sleep(settle)
+    return [event for event in map(parse_query_line, tail.take()) if event]
+
+async def attribute_queries(send: Callable[[Route], Awaitable[Outcome]], routes: List[Route],
+                            tail: LogTail, repeat: int = 1, settle: float = DEFAULT_SETTLE,
+                            authorize: Optional[Callable[[bool], Awaitable[bool]]] = None) -> QueryReport:
+    """
+    Send every route repeat times, strictly one request at a time, and
+    charge the query lines logged meanwhile to it. send must not raise.
+    authorize, when given, readies the token for the next send (with
+    force=True after a 401) and says whether that took a login or refresh.
+    It runs before the route's window opens. A request rejected with 401 is
+    sent again after a forced renewal. The queries of those round trips and
+    of the rejected request are counted as auth, not charged to the route.
+    The report's outcomes hold the recorded outcome of every route in every
+    round, in send order.
+    """
+    stats = [RouteQueries(route) for route in routes]
+    outcomes: List[Outcome] = []
+    unattributed = auth = 0
+    for _ in range(repeat):
+        for route_stats in stats:
+            unattributed += sum(1 for line in tail.take() if parse_query_line(line))
+            if authorize and await authorize(False):
+                auth += len(await settled_queries(tail, settle))
+            outcome = await send(route_stats.route)
+            events = await settled_queries(tail, settle)
+            if authorize and outcome[1] == AUTH_REJECTED:
+                auth += len(events)
+                if await authorize(True):
+                    auth += len(await settled_queries(tail, settle))
+                outcome = await send(route_stats.route)
+                events = await settled_queries(tail, settle)
+            route_stats.record(outcome, events)
+            outcomes.append(outcome)
+    timed = any(route_stats.timed for route_stats in stats)
+    return QueryReport(stats, unattributed, timed, auth, tuple(outcomes))
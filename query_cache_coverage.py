@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Query Cache Coverage
+Lists every GET handler with whether its reads go through a cache: the
+cachedQuery / cachedQueryWithMetrics wrapper from lib/performance/query-cache
+(with CacheKeys and CACHE_DURATION), another layer (cachedForWorkspace from
+lib/cache, a CacheService from lib/redis/cache), or nothing. With
+export const dynamic = 'force-dynamic' on almost every route, Next.js caches
+none of these responses itself, so the application cache is all there is.
+
+Uncached handlers are ranked by how expensive their queries look: one point
+per Prisma read, two more per aggregate / groupBy / raw query and one per
+include. Module-level helpers the handler calls are counted with it.
+
+--wrap ROUTE (with --diff to preview or --apply to write) moves a GET
+handler's read path, from its first query to its success response, into
+cachedQueryWithMetrics under a key scoped to the caller's workspace and the
+request's path and query string:
+
+    const cacheKey = `finance:route:${user.workspaceId}:${request.nextUrl.pathname}${request.nextUrl.search}`;
+    const result = await cachedQueryWithMetrics(
+      cacheKey,
+      async () => {
+        ...
+        return { success: true, data };
+      },
+      CACHE_DURATION.STATS
+    );
+
+    return NextResponse.json(result);
+
+The key starts with the route's first segment. A route is only wrapped when
+an InvalidateCache helper in lib/performance/query-cache deletes keys with
+that prefix (InvalidateCache.finance deletes "finance:*"), so that its
+mutations have something to call. Many areas (admin, search, ai, mobile,
+quality-control, maintenance, ...) have no such helper, and a wrap there
+would serve stale data until the TTL ran out. cache_invalidation_map.py
+--assume-cached lists the mutations that still need the call.
+"""
+
+import argparse
+import json
+import re
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from bracket_index import BracketIndex
+from cache_library import CacheLibrary, load_cache_library
+from edit_buffer import EditBuffer, unified_diff
+from findmany_audit import AGGREGATE_SEGMENT, RESPONSE_CALL, add_import, handler_function, request_parameter
+from parallel_await_audit import TOP_LEVEL_FUNCTION, reindent
+from prisma_calls import (Handler, PrismaCall, _skip_comments, find_handlers, find_prisma_calls, split_top_level,
+                          statement_end)
+from route_fix_cache import cache_key
+from route_tree import API_DIR, find_route_files, map_route_files
+
+QUERY_CACHE_MODULE = "@/lib/performance/query-cache"
+QUERY_CACHE_USE = re.compile(r'\b(?:cachedQueryWithMetrics|cachedQuery|CacheKeys|CACHE_DURATION)\b')
+OTHER_CACHE_USE = re.compile(r'\b(?:cachedForWorkspace|cachedForUser|cachedPaginated|cached|memoize)\s*\(|'
+                             r'\b\w*[cC]ache\s*\.\s*(?:get|getOrSet)\s*\(')
+FORCE_DYNAMIC = re.compile(r'^export\s+const\s+dynamic\s*=\s*["\']force-dynamic["\']', re.MULTILINE)
+COVERAGE = ("query-cache", "other-cache", "uncached")
+
+AGGREGATE_OPERATIONS = ("aggregate", "groupBy")
+INCLUDE = re.compile(r'\binclude\s*:')
+
+# CACHE_DURATION entry for a route's first segment; stats-style routes use STATS
+CACHE_DURATIONS = ("USERS", "CLIENTS", "EMPLOYEES", "SETTINGS", "ORDERS", "INVENTORY", "PRODUCTION",
+                   "STATS", "DASHBOARD", "NOTIFICATIONS", "REALTIME")
+SEGMENT_DURATION = {
+    "users": "USERS", "admin": "USERS",
+    "clients": "CLIENTS", "brands": "CLIENTS",
+    "hr": "EMPLOYEES", "employees": "EMPLOYEES", "attendance": "EMPLOYEES", "payroll": "EMPLOYEES",
+    "settings": "SETTINGS",
+    "orders": "ORDERS",
+    "inventory": "INVENTORY", "warehouse": "INVENTORY", "materials": "INVENTORY",
+    "cutting": "PRODUCTION", "printing": "PRODUCTION", "sewing": "PRODUCTION", "finishing": "PRODUCTION",
+    "production": "PRODUCTION", "quality-control": "PRODUCTION", "delivery": "PRODUCTION",
+    "dashboard": "DASHBOARD", "dashboards": "DASHBOARD",
+    "notifications": "NOTIFICATIONS",
+}
+DEFAULT_DURATION = "STATS"
+CACHE_KEY_NAME = "cacheKey"
+RESULT_NAME = "result"
+WORKSPACE_VARIABLE = re.compile(r'\b(?:const|let)\s+(?:\{[^}]*\b(workspace_id|workspaceId)\b[^}]*\}|'
+                                r'(workspace_id|workspaceId)\b)')
+
+class HandlerCoverage(NamedTuple):
+    file: str
+    line: int
+    coverage: str
+    force_dynamic: bool
+    reads: int
+    aggregates: int
+    includes: int
+
+    @property
+    def cost(self) -> int:
+        return self.reads + 2 * self.aggregates + self.includes
+
+    def to_dict(self) -> Dict:
+        return {**self._asdict(), "cost": self.cost}
+
+def module_functions(content: str, index: BracketIndex, handlers: List[Handler]) -> Dict[str, Tuple[int, int]]:
+    """Spans of the module-level functions and consts that are not handlers, by name"""
+    functions = {}
+    for match in TOP_LEVEL_FUNCTION.finditer(content):
+        name = match.group(1) or match.group(2)
+        if index.in_code(match.start()) and not any(handler.start == match.start() for handler in handlers):
+            functions[name] = (match.start(), statement_end(content, index, match.end()))
+    return functions
+
+def reachable_spans(content: str, span: Tuple[int, int], functions: Dict[str, Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """span plus those of the module functions it calls, directly or through each other"""
+    spans, seen, pending = [span], set(), [span]
+    while pending:
+        start, end = pending.pop()
+        for name, function_span in functions.items():
+            if name not in seen and re.search(rf'(?<![\w$.]){re.escape(name)}\s*\(', content[start:end]):
+                seen.add(name)
+                spans.append(function_span)
+                pending.append(function_span)
+    return spans
+
+def query_cost(content: str, index: BracketIndex, calls: List[PrismaCall],
+               spans: List[Tuple[int, int]]) -> Tuple[int, int, int]:
+    """(reads, aggregates, includes) over the Prisma reads inside spans"""
+    reads = aggregates = includes = 0
+    for call in calls:
+        if call.writes or not any(start <= call.start < end for start, end in spans):
+            continue
+        reads += 1
+        aggregates += call.operation in AGGREGATE_OPERATIONS or call.model is None
+        includes += sum(1 for match in INCLUDE.finditer(content, call.open, call.close) if index.in_code(match.start()))
+    return reads, aggregates, includes
+
+def coverage_of(content: str, index: BracketIndex, spans: List[Tuple[int, int]]) -> str:
+    """Which COVERAGE the handler's code falls under"""
+    def uses(pattern) -> bool:
+        return any(index.in_code(match.start()) for start, end in spans
+                   for match in pattern.finditer(content, start, end))
+    if uses(QUERY_CACHE_USE):
+        return "query-cache"
+    return "other-cache" if uses(OTHER_CACHE_USE) else "uncached"
+
+def enclosing_pair(index: BracketIndex, offset: int, within: Tuple[int, int]) -> Optional[int]:
+    """Opening offset of the innermost bracket pair around offset, inside within"""
+    best = None
+    for open_at, close_at in index.pairs.items():
+        if within[0] <= open_at < offset < close_at <= within[1] and (best is None or open_at > best):
+            best = open_at
+    return best
+
+def nested_function_bodies(content: str, index: BracketIndex, start: int, end: int) -> List[Tuple[int, int]]:
+    """Body spans of the arrow functions and function expressions in content[start:end]"""
+    bodies = []
+    for match in re.finditer(r'=>\s*\{|\bfunction\b[^{]*\{', content[start:end]):
+        brace = start + match.end() - 1
+        if index.in_code(start + match.start()) and index.matching(brace) is not None:
+            bodies.append((brace, index.matching(brace)))
+    return bodies
+
+class WrapPlan(NamedTuple):
+    region_start: int
+    return_start: int
+    return_end: int
+    response_call: str
+    # (text, indent of the line it starts on) of the response call's arguments
+    response_body: Tuple[str, int]
+    # Second argument of the response call (status, headers), kept outside the cache
+    response_options: Optional[Tuple[str, int]]
+    block_indent: str
+
+def plan_wrap(content: str, index: BracketIndex, handler: Handler, calls: List[PrismaCall],
+              functions: Dict[str, Tuple[int, int]]) -> Tuple[Optional[WrapPlan], str]:
+    """Where the read path of a GET handler starts and ends, or why it cannot be wrapped"""
+    function = handler_function(content, index, handler)
+    if function is None:
+        return None, "handler body not found"
+    body = function[1]
+    body_span = (body, index.matching(body))
+    block = body
+    try_match = re.compile(r'\btry\s*\{').search(content, body, body_span[1])
+    if try_match and enclosing_pair(index, try_match.start(), body_span) == body:
+        block = try_match.end() - 1
+    block_span = (block, index.matching(block))
+
+    success = None
+    for match in re.finditer(r'\breturn\s+', content[block:block_span[1]]):
+        at = block + match.start()
+        response = RESPONSE_CALL.match(content, block + match.end())
+        if response and index.in_code(at) and enclosing_pair(index, at, block_span) in (None, block):
+            success = (at, response)
+    if success is None:
+        return None, "no success response at the end of the handler"
+    return_start, response = success
+    open_paren = response.end() - 1
+    close_paren = index.matching(open_paren)
+    arguments = split_top_level(content, index, open_paren + 1, close_paren)
+    if len(arguments) not in (1, 2):
+        return None, "response call takes more than two arguments"
+    end = close_paren + 1
+    end += content[end:end + 1] == ';'
+
+    helper_calls = [match.start() for name in functions for match in
+                    re.finditer(rf'(?<![\w$.]){re.escape(name)}\s*\(', content[block:return_start])]
+    first = min([call.start for call in calls if block < call.start < return_start]
+                + [block + offset for offset in helper_calls], default=None)
+    if first is None:
+        return None, "no queries before the response"
+    # Climb to the statement directly inside the block, then back to its first token
+    while True:
+        pair = enclosing_pair(index, first, block_span)
+        if pair is None or pair == block:
+            break
+        first = pair
+    boundary = block
+    for i in range(first - 1, block, -1):
+        if content[i] in ';{}' and index.in_code(i) and enclosing_pair(index, i, block_span) in (None, block):
+            boundary = i
+            break
+    region_start = content.rfind('\n', 0, _skip_comments(content, boundary + 1, first)) + 1
+    # Comment lines directly above the first statement describe it and move with it
+    while region_start > boundary + 1:
+        previous = content.rfind('\n', 0, region_start - 1) + 1
+        line = content[previous:region_start].strip()
+        if previous <= boundary or not line.startswith(('//', '/*', '*')):
+            break
+        region_start = previous
+
+    nested = nested_function_bodies(content, index, region_start, return_start)
+    for match in re.finditer(r'\breturn\b', content[region_start:return_start]):
+        at = region_start + match.start()
+        if index.in_code(at) and not any(start < at < stop for start, stop in nested):
+            return None, f"returns early on line {index.line_of(at) + 1}"
+    if any(call.writes and region_start <= call.start < return_start for call in calls):
+        return None, "writes inside the read path"
+    def argument(span: Tuple[int, int]) -> Tuple[str, int]:
+        start = _skip_comments(content, span[0], span[1])
+        line_start = content.rfind('\n', 0, start) + 1
+        return content[start:span[1]].rstrip(), len(re.match(r'[ \t]*', content[line_start:]).group(0))
+    options = argument(arguments[1]) if len(arguments) == 2 else None
+    if options:
+        declared = re.findall(r'\b(?:const|let)\s+([A-Za-z_$][\w$]*)', content[region_start:return_start])
+        if any(re.search(rf'(?<![\w$.]){re.escape(name)}\b', options[0]) for name in declared):
+            return None, "response options depend on the read path"
+    indent = re.match(r'[ \t]*', content[region_start:]).group(0)
+    return WrapPlan(region_start, return_start, end, response.group(0).rstrip('( \t\n'), argument(arguments[0]),
+                    options, indent), ""
+
+def shift_lines(text: str, columns: int) -> str:
+    """text with its continuation lines indented by columns more (or less)"""
+    lines = text.split('\n')
+    for i in range(1, len(lines)):
+        if columns >= 0:
+            lines[i] = " " * columns + lines[i] if lines[i] else lines[i]
+        else:
+            lines[i] = lines[i][min(-columns, len(lines[i]) - len(lines[i].lstrip(' '))):]
+    return '\n'.join(lines)
+
+def workspace_expression(content: str, index: BracketIndex, handler: Handler, before: int) -> Optional[str]:
+    """Something holding the caller's workspace id at the start of the read path"""
+    for match in WORKSPACE_VARIABLE.finditer(content, handler.start, before):
+        if index.in_code(match.start()):
+            return match.group(1) or match.group(2)
+    function = handler_function(content, index, handler)
+    parameters = split_top_level(content, index, function[0] + 1, index.matching(function[0]))
+    # requireAuth(async (request, user) => ...) passes the authenticated user second
+    if len(parameters) >= 2 and not content.startswith(('export async function', 'export function'), handler.start):
+        name = re.match(r'\s*([A-Za-z_$][\w$]*)\s*(?::[^,]*)?$', content[parameters[1][0]:parameters[1][1]])
+        if name:
+            return f"{name.group(1)}.workspaceId"
+    return None
+
+def wrap_key_prefix(relative: str) -> str:
+    """Start of the cache keys --wrap gives a route's GET handler: its area, then route:"""
+    return f"{relative.split('/')[0]}:route:"
+
+def wrap_handler(content: str, relative: str, library: CacheLibrary,
+                 duration: Optional[str] = None) -> Tuple[EditBuffer, str]:
+    """The codemod for the file's GET handler, or an empty buffer and why it does not apply"""
+    index = BracketIndex(content)
+    buffer = EditBuffer(content)
+    prefix = wrap_key_prefix(relative)
+    if not library.invalidators_of(f"{prefix}*"):
+        return buffer, f"no InvalidateCache helper deletes {prefix}* keys, so no write would clear the cache"
+    handlers = find_handlers(content, index)
+    handler = next((handler for handler in handlers if handler.method == "GET"), None)
+    if handler is None:
+        return buffer, "no GET handler"
+    if QUERY_CACHE_USE.search(content, handler.start, handler.end):
+        return buffer, "already uses the query cache"
+    span = content[handler.start:handler.end]
+    for name in (CACHE_KEY_NAME, RESULT_NAME):
+        if re.search(rf'(?<![\w$.]){name}\b', span):
+            return buffer, f"{name} is already defined"
+    request = request_parameter(content, index, handler)
+    if request is None:
+        return buffer, "handler takes no request argument"
+    plan, blocker = plan_wrap(content, index, handler, find_prisma_calls(content, index),
+                              module_functions(content, index, handlers))
+    if plan is None:
+        return buffer, blocker
+    workspace = workspace_expression(content, index, handler, plan.region_start)
+    if workspace is None:
+        return buffer, "no workspace id in scope"
+
+    segment = relative.split('/')[0]
+    duration = duration or ("STATS" if AGGREGATE_SEGMENT.search(relative)
+                            else SEGMENT_DURATION.get(segment, DEFAULT_DURATION))
+    function = handler_function(content, index, handler)
+    next_request = re.search(r'\bNextRequest\b', content[function[0]:index.matching(function[0])])
+    url = f"{request}.nextUrl" if next_request else f"new URL({request}.url)"
+    indent, inner = plan.block_indent, plan.block_indent + "  "
+    read_path = reindent(content, index, plan.region_start, plan.return_start, "    ").rstrip()
+    body = shift_lines(plan.response_body[0], len(inner) + 2 - plan.response_body[1])
+    options = shift_lines(plan.response_options[0], len(indent) - plan.response_options[1]) \
+        if plan.response_options else None
+    text = (f"{indent}const {CACHE_KEY_NAME} = `{prefix}${{{workspace}}}:"
+            f"${{{url}.pathname}}${{{url}.search}}`;\n"
+            f"{indent}const {RESULT_NAME} = await cachedQueryWithMetrics(\n"
+            f"{inner}{CACHE_KEY_NAME},\n"
+            f"{inner}async () => {{\n"
+            f"    {read_path}\n\n"
+            f"{inner}  return {body};\n"
+            f"{inner}}},\n"
+            f"{inner}CACHE_DURATION.{duration}\n"
+            f"{indent});\n\n"
+            f"{indent}return {plan.response_call}({RESULT_NAME}"
+            + (f", {options});" if options else ");"))
+    buffer.add(plan.region_start, plan.return_end, text, "cache:wrap")
+    add_import(content, buffer, ["cachedQueryWithMetrics", "CACHE_DURATION"], QUERY_CACHE_MODULE, "cache:wrap")
+    return buffer, ""
+
+def coverage_content(content: str, relative: str) -> List[HandlerCoverage]:
+    index = BracketIndex(content)
+    handlers = find_handlers(content, index)
+    functions = module_functions(content, index, handlers)
+    calls = find_prisma_calls(content, index)
+    force_dynamic = bool(FORCE_DYNAMIC.search(content))
+    coverage = []
+    for handler in handlers:
+        if handler.method != "GET":
+            continue
+        spans = reachable_spans(content, (handler.start, handler.end), functions)
+        coverage.append(HandlerCoverage(relative, index.line_of(handler.start) + 1,
+                                        coverage_of(content, index, spans), force_dynamic,
+                                        *query_cost(content, index, calls, spans)))
+    return coverage
+
+def coverage_worker(api_dir: Path, wrap: Set[str], library: CacheLibrary, duration: Optional[str], apply: bool,
+                    diff: bool, filepath: str):
+    """
+    Pool entry point for one route file.
+    Returns (coverage, force_dynamic, diff_lines, wrap_blocker) and writes the wrap when apply is set.
+    """
+    path = Path(filepath)
+    content = path.read_text(encoding='utf-8')
+    relative = path.relative_to(api_dir).as_posix()
+    coverage = coverage_content(content, relative)
+    diff_lines: List[str] = []
+    blocker = None
+    if relative in wrap:
+        buffer, blocker = wrap_handler(content, relative, library, duration)
+        if len(buffer) and (apply or diff):
+            edits = buffer.resolve()
+            if diff:
+                diff_lines = unified_diff(content, edits, cache_key(path))
+            if apply:
+                path.write_text(buffer.apply(), encoding='utf-8')
+    return (coverage, bool(FORCE_DYNAMIC.search(content)), diff_lines,
+            (relative, blocker) if blocker is not None else None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report which GET handlers read through the query cache")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    parser.add_argument("--wrap", action="append", default=[], metavar="ROUTE",
+                        help="Wrap this route's GET read path in cachedQueryWithMetrics "
+                             "(route folder or file relative to the API dir, e.g. finance/payments); repeatable")
+    parser.add_argument("--duration", choices=CACHE_DURATIONS,
+                        help="CACHE_DURATION entry for wrapped handlers (default: by route area)")
+    parser.add_argument("--diff", action="store_true", help="Show the wrap as a diff")
+    parser.add_argument("--apply", action="store_true", help="Write the wrap")
+    parser.add_argument("--top", type=int, default=20, help="Uncached handlers to list (default 20, 0 = all)")
+    parser.add_argument("--json", type=Path, metavar="FILE", help="Write the per-handler coverage as JSON")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    args = parser.parse_args()
+    route_files = find_route_files(args.api_dir)
+    known = {Path(route_file).relative_to(args.api_dir).as_posix() for route_file in route_files}
+    wrap = {route.strip('/') if route.endswith('.ts') else f"{route.strip('/')}/route.ts" for route in args.wrap}
+    for route in sorted(wrap - known):
+        parser.error(f"--wrap {route}: no such route file under {args.api_dir}")
+    worker = partial(coverage_worker, args.api_dir, wrap, load_cache_library() if wrap else None, args.duration,
+                     args.apply, args.diff)
+
+    handlers: List[HandlerCoverage] = []
+    diffs: List[str] = []
+    wrap_results: List[Tuple[str, str]] = []
+    force_dynamic = 0
+    for coverage, file_force_dynamic, diff_lines, wrapped in map_route_files(worker, route_files, args.jobs):
+        handlers.extend(coverage)
+        force_dynamic += file_force_dynamic
+        diffs.extend(diff_lines)
+        if wrapped:
+            wrap_results.append(wrapped)
+
+    print("=" * 80)
+    print(" QUERY CACHE COVERAGE")
+    print("=" * 80)
+    for handler in handlers:
+        if handler.coverage != "uncached":
+            print(f"[{handler.coverage.upper()}] {handler.file}:{handler.line} cost {handler.cost}")
+    uncached = sorted((handler for handler in handlers if handler.coverage == "uncached"),
+                      key=lambda handler: (-handler.cost, handler.file))
+    print(f"\nMost expensive uncached GET handlers (cost = reads + 2 x aggregates + includes):")
+    for handler in uncached[:args.top] if args.top else uncached:
+        print(f"  {handler.cost:4d}  {handler.file:<50} reads {handler.reads}, aggregates {handler.aggregates}, "
+              f"includes {handler.includes}")
+    for relative, blocker in wrap_results:
+        print(f"\n[WRAP] {relative}: " + (blocker or ("written" if args.apply else "ready")))
+    if diffs:
+        print()
+        print(''.join(diffs), end='')
+
+    print("\n" + "=" * 80)
+    print(" SUMMARY")
+    print("=" * 80)
+    total_cost = sum(handler.cost for handler in handlers) or 1
+    print(f"Route files scanned: {len(route_files)}")
+    print(f"Route files with dynamic = 'force-dynamic': {force_dynamic} "
+          f"({len({handler.file for handler in handlers if handler.force_dynamic})} with a GET handler)")
+    print(f"GET handlers: {len(handlers)}")
+    for coverage in COVERAGE:
+        members = [handler for handler in handlers if handler.coverage == coverage]
+        print(f"  {coverage:<12} {len(members):4d} handlers, "
+              f"{100 * sum(handler.cost for handler in members) / total_cost:5.1f}% of query cost")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([handler.to_dict() for handler in sorted(handlers, key=lambda h: (-h.cost, h.file))], f, indent=2)
+        print(f"Coverage written to {args.json}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
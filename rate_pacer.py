@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Rate Limit Pacer
+Schedules requests so a test run stays inside the API's rate limits instead
+of tripping 429s. requireAuth in lib/auth-middleware.ts applies the GENEROUS
+preset (100/min) to GET/HEAD and MODERATE (30/min) to writes, keyed by the
+first 10 characters of the bearer token plus the client IP, so every JWT
+from one machine lands on the same key. Both limiters count into the same
+counter: a read uses up write allowance too, and a write uses up read
+allowance.
+
+Each key gets a read and a write token bucket mirroring that. Responses
+carrying X-RateLimit-Remaining pull the bucket down to what the server
+reports, and a 429 empties it until Retry-After or X-RateLimit-Reset. The
+reset header is epoch milliseconds from lib/security/rate-limit.ts but an
+ISO timestamp from lib/rate-limiter.ts; both are understood.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, NamedTuple, Optional
+
+READ_METHODS = {"GET", "HEAD"}
+
+class RateLimit(NamedTuple):
+    limit: int
+    window: float
+
+# RateLimitPresets in lib/security/rate-limit.ts, as used by requireAuth
+GENEROUS = RateLimit(100, 60.0)
+MODERATE = RateLimit(30, 60.0)
+
+# Share of the limit that may go out as a burst. The server counts in fixed
+# windows, and a bucket holding B tokens that refills at (limit - B)/window
+# never sends more than limit in any window, however its windows line up
+DEFAULT_BURST_FRACTION = 0.2
+
+# Longest single wait a 429 may impose before the request is given up
+DEFAULT_MAX_WAIT = 120.0
+
+def parse_reset(value: str, now: Optional[float] = None) -> Optional[float]:
+    """
+    X-RateLimit-Reset as epoch seconds. Accepts epoch milliseconds, epoch
+    seconds, a delta in seconds (small numbers) and ISO 8601 timestamps.
+    """
+    now = time.time() if now is None else now
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+    if number > 1e11:
+        return number / 1000
+    if number > 1e9:
+        return number
+    return now + number
+
+def parse_retry_after(value: str, now: Optional[float] = None) -> Optional[float]:
+    """Retry-After (delay in seconds or an HTTP date) as seconds to wait"""
+    now = time.time() if now is None else now
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Tokens refill continuously; the count may go negative when debited"""
+
+    def __init__(self, rate: RateLimit, burst_fraction: float = DEFAULT_BURST_FRACTION):
+        self.limit = rate.limit
+        self.capacity = max(1.0, rate.limit * burst_fraction)
+        self.refill = max(rate.limit - self.capacity, 1.0) / rate.window
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # No tokens are handed out before this (set by a 429)
+        self.blocked_until = 0.0
+
+    def _refresh(self, now: float):
+        if now > self.updated:
+            start = max(self.updated, min(now, self.blocked_until))
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.refill)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one token is available"""
+        self._refresh(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now + max(0.0, 1 - self.tokens) / self.refill
+        return max(0.0, 1 - self.tokens) / self.refill
+
+    def take(self, now: float):
+        self._refresh(now)
+        self.tokens -= 1
+
+    def debit(self, now: float):
+        """
+        Charge a request made through the other limiter. The server's window
+        forgets it after one window, so debt is capped at one window's limit.
+        """
+        self._refresh(now)
+        self.tokens = max(self.tokens - 1, -float(self.limit))
+
+    def block(self, until: float, now: float):
+        """Server says no more until `until`: empty the bucket and hold it"""
+        self._refresh(now)
+        self.tokens = min(self.tokens, 0.0)
+        self.blocked_until = max(self.blocked_until, until)
+
+    def clamp(self, remaining: int, now: float):
+        self._refresh(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+class RateLimitPacer:
+    """Per-key read/write buckets shared by every request of a run"""
+
+    def __init__(self, read: RateLimit = GENEROUS, write: RateLimit = MODERATE,
+                 burst_fraction: float = DEFAULT_BURST_FRACTION, max_wait: float = DEFAULT_MAX_WAIT):
+        self.read = read
+        self.write = write
+        self.burst_fraction = burst_fraction
+        self.max_wait = max_wait
+        self.buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_loop = None
+        self.throttled_seconds = 0.0
+        self.delayed = 0
+        self.rate_limited = 0
+        self.retry_wait_seconds = 0.0
+
+    @staticmethod
+    def key(authorization: Optional[str]) -> str:
+        """The server's limiter key, minus the IP (constant for one client)"""
+        token = authorization[7:] if authorization else ""
+        return f"user:{token[:10]}" if token else "ip"
+
+    def _buckets(self, key: str) -> Dict[str, TokenBucket]:
+        if key not in self.buckets:
+            self.buckets[key] = {"read": TokenBucket(self.read, self.burst_fraction),
+                                 "write": TokenBucket(self.write, self.burst_fraction)}
+        return self.buckets[key]
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        # Runs may span several asyncio.run calls; locks belong to one loop
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._locks, self._lock_loop = {}, loop
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    async def acquire(self, method: str, authorization: Optional[str] = None) -> float:
+        """
+        Wait until the request may be sent and charge it to its key.
+        Requests on one key queue in order. Returns the seconds waited.
+        """
+        kind = "read" if method.upper() in READ_METHODS else "write"
+        other = "write" if kind == "read" else "read"
+        key = self.key(authorization)
+        waited = 0.0
+        async with self._lock(key):
+            buckets = self._buckets(key)
+            while True:
+                delay = buckets[kind].delay(time.monotonic())
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+                waited += delay
+            now = time.monotonic()
+            buckets[kind].take(now)
+            buckets[other].debit(now)
+        if waited:
+            self.throttled_seconds += waited
+            self.delayed += 1
+        return waited
+
+    def observe(self, method: str, authorization: Optional[str], status: int,
+                headers: Mapping[str, str]) -> Optional[float]:
+        """
+        Feed a response's rate limit headers back into the buckets. For a 429
+        returns the seconds to wait before retrying (None if the wait
+        exceeds max_wait); otherwise None. The bucket is held for that long,
+        so the retry's acquire() does the waiting.
+        """
+        kind = "read" if method.upper() in READ_METHODS else "write"
+        buckets = self._buckets(self.key(authorization))
+        now, wall = time.monotonic(), time.time()
+
+        remaining = headers.get("x-ratelimit-remaining")
+        if remaining is not None and remaining.strip().isdigit() and status != 429:
+            buckets[kind].clamp(int(remaining), now)
+        if status != 429:
+            return None
+
+        self.rate_limited += 1
+        waits = []
+        if headers.get("retry-after"):
+            waits.append(parse_retry_after(headers["retry-after"], wall))
+        if headers.get("x-ratelimit-reset"):
+            reset_at = parse_reset(headers["x-ratelimit-reset"], wall)
+            waits.append(reset_at - wall if reset_at is not None else None)
+        waits = [max(0.0, wait) for wait in waits if wait is not None]
+        wait = max(waits) if waits else None
+        if wait is None:
+            # No hint: assume a full window
+            wait = (self.read if kind == "read" else self.write).window
+        buckets[kind].block(now + wait, now)
+        if kind == "read":
+            # The shared counter is past the read limit, so past the lower write limit too
+            buckets["write"].block(now + wait, now)
+        if wait > self.max_wait:
+            return None
+        self.retry_wait_seconds += wait
+        return wait
+
+    def summary(self) -> str:
+        return (f"{self.throttled_seconds:.1f}s throttled ({self.delayed} request(s) paced, "
+                f"{self.rate_limited} 429(s) asking for {self.retry_wait_seconds:.1f}s of Retry-After)")
@@ -2,39 +2,52 @@
 """
 Remove standalone }); lines that appear after if/return blocks
 """
+import io
 import re
+from itertools import accumulate
 from pathlib import Path
+from typing import List, Optional, Tuple
 
-def remove_standalone_closures(filepath):
-    """Remove incorrect standalone }); lines"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+from edit_buffer import EditBuffer, apply_edits
 
-    original = ''.join(lines)
-    fixed_lines = []
-    i = 0
+def remove_standalone_closures_content(content: str,
+                                       buffers: Optional[List[EditBuffer]] = None) -> Tuple[str, List[str]]:
+    """Remove incorrect standalone }); lines from route source held in memory.
+    buffers, when given, receives the removed lines as edit spans.
+    Returns (new_content, list_of_fixes_applied)"""
+    lines = io.StringIO(content).readlines()
+    starts = list(accumulate((len(line) for line in lines), initial=0))
+    buffer = EditBuffer(content)
+    fixes_applied = []
 
-    while i < len(lines):
-        line = lines[i]
+    for i, line in enumerate(lines):
         stripped = line.strip()
 
         # Check if this is a standalone }); (just whitespace + });)
         if stripped == '});':
             # Check previous line - if it's a closing }, this }); is likely wrong
             if i > 0 and lines[i - 1].strip() == '}':
-                # Skip this line (remove the extra });)
-                i += 1
+                # Drop this line (remove the extra });)
+                buffer.add(starts[i], starts[i + 1], '', "closures.after_brace")
+                if "Removed standalone }); after closing brace" not in fixes_applied:
+                    fixes_applied.append("Removed standalone }); after closing brace")
                 continue
             # Also check if previous line ends with );
             if i > 0 and lines[i - 1].strip().endswith(');'):
                 # This }); is likely extra
-                i += 1
+                buffer.add(starts[i], starts[i + 1], '', "closures.after_call")
+                if "Removed standalone }); after call" not in fixes_applied:
+                    fixes_applied.append("Removed standalone }); after call")
                 continue
 
-        fixed_lines.append(line)
-        i += 1
+    return apply_edits(buffer, buffers), fixes_applied
+
+def remove_standalone_closures(filepath):
+    """Remove incorrect standalone }); lines"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        original = f.read()
 
-    content = ''.join(fixed_lines)
+    content, _ = remove_standalone_closures_content(original)
 
     # Write back if changed
     if content != original:
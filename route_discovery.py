@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Route Discovery
+Builds the API route table from the app/api tree: each route.ts maps to a
+URL (dynamic [param] segments filled from sample values) and its exported
+handlers give the HTTP methods.
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from route_tree import API_DIR, find_route_files
+
+ROUTE_METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS']
+
+# export const GET = requireAuth(...)  /  export async function POST(
+HANDLER_EXPORT = re.compile(
+    r'^export\s+(?:const\s+(' + '|'.join(ROUTE_METHODS) + r')\s*=|'
+    r'(?:async\s+)?function\s+(' + '|'.join(ROUTE_METHODS) + r')\s*\()',
+    re.MULTILINE)
+
+# Value used for a dynamic segment with no configured sample
+DEFAULT_SAMPLE_VALUE = "1"
+DEFAULT_SAMPLE_VALUES: Dict[str, str] = {"id": DEFAULT_SAMPLE_VALUE}
+
+class DiscoveredRoute(NamedTuple):
+    method: str
+    path: str
+    description: str
+    file: Path
+    params: Tuple[str, ...]
+
+def handler_methods(content: str) -> List[str]:
+    """HTTP methods a route module exports, in ROUTE_METHODS order"""
+    found = {m.group(1) or m.group(2) for m in HANDLER_EXPORT.finditer(content)}
+    return [method for method in ROUTE_METHODS if method in found]
+
+def route_url(route_file: Path, api_dir: Path = API_DIR,
+              samples: Optional[Dict[str, str]] = None) -> Tuple[str, Tuple[str, ...]]:
+    """
+    URL path for a route.ts, following the app router's folder conventions:
+    (group) folders are dropped, [param] / [...param] / [[...param]] are
+    filled from samples. Returns (url_path, dynamic_param_names).
+    """
+    samples = samples if samples is not None else DEFAULT_SAMPLE_VALUES
+    segments = []
+    params = []
+    for segment in route_file.parent.relative_to(api_dir).parts:
+        if segment.startswith('(') and segment.endswith(')'):
+            continue
+        if segment.startswith('[') and segment.endswith(']'):
+            name = segment.strip('[]')
+            optional = segment.startswith('[[')
+            name = name[3:] if name.startswith('...') else name
+            params.append(name)
+            value = samples.get(name, "" if optional else DEFAULT_SAMPLE_VALUE)
+            if value:
+                segments.append(value)
+            continue
+        segments.append(segment)
+    return "/api/" + "/".join(segments) if segments else "/api", tuple(params)
+
+def discover_routes(api_dir: Path = API_DIR, samples: Optional[Dict[str, str]] = None,
+                    warnings: Optional[List[str]] = None) -> List[DiscoveredRoute]:
+    """
+    Every (method, URL) handled under api_dir, in file order.
+    Route files with no recognisable handler export are skipped and named in
+    warnings, when given.
+    """
+    routes = []
+    for route_file in find_route_files(api_dir):
+        routes.extend(routes_for_file(route_file, api_dir, samples, warnings))
+    return routes
+
+def routes_for_file(route_file: Path, api_dir: Path = API_DIR, samples: Optional[Dict[str, str]] = None,
+                    warnings: Optional[List[str]] = None) -> List[DiscoveredRoute]:
+    """The (method, URL) pairs one route.ts serves, read from its current content"""
+    if any(part.startswith(('_', '@')) for part in route_file.relative_to(api_dir).parts):
+        # Private (_folder) and parallel-slot (@folder) folders are not URL segments
+        return []
+    methods = handler_methods(route_file.read_text(encoding='utf-8'))
+    if not methods:
+        if warnings is not None:
+            warnings.append(f"No exported handlers in {route_file.relative_to(api_dir)}")
+        return []
+    path, params = route_url(route_file, api_dir, samples)
+    description = route_file.parent.relative_to(api_dir).as_posix()
+    return [DiscoveredRoute(method, path, description, route_file, params) for method in methods]
+
+def parse_samples(assignments: List[str], samples_file: Optional[Path] = None) -> Dict[str, str]:
+    """
+    Sample values for dynamic segments: defaults, then a JSON object file,
+    then NAME=VALUE assignments.
+    """
+    samples = dict(DEFAULT_SAMPLE_VALUES)
+    if samples_file:
+        with open(samples_file, 'r', encoding='utf-8') as f:
+            samples.update({str(k): str(v) for k, v in json.load(f).items()})
+    for assignment in assignments:
+        name, sep, value = assignment.partition('=')
+        if not sep:
+            raise SystemExit(f"Expected NAME=VALUE, got {assignment!r}")
+        samples[name.strip('[].')] = value
+    return samples
+
+def add_sample_arguments(parser: argparse.ArgumentParser):
+    """--param / --samples options shared by the route tools"""
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="Sample value for a [NAME] segment (repeatable)")
+    parser.add_argument("--samples", type=Path, help="JSON object of sample values for dynamic segments")
+
+def main():
+    parser = argparse.ArgumentParser(description="List API routes discovered from the app/api tree")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    add_sample_arguments(parser)
+    args = parser.parse_args()
+
+    warnings: List[str] = []
+    routes = discover_routes(args.api_dir, parse_samples(args.param, args.samples), warnings)
+    files = {route.file for route in routes}
+
+    print("=" * 100)
+    print(f" DISCOVERED API ROUTES ({len(routes)} handlers in {len(files)} files)")
+    print("=" * 100)
+    for route in routes:
+        params = f"  [{', '.join(route.params)}]" if route.params else ""
+        print(f"  {route.method:<8} {route.path}{params}")
+
+    counts: Dict[str, int] = {}
+    for route in routes:
+        counts[route.method] = counts.get(route.method, 0) + 1
+    print("\nBy method: " + ", ".join(f"{method} {counts[method]}" for method in ROUTE_METHODS if method in counts))
+    for warning in warnings:
+        print(f"[WARN] {warning}")
+    print("=" * 100)
+
+if __name__ == "__main__":
+    main()
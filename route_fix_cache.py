@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Route Fix Cache
+Persistent record of which fixers already ran clean on a route file's exact
+content, so unchanged files can skip the regex work on later runs.
+"""
+
+import hashlib
+import inspect
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import bracket_index
+import edit_buffer
+import fixer_registry
+import fixpoint_engine
+from route_tree import REPO_ROOT
+
+CACHE_FILE = REPO_ROOT / ".route-fix-cache.json"
+CACHE_FORMAT = 1
+
+# Modules whose rules and engines every fixer shares; editing any of them
+# must invalidate clean results for all fixers
+SHARED_FIXER_MODULES = [fixer_registry, fixpoint_engine, bracket_index, edit_buffer]
+
+def content_hash(content: str) -> str:
+    """Stable digest of a file's text"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def fixer_version(fixer: Callable) -> str:
+    """
+    Version a fixer by the source of the module that defines it.
+    Any edit to its patterns (or anything else in that module, or in the
+    shared rule registry and engines) yields a new version, which invalidates
+    every cached clean result for the fixer.
+    """
+    module = inspect.getmodule(fixer)
+    source = inspect.getsource(module) if module else ""
+    source += "".join(inspect.getsource(shared) for shared in SHARED_FIXER_MODULES)
+    digest = hashlib.sha256(f"{fixer.__qualname__}\n{source}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def cache_key(filepath: Path) -> str:
+    """Cache entries are keyed by repo-relative posix path"""
+    try:
+        return Path(filepath).resolve().relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return Path(filepath).resolve().as_posix()
+
+def clean_fixers(entry: Dict, digest: str, versions: Dict[str, str]) -> Dict[str, float]:
+    """
+    Fixers recorded clean for this exact content at their current version.
+    Returns {fixer_name: seconds_the_clean_run_took}
+    """
+    if not entry or entry.get("hash") != digest:
+        return {}
+    return {
+        name: record["seconds"]
+        for name, record in entry.get("clean", {}).items()
+        if versions.get(name) == record.get("version")
+    }
+
+class FixCache:
+    """JSON-backed clean-run cache with hit/miss accounting"""
+
+    def __init__(self, path: Path = CACHE_FILE, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self.files: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        if enabled:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("format") == CACHE_FORMAT:
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            self.files = {}
+
+    def save(self):
+        if not self.enabled:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"format": CACHE_FORMAT, "files": self.files}, f, indent=1, sort_keys=True)
+
+    def entry(self, key: str) -> Dict:
+        return self.files.get(key, {}) if self.enabled else {}
+
+    def record(self, key: str, digest: str, versions: Dict[str, str],
+               hits: Dict[str, float], clean_runs: List[Tuple[str, float]], stage_names: List[str]):
+        """
+        Fold one file's outcome into the cache and the run counters.
+        hits: stages skipped because they were already clean (name -> seconds saved)
+        clean_runs: stages that ran on this exact content and changed nothing
+        """
+        if not self.enabled:
+            return
+
+        self.hits += len(hits)
+        self.misses += len(stage_names) - len(hits)
+        self.saved_seconds += sum(hits.values())
+
+        entry = self.files.get(key)
+        if not entry or entry.get("hash") != digest:
+            entry = {"hash": digest, "clean": {}}
+            self.files[key] = entry
+        for name, seconds in clean_runs:
+            entry["clean"][name] = {"version": versions[name], "seconds": seconds}
+
+    def print_report(self):
+        if not self.enabled:
+            print("\nCache: disabled")
+            return
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        print(f"\nCache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), "
+              f"~{self.saved_seconds * 1000:.1f} ms of fixer time saved")
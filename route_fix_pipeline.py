@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Route Fix Pipeline
+Runs every route fixer in a single pass: each route.ts is read once, the
+ordered chain of fixers is applied to the in-memory content, and the file is
+written back at most once.
+"""
+
+import argparse
+import time
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from comprehensive_fix_all_routes import fix_route_syntax_content
+from edit_buffer import EditBuffer, EditLog, attribution, unified_diff
+from fix_final_closures import fix_final_closure_content
+from fix_route_syntax import fix_route_content
+from fix_zod_schemas import fix_zod_schemas_content
+from fixpoint_engine import FixpointBudgetExceeded
+from remove_standalone_closures import remove_standalone_closures_content
+from route_fix_cache import CACHE_FILE, FixCache, cache_key, clean_fixers, content_hash, fixer_version
+from route_tree import API_DIR, find_route_files, map_route_files, resolve_jobs
+from smart_pattern_fix import smart_fix_content
+from ultimate_zod_fix import ultimate_zod_fix_content
+
+BUDGET_MARKER = "BUDGET EXCEEDED:"
+
+def final_closure_stage(content: str, buffers: Optional[List[EditBuffer]] = None) -> Tuple[str, List[str]]:
+    """Adapt fix_final_closure_content to the (content, fixes) stage signature"""
+    content, fix_desc = fix_final_closure_content(content, buffers)
+    return content, [fix_desc] if fix_desc else []
+
+# Ordered fixer chain. Each stage takes the current source (and optionally a
+# list to receive its EditBuffers) and returns (new_content, list_of_fixes_applied);
+# later stages see earlier edits.
+PIPELINE_STAGES: List[Tuple[str, Callable[..., Tuple[str, List[str]]]]] = [
+    ("fix_route_syntax", fix_route_syntax_content),
+    ("ultimate_zod_fix", ultimate_zod_fix_content),
+    ("fix_zod_schemas", fix_zod_schemas_content),
+    ("fix_route_file", fix_route_content),
+    ("smart_fix", smart_fix_content),
+    ("remove_standalone_closures", remove_standalone_closures_content),
+    ("fix_final_closure", final_closure_stage),
+]
+
+def select_stages(names: List[str]) -> List[Tuple[str, Callable[..., Tuple[str, List[str]]]]]:
+    """Pick stages by name, keeping pipeline order"""
+    known = {name for name, _ in PIPELINE_STAGES}
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(unknown)}")
+    return [(name, fixer) for name, fixer in PIPELINE_STAGES if name in names]
+
+def new_stage_stats(stages) -> Dict[str, Dict[str, float]]:
+    """Empty per-stage counters: seconds spent, fixes found, files changed, cache skips, budget hits"""
+    return {name: {"seconds": 0.0, "matches": 0, "files": 0, "cached": 0, "budget": 0} for name, _ in stages}
+
+def run_stages(content: str, stages, stage_stats: Dict[str, Dict[str, float]],
+               cached_clean: Optional[Dict[str, float]] = None,
+               log: Optional[EditLog] = None) -> Tuple[str, List[str], List[Tuple[str, float]]]:
+    """
+    Run the fixer chain over one file's content.
+    Stages listed in cached_clean are already known to change nothing on this
+    exact content and are skipped for as long as the content is unchanged.
+    A stage that runs out of fixpoint budget leaves the content as it was and
+    adds a BUDGET_MARKER entry to the fixes.
+    Returns (new_content, list_of_fixes_applied, clean_runs) where clean_runs
+    holds (stage, seconds) for stages that ran on the original content,
+    changed nothing and reported nothing. Updates stage_stats in place.
+    When log is given, each stage's edit spans are recorded in it under the
+    stage name; a stage that changes the content without reporting spans is
+    recorded as one unattributed whole-text edit.
+    """
+    cached_clean = cached_clean or {}
+    fixes_applied = []
+    clean_runs = []
+    unchanged = True
+
+    for name, fixer in stages:
+        if unchanged and name in cached_clean:
+            stage_stats[name]["cached"] += 1
+            continue
+
+        started = time.perf_counter()
+        buffers: Optional[List[EditBuffer]] = [] if log is not None else None
+        try:
+            new_content, fixes = fixer(content, buffers=buffers) if log is not None else fixer(content)
+        except FixpointBudgetExceeded as e:
+            # Drop this stage's edits for the file and report it; later stages still run
+            new_content, fixes = content, [f"{BUDGET_MARKER} {e}"]
+            buffers = []
+            stage_stats[name]["budget"] += 1
+        elapsed = time.perf_counter() - started
+        stage_stats[name]["seconds"] += elapsed
+        stage_stats[name]["matches"] += len(fixes)
+        if new_content != content:
+            stage_stats[name]["files"] += 1
+            unchanged = False
+        elif unchanged and not fixes:
+            clean_runs.append((name, elapsed))
+        fixes_applied.extend(f"[{name}] {fix}" for fix in fixes)
+        if log is not None and new_content != content:
+            if not buffers:
+                whole = EditBuffer(content)
+                whole.add(0, len(content), new_content, "(unattributed)")
+                buffers = [whole]
+            for buffer in buffers:
+                log.record(buffer, name)
+        content = new_content
+
+    return content, fixes_applied, clean_runs
+
+def merge_stage_stats(total: Dict[str, Dict[str, float]], part: Dict[str, Dict[str, float]]):
+    """Add one file's stage counters into the running totals"""
+    for name, stats in part.items():
+        for key, value in stats.items():
+            total[name][key] += value
+
+def process_file(filepath: Path, stages, stage_stats, dry_run: bool = False,
+                 cache_entry: Optional[Dict] = None, versions: Optional[Dict[str, str]] = None,
+                 diff: bool = False):
+    """
+    Load one route file, run the whole chain, write it back if anything changed.
+    When versions is given, cache_entry is consulted to skip stages already
+    clean on this content.
+    Returns (was_modified, list_of_fixes_applied, cache_update, edit_report)
+    where cache_update is (digest, hits, clean_runs), or None without a
+    cache, and edit_report is (diff_lines, attribution) built from the
+    stages' edit spans when diff is set, else None.
+    """
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            original_content = f.read()
+
+        cache_update = None
+        cached_clean = {}
+        if versions is not None:
+            digest = content_hash(original_content)
+            cached_clean = clean_fixers(cache_entry, digest, versions)
+
+        log = EditLog(original_content) if diff else None
+        content, fixes_applied, clean_runs = run_stages(original_content, stages, stage_stats, cached_clean, log)
+        edit_report = None
+        if log is not None and content != original_content:
+            edits = log.net_edits()
+            edit_report = (unified_diff(original_content, edits, cache_key(filepath)), attribution(edits))
+
+        if versions is not None:
+            hits = {name: seconds for name, seconds in cached_clean.items()
+                    if name in stage_stats and stage_stats[name]["cached"]}
+            cache_update = (digest, hits, clean_runs)
+
+        if content != original_content:
+            if not dry_run:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(content)
+            return True, fixes_applied, cache_update, edit_report
+
+        # Unchanged files still carry their fixes list so budget hits get reported
+        return False, fixes_applied, cache_update, edit_report
+
+    except Exception as e:
+        print(f"[ERROR] Failed to process {filepath}: {e}")
+        return False, [], None, None
+
+def pipeline_worker(stage_names: List[str], dry_run: bool, cache_entries: Optional[Dict[str, Dict]],
+                    versions: Optional[Dict[str, str]], diff: bool, filepath: str):
+    """
+    Pool entry point: run the named stages over one file.
+    Returns (was_modified, list_of_fixes_applied, stage_stats, cache_update, edit_report)
+    """
+    stages = select_stages(stage_names)
+    stage_stats = new_stage_stats(stages)
+    cache_entry = cache_entries.get(cache_key(filepath)) if cache_entries else None
+    was_modified, fixes, cache_update, edit_report = process_file(
+        Path(filepath), stages, stage_stats, dry_run, cache_entry, versions, diff)
+    return was_modified, fixes, stage_stats, cache_update, edit_report
+
+def print_stage_report(stage_stats: Dict[str, Dict[str, float]]):
+    """Print time, fixes found and files changed for each stage"""
+    # Stage time is summed across workers, so shares are of total stage time
+    total_seconds = sum(stats["seconds"] for stats in stage_stats.values())
+    print("\nStage timings:")
+    print(f"  {'Stage':<30} {'Time (ms)':>10} {'Share':>7} {'Matches':>8} {'Files':>6} {'Cached':>7}")
+    for name, stats in stage_stats.items():
+        share = 100 * stats["seconds"] / total_seconds if total_seconds else 0
+        print(f"  {name:<30} {stats['seconds'] * 1000:>10.1f} {share:>6.1f}% "
+              f"{stats['matches']:>8d} {stats['files']:>6d} {stats['cached']:>7d}")
+
+def print_attribution_report(edit_totals: Dict[str, Dict[str, int]]):
+    """Edits per stage/rule across all files, from the recorded spans"""
+    print("\nEdit attribution:")
+    print(f"  {'Stage/rule':<55} {'Files':>6} {'Edits':>6} {'Removed':>8} {'Inserted':>9}")
+    for source, counts in sorted(edit_totals.items(), key=lambda x: (-x[1]["edits"], x[0])):
+        print(f"  {source:<55} {counts['files']:>6d} {counts['edits']:>6d} "
+              f"{counts['removed']:>8d} {counts['inserted']:>9d}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all route fixers in one pass per file")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory")
+    parser.add_argument("--stages", nargs="+", metavar="STAGE",
+                        help="Run only these stages (pipeline order is kept)")
+    parser.add_argument("--dry-run", action="store_true", help="Report fixes without writing files")
+    parser.add_argument("--diff", action="store_true",
+                        help="Print a unified diff per changed file, each hunk attributed to its rules")
+    parser.add_argument("--list-stages", action="store_true", help="List pipeline stages and exit")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = one per CPU, default 1)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore and do not update the clean-run cache")
+    parser.add_argument("--cache-file", type=Path, default=CACHE_FILE, help="Clean-run cache location")
+    args = parser.parse_args()
+
+    if args.list_stages:
+        for name, fixer in PIPELINE_STAGES:
+            print(f"{name:<30} {fixer.__module__}.{fixer.__name__}")
+        return
+
+    stages = select_stages(args.stages) if args.stages else PIPELINE_STAGES
+    route_files = find_route_files(args.api_dir)
+
+    print("=" * 80)
+    print(" ROUTE FIX PIPELINE")
+    print("=" * 80)
+    print(f"Processing {len(route_files)} API route files through {len(stages)} stages"
+          f"{' (dry run)' if args.dry_run else ''}...")
+    print()
+
+    fixed_count = 0
+    skipped_count = 0
+    fix_summary = {}
+    budget_hits = []
+    stage_stats = new_stage_stats(stages)
+    cache = FixCache(args.cache_file, enabled=not args.no_cache)
+    versions = {name: fixer_version(fixer) for name, fixer in stages} if cache.enabled else None
+    stage_names = [name for name, _ in stages]
+    started = time.perf_counter()
+
+    edit_totals: Dict[str, Dict[str, int]] = {}
+    worker = partial(pipeline_worker, stage_names, args.dry_run, cache.files, versions, args.diff)
+    results = map_route_files(worker, route_files, args.jobs)
+
+    for filepath, (was_modified, fixes, file_stats, cache_update, edit_report) in zip(route_files, results):
+        relative_path = filepath.relative_to(args.api_dir)
+        merge_stage_stats(stage_stats, file_stats)
+        if cache_update:
+            digest, hits, clean_runs = cache_update
+            cache.record(cache_key(filepath), digest, versions, hits, clean_runs, stage_names)
+        budget_hits.extend((relative_path, fix) for fix in fixes if BUDGET_MARKER in fix)
+
+        if was_modified:
+            fixed_count += 1
+            print(f"[FIXED] {relative_path}")
+            for fix in fixes:
+                print(f"  - {fix}")
+                if BUDGET_MARKER not in fix:
+                    fix_summary[fix] = fix_summary.get(fix, 0) + 1
+            if edit_report:
+                diff_lines, file_attribution = edit_report
+                print(''.join(diff_lines), end='')
+                for source, counts in file_attribution.items():
+                    totals = edit_totals.setdefault(source, {"files": 0, "edits": 0, "removed": 0, "inserted": 0})
+                    totals["files"] += 1
+                    for key, value in counts.items():
+                        totals[key] += value
+        else:
+            skipped_count += 1
+
+    total_seconds = time.perf_counter() - started
+    cache.save()
+
+    print("\n" + "=" * 80)
+    print(" SUMMARY")
+    print("=" * 80)
+    print(f"Total files: {len(route_files)}")
+    print(f"Fixed: {fixed_count}")
+    print(f"Already correct: {skipped_count}")
+    print(f"Total time: {total_seconds * 1000:.1f} ms (wall, {resolve_jobs(args.jobs)} job(s))")
+
+    print_stage_report(stage_stats)
+    if args.diff:
+        print_attribution_report(edit_totals)
+    cache.print_report()
+
+    if budget_hits:
+        print(f"\nFiles over fixpoint budget ({len(budget_hits)}), stage edits skipped:")
+        for relative_path, fix in budget_hits:
+            print(f"  {relative_path}: {fix}")
+
+    if fix_summary:
+        print("\nFixes Applied:")
+        for fix_type, count in sorted(fix_summary.items(), key=lambda x: -x[1]):
+            print(f"  {count:3d}x {fix_type}")
+
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
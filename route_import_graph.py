@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Route Import Graph
+Import graph of the admin service's source, used to work out which API
+routes a change can affect. Specifiers are resolved the way the TypeScript
+config says: relative paths, tsconfig "paths" aliases (@/* -> ./src/*) and
+baseUrl; anything else is an npm package and left out. Per-file imports are
+cached by content hash, so a rebuild only re-parses files that changed.
+"""
+
+import argparse
+import json
+import re
+import subprocess
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from route_discovery import add_sample_arguments, parse_samples, routes_for_file
+from route_fix_cache import content_hash
+from route_tree import API_DIR, REPO_ROOT
+
+SERVICE_DIR = REPO_ROOT / "services" / "ash-admin"
+SOURCE_DIR = SERVICE_DIR / "src"
+GRAPH_CACHE_FILE = REPO_ROOT / ".route-import-graph.json"
+GRAPH_CACHE_FORMAT = 1
+
+# Service files outside the graph whose change can alter any route's build
+GLOBAL_INPUTS = {"tsconfig.json", "package.json", "package-lock.json", "next.config.js",
+                 "next.config.mjs", "next.config.ts", "schema.prisma", ".env", ".env.local"}
+
+SOURCE_SUFFIXES = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+# Tried in this order for an extensionless specifier, as the bundler does
+RESOLVE_SUFFIXES = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs", ".json")
+
+# import x from '...' / import '...' / export {x} from '...' / import('...') / require('...')
+IMPORT_SPECIFIER = re.compile(
+    r'''(?:\bimport\s+(?:type\s+)?(?:[\w*{}\s,$]+?\s+from\s+)?|\bexport\s+(?:type\s+)?[\w*{}\s,$]*?\s*from\s+|'''
+    r'''\bimport\s*\(\s*|\brequire\s*\(\s*)['"]([^'"\n]+)['"]''')
+
+# Comments, skipped while keeping string contents (URLs contain //) intact
+JSONC_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|//[^\n]*|/\*.*?\*/', re.DOTALL)
+TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+CODE_COMMENT = re.compile(r'''"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`|//[^\n]*|/\*.*?\*/''', re.DOTALL)
+
+def load_tsconfig(path: Path) -> Dict:
+    """tsconfig.json, which may hold comments and trailing commas; "extends" is followed"""
+    text = path.read_text(encoding='utf-8')
+    text = JSONC_TOKEN.sub(lambda m: m.group(0) if m.group(0).startswith('"') else "", text)
+    config = json.loads(TRAILING_COMMA.sub(r'\1', text))
+    parent = config.get("extends")
+    if isinstance(parent, str) and parent.startswith('.'):
+        parent_path = (path.parent / parent)
+        parent_path = parent_path if parent_path.suffix == ".json" else parent_path.with_suffix(".json")
+        if parent_path.exists():
+            base = load_tsconfig(parent_path)
+            merged = dict(base.get("compilerOptions", {}))
+            merged.update(config.get("compilerOptions", {}))
+            config["compilerOptions"] = merged
+    return config
+
+def strip_comments(source: str) -> str:
+    """Drop // and /* */ comments so commented-out imports do not count"""
+    return CODE_COMMENT.sub(lambda m: m.group(0) if m.group(0)[0] in "\"'`" else " ", source)
+
+def import_specifiers(source: str) -> List[str]:
+    """Module specifiers a source file imports, in order, without duplicates"""
+    seen = dict.fromkeys(m.group(1) for m in IMPORT_SPECIFIER.finditer(strip_comments(source)))
+    return list(seen)
+
+class ModuleResolver:
+    """Maps specifiers to files of the service, following tsconfig paths and baseUrl"""
+
+    def __init__(self, service_dir: Path = SERVICE_DIR, files: Optional[Set[Path]] = None):
+        options = load_tsconfig(service_dir / "tsconfig.json").get("compilerOptions", {})
+        self.base_url = (service_dir / options.get("baseUrl", ".")).resolve()
+        # [(prefix, suffix, [target patterns])], longest prefix first as TypeScript matches
+        self.paths: List[Tuple[str, str, List[str]]] = []
+        for pattern, targets in options.get("paths", {}).items():
+            prefix, star, suffix = pattern.partition('*')
+            self.paths.append((prefix, suffix if star else None, targets))
+        self.paths.sort(key=lambda entry: -len(entry[0]))
+        self.files = files
+
+    def _exists(self, path: Path) -> bool:
+        return path in self.files if self.files is not None else path.is_file()
+
+    def _file(self, candidate: Path) -> Optional[Path]:
+        """candidate as given, with an extension, or as a directory index"""
+        if candidate.suffix in RESOLVE_SUFFIXES and self._exists(candidate):
+            return candidate
+        for suffix in RESOLVE_SUFFIXES:
+            with_suffix = candidate.with_name(candidate.name + suffix)
+            if self._exists(with_suffix):
+                return with_suffix
+        for suffix in RESOLVE_SUFFIXES:
+            index = candidate / f"index{suffix}"
+            if self._exists(index):
+                return index
+        return None
+
+    def resolve(self, specifier: str, importer: Path) -> Optional[Path]:
+        if specifier.startswith(('./', '../')) or specifier in ('.', '..'):
+            return self._file(Path(_normalize(importer.parent / specifier)))
+        for prefix, suffix, targets in self.paths:
+            if suffix is None:
+                if specifier != prefix:
+                    continue
+                captured = ""
+            elif specifier.startswith(prefix) and specifier.endswith(suffix) and \
+                    len(specifier) >= len(prefix) + len(suffix):
+                captured = specifier[len(prefix):len(specifier) - len(suffix)]
+            else:
+                continue
+            for target in targets:
+                found = self._file(Path(_normalize(self.base_url / target.replace('*', captured))))
+                if found:
+                    return found
+            return None
+        # moduleResolution node with a baseUrl also resolves bare paths from it
+        return self._file(Path(_normalize(self.base_url / specifier)))
+
+def _normalize(path: Path) -> str:
+    """Collapse .. without touching the filesystem (files may not exist)"""
+    parts: List[str] = []
+    for part in path.parts:
+        if part == '..' and parts and parts[-1] != path.anchor:
+            parts.pop()
+        elif part != '.':
+            parts.append(part)
+    return str(Path(*parts)) if parts else "."
+
+def find_source_files(source_dir: Path = SOURCE_DIR) -> List[Path]:
+    return sorted(path for path in source_dir.rglob("*")
+                  if path.suffix in SOURCE_SUFFIXES and path.is_file() and "node_modules" not in path.parts)
+
+class ImportGraph:
+    """
+    file -> files it imports, plus the reverse edges. Built from a cache of
+    per-file specifiers keyed by content hash; resolution is redone on every
+    build because adding or removing a file can change what a specifier
+    resolves to.
+    """
+
+    def __init__(self, service_dir: Path = SERVICE_DIR, source_dir: Path = SOURCE_DIR,
+                 cache_path: Optional[Path] = GRAPH_CACHE_FILE):
+        self.service_dir = service_dir.resolve()
+        self.source_dir = source_dir.resolve()
+        self.cache_path = cache_path
+        self.imports: Dict[Path, Set[Path]] = {}
+        self.importers: Dict[Path, Set[Path]] = {}
+        self.unresolved: Dict[Path, List[str]] = {}
+        self.parsed = 0
+        self.reused = 0
+        self._entries: Dict[str, Dict] = {}
+
+    def _key(self, path: Path) -> str:
+        return path.relative_to(self.service_dir).as_posix()
+
+    def _load_cache(self):
+        self._entries = {}
+        if self.cache_path and self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("format") == GRAPH_CACHE_FORMAT:
+                    self._entries = data.get("files", {})
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def _save_cache(self, entries: Dict[str, Dict]):
+        if not self.cache_path:
+            return
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({"format": GRAPH_CACHE_FORMAT, "files": entries}, f, indent=1, sort_keys=True)
+
+    def _specifiers(self, path: Path, entries: Dict[str, Dict]) -> List[str]:
+        key = self._key(path)
+        entry = self._entries.get(key)
+        stat = path.stat()
+        if entry and (entry.get("mtime_ns"), entry.get("size")) == (stat.st_mtime_ns, stat.st_size):
+            entries[key] = entry
+            self.reused += 1
+            return entry["specifiers"]
+        source = path.read_text(encoding='utf-8', errors='replace')
+        digest = content_hash(source)
+        if entry and entry.get("digest") == digest:
+            # Touched, not changed
+            self.reused += 1
+            specifiers = entry["specifiers"]
+        else:
+            self.parsed += 1
+            specifiers = import_specifiers(source)
+        entries[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                        "digest": digest, "specifiers": specifiers}
+        return specifiers
+
+    def build(self) -> 'ImportGraph':
+        self._load_cache()
+        files = [path.resolve() for path in find_source_files(self.source_dir)]
+        resolver = ModuleResolver(self.service_dir, set(files))
+        entries: Dict[str, Dict] = {}
+        self.imports = {path: set() for path in files}
+        self.importers = {path: set() for path in files}
+        self.unresolved = {}
+        self.parsed = self.reused = 0
+        for path in files:
+            for specifier in self._specifiers(path, entries):
+                target = resolver.resolve(specifier, path)
+                if target is not None:
+                    self.imports[path].add(target)
+                    self.importers.setdefault(target, set()).add(path)
+                elif specifier.startswith(('.', '@/')):
+                    # Local-looking but missing: worth knowing about
+                    self.unresolved.setdefault(path, []).append(specifier)
+        self._save_cache(entries)
+        self._entries = entries
+        return self
+
+    def dependents(self, changed: Iterable[Path]) -> Set[Path]:
+        """Every file that imports any changed file, directly or transitively, and the files themselves"""
+        seen: Set[Path] = set()
+        queue = deque(path.resolve() for path in changed)
+        while queue:
+            path = queue.popleft()
+            if path in seen:
+                continue
+            seen.add(path)
+            queue.extend(self.importers.get(path, ()))
+        return seen
+
+    def affected_route_files(self, changed: Iterable[Path], api_dir: Path = API_DIR) -> List[Path]:
+        """route.ts files under api_dir that depend on any changed file"""
+        api_dir = api_dir.resolve()
+        changed = [path.resolve() for path in changed]
+        if any(path.name in GLOBAL_INPUTS and self.service_dir in path.parents for path in changed):
+            candidates = set(self.imports)
+        else:
+            candidates = self.dependents(changed)
+        return sorted(path for path in candidates
+                      if path.name == "route.ts" and api_dir in path.parents)
+
+def git_changed_files(since: str = "HEAD", cwd: Path = REPO_ROOT) -> List[Path]:
+    """Files changed since a git revision, including uncommitted and untracked ones"""
+    def lines(*args: str) -> List[str]:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True)
+        return [line for line in result.stdout.splitlines() if line]
+
+    names = lines("diff", "--name-only", since) + lines("ls-files", "--others", "--exclude-standard")
+    return [(cwd / name).resolve() for name in dict.fromkeys(names)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the API routes a set of changed files can affect")
+    parser.add_argument("files", nargs="*", type=Path, help="Changed source files")
+    parser.add_argument("--since", metavar="REV", help="Use the files changed since a git revision (e.g. HEAD)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not write the graph cache")
+    parser.add_argument("--unresolved", action="store_true", help="List local imports that resolve to no file")
+    add_sample_arguments(parser)
+    args = parser.parse_args()
+
+    graph = ImportGraph(cache_path=None if args.no_cache else GRAPH_CACHE_FILE).build()
+    edges = sum(len(targets) for targets in graph.imports.values())
+    changed = [path.resolve() for path in args.files] + (git_changed_files(args.since) if args.since else [])
+    route_files = graph.affected_route_files(changed)
+    samples = parse_samples(args.param, args.samples)
+
+    print("=" * 80)
+    print(f" ROUTE IMPORT GRAPH ({len(graph.imports)} files, {edges} edges; "
+          f"{graph.parsed} parsed, {graph.reused} from cache)")
+    print("=" * 80)
+    if args.unresolved:
+        for path, specifiers in sorted(graph.unresolved.items()):
+            print(f"  [UNRESOLVED] {path.relative_to(graph.service_dir)}: {', '.join(specifiers)}")
+        print()
+    if not changed:
+        print("No changed files given")
+        return
+    print(f"{len(changed)} changed file(s) -> {len(route_files)} affected route file(s)")
+    for route_file in route_files:
+        for route in routes_for_file(route_file, samples=samples):
+            print(f"  {route.method:<8} {route.path}")
+    print("=" * 80)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Route Tree Helpers
+Shared discovery of API route files and (optionally parallel) per-file
+execution for the route fixer scripts.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent
+API_DIR = REPO_ROOT / "services" / "ash-admin" / "src" / "app" / "api"
+
+def find_route_files(api_dir: Path = API_DIR) -> List[Path]:
+    """Return every route.ts under api_dir in a stable order"""
+    return sorted(api_dir.rglob("route.ts"))
+
+def resolve_jobs(jobs: int) -> int:
+    """--jobs 0 means one worker per CPU"""
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+def _run_captured(worker: Callable[[str], Any], filepath: str) -> Tuple[Any, str]:
+    """Run worker in a pool process, capturing anything it prints"""
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        result = worker(filepath)
+    return result, buffer.getvalue()
+
+def map_route_files(worker: Callable[[str], Any], route_files: List[Path], jobs: int = 1) -> Iterator[Any]:
+    """
+    Apply worker to every route file, yielding results in route_files order.
+    With jobs > 1 the files are spread across a process pool; anything the
+    worker prints is replayed just before its result, so the log matches a
+    serial run whatever the job count. worker must be a module-level function
+    so it can be pickled.
+    """
+    paths = [str(p) for p in route_files]
+    jobs = resolve_jobs(jobs)
+
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield worker(path)
+        return
+
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for result, output in pool.map(partial(_run_captured, worker), paths, chunksize=chunksize):
+            if output:
+                print(output, end="")
+            yield result
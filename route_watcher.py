@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Route Watcher
+Polls a source tree for changed files without inotify or any third-party
+watcher: a file is re-hashed only when its mtime or size moved, and counts as
+changed only if its content hash differs, so editors that touch files on
+focus or rewrite them unchanged do not trigger a retest.
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from route_fix_cache import content_hash
+
+# A changed file must keep the same mtime and size this long before it is
+# reported, so a save written in several steps is seen once, complete
+SETTLE_SECONDS = 0.3
+
+class FileState(NamedTuple):
+    mtime_ns: int
+    size: int
+    digest: str
+
+class Changes(NamedTuple):
+    modified: List[Path]
+    added: List[Path]
+    removed: List[Path]
+
+    def __bool__(self) -> bool:
+        return bool(self.modified or self.added or self.removed)
+
+    @property
+    def changed(self) -> List[Path]:
+        """Files whose current content needs looking at"""
+        return sorted(self.modified + self.added)
+
+class TreeWatcher:
+    """Snapshot of files matching pattern under root, diffed on each poll"""
+
+    def __init__(self, root: Path, pattern: str = "route.ts", settle: float = SETTLE_SECONDS):
+        self.root = root
+        self.pattern = pattern
+        self.settle = settle
+        self.files: Dict[Path, FileState] = {}
+        self.scan()
+
+    def _state(self, path: Path, previous: Optional[FileState] = None) -> Optional[FileState]:
+        try:
+            stat = path.stat()
+            if previous and (stat.st_mtime_ns, stat.st_size) == (previous.mtime_ns, previous.size):
+                return previous
+            return FileState(stat.st_mtime_ns, stat.st_size, content_hash(path.read_text(encoding='utf-8')))
+        except (OSError, UnicodeDecodeError):
+            # Deleted or half-written between listing and reading
+            return None
+
+    def scan(self):
+        self.files = {}
+        for path in sorted(self.root.rglob(self.pattern)):
+            state = self._state(path)
+            if state:
+                self.files[path] = state
+
+    def _settled(self, paths: List[Path]):
+        """Wait until none of paths has changed mtime or size for self.settle seconds"""
+        def stats():
+            result = {}
+            for path in paths:
+                try:
+                    stat = path.stat()
+                    result[path] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    result[path] = None
+            return result
+
+        last = stats()
+        while True:
+            time.sleep(self.settle)
+            current = stats()
+            if current == last:
+                return
+            last = current
+
+    def poll(self) -> Changes:
+        """Files modified, added or removed since the previous poll"""
+        current = set(self.root.rglob(self.pattern))
+        candidates = [path for path in current
+                      if path not in self.files or self._moved(path)]
+        removed = sorted(path for path in self.files if path not in current)
+        if candidates:
+            self._settled(candidates)
+
+        modified, added = [], []
+        for path in candidates:
+            previous = self.files.get(path)
+            state = self._state(path, previous)
+            if state is None:
+                continue
+            if previous is None:
+                added.append(path)
+            elif state.digest != previous.digest:
+                modified.append(path)
+            self.files[path] = state
+        for path in removed:
+            del self.files[path]
+        return Changes(sorted(modified), sorted(added), removed)
+
+    def _moved(self, path: Path) -> bool:
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        state = self.files[path]
+        return (stat.st_mtime_ns, stat.st_size) != (state.mtime_ns, state.size)
@@ -1,13 +1,27 @@
-import { PrismaClient } from "@prisma/client";
+import { Prisma, PrismaClient } from "@prisma/client";
 // import { performanceExtension, queryLoggingExtension, autoPaginationExtension} from './performance/prisma-extensions'
 
+// Client whose "query" events can be subscribed to with $on
+type DatabaseClient = PrismaClient<Prisma.PrismaClientOptions, "query">;
+
 // Create single prisma instance (singleton pattern)
-const prismaClientSingleton = () => {
-  return new PrismaClient({
-    log:
-      process.env.NODE_ENV === "development"
-        ? ["query", "info", "warn", "error"]
-        : ["error"],
+const prismaClientSingleton = (): DatabaseClient => {
+  const isDevelopment = process.env.NODE_ENV === "development";
+  // Development only: params hold user data such as emails and password hashes
+  if (isDevelopment && process.env.PRISMA_LOG_QUERY_TIMING === "1") {
+    // Query log with durations, read by test_critical_routes.py --queries
+    const client = new PrismaClient<Prisma.PrismaClientOptions, "query">({
+      log: [{ emit: "event", level: "query" }, "info", "warn", "error"],
+    });
+    client.$on("query", e => {
+      console.log(
+        `prisma:query (${e.duration}ms) ${e.query} params=${e.params}`
+      );
+    });
+    return client;
+  }
+  return new PrismaClient<Prisma.PrismaClientOptions, "query">({
+    log: isDevelopment ? ["query", "info", "warn", "error"] : ["error"],
   });
 };
 
@@ -2,107 +2,83 @@
 """
 Smart pattern-based fix using lessons from auth/login manual fix
 """
-import re
+from itertools import accumulate
 from pathlib import Path
+from typing import List, Optional, Tuple
 
-def smart_fix(filepath):
-    """Apply smart fixes based on auth/login patterns"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    original = content
-
-    # Pattern 1: Missing closing brace after return NextResponse.json(...)
-    # Before: { status: 423 }\n      ); // 423 Locked\n\n    // Find user
-    # After:  { status: 423 }\n      ); // 423 Locked\n    }\n\n    // Find user
-    content = re.sub(
-        r'(\{ status: \d+ \}\s*\n\s*\);[^\n]*\n)\s*\n\s*(//[^\n]*\n\s*(?:const|if|await|return))',
-        r'\1    }\n\n    \2',
-        content
-    )
-
-    # Pattern 2: Extra }); in function calls - should be );
-    # Before: generateTokenPair({...});
-    # After:  generateTokenPair({...});
-    # Look for common function patterns
-    for func in ['generateTokenPair', 'prisma.user.update', 'prisma.user.findFirst',
-                 'prisma.user.create', 'logAuthEvent', 'authLogger.info',
-                 'authLogger.error', 'response.cookies.set', 'createSession']:
-        # Pattern: function({...});
-        content = re.sub(
-            rf'({re.escape(func)}\([^)]+\{{[^}}]+\}}\s*)\}}\);',
-            r'\1});',
-            content
-        )
-
-    # Pattern 3: Missing closing brace for if blocks before comments
-    # Before: errorMessage += "...";   \n\n      return NextResponse
-    # After:  errorMessage += "...";   \n      }\n\n      return NextResponse
-    content = re.sub(
-        r'(errorMessage \+= [^;]+;)\s*\n\s*\n\s*(return NextResponse)',
-        r'\1\n      }\n\n      \2',
-        content
-    )
+from edit_buffer import EditBuffer, apply_edits
+from fixer_registry import apply_rules, procedural_can_match
+
+def smart_fix_content(content: str, buffers: Optional[List[EditBuffer]] = None) -> Tuple[str, List[str]]:
+    """Apply smart fixes to route source held in memory.
+    buffers, when given, receives the edit spans of each pass.
+    Returns (new_content, list_of_fixes_applied)"""
+    # Patterns 1, 2, 3 and 5 are the "smart_fix" rules in fixer_registry:
+    # missing brace after early returns, }); normalization for common calls
+    # and response.cookies.set, and errorMessage if blocks
+    content, fixes_applied = apply_rules(content, "smart_fix", buffers=buffers)
 
     # Pattern 4: Missing final }); for requireAuth wrapper
     # Check if file has requireAuth export but no closing });
-    if 'export const' in content and 'requireAuth(' in content:
+    if procedural_can_match(content, "smart.wrapper_close"):
         # Check if file ends with just } instead of });
         lines = content.split('\n')
         if len(lines) > 2:
+            starts = list(accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
             # Check last few non-empty lines
             for i in range(len(lines) - 1, max(len(lines) - 5, 0), -1):
                 stripped = lines[i].strip()
                 if stripped == '}':
                     # This might be the final closing - add ); after it
-                    lines[i] = '});'
-                    content = '\n'.join(lines)
+                    buffer = EditBuffer(content)
+                    buffer.add(starts[i], starts[i] + len(lines[i]), '});', "smart.wrapper_close")
+                    content = apply_edits(buffer, buffers)
+                    fixes_applied.append("Closed requireAuth wrapper with });")
                     break
                 elif stripped and stripped != '':
                     break
 
-    # Pattern 5: Extra }); on its own line after function closing
-    # This is a duplicate we already handled, but let's be specific about cookies.set
-    content = re.sub(
-        r'(response\.cookies\.set\([^)]+,\s*\{[^}]+\})\s*\}\);',
-        r'\1});',
-        content
-    )
-
     # Pattern 6: Missing closing for conditional blocks
     # if (...) { ... errorMessage += ...; <newline><newline> return
     # Should have closing } before return
-    lines = content.split('\n')
-    fixed_lines = []
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
-
-        # Check if this line has errorMessage += and next significant line is return
-        if 'errorMessage +=' in line and i + 1 < len(lines):
-            # Look ahead for next non-empty line
-            j = i + 1
-            while j < len(lines) and lines[j].strip() == '':
-                j += 1
-
-            if j < len(lines) and 'return NextResponse' in lines[j]:
-                # We need a closing } between them
-                # Count the number of empty lines
-                empty_count = j - i - 1
-
-                fixed_lines.append(line)
-                fixed_lines.append('      }')
-                # Add back the empty lines minus one
-                for _ in range(empty_count):
-                    fixed_lines.append('')
-                i = j
-                continue
-
-        fixed_lines.append(line)
-        i += 1
-
-    content = '\n'.join(fixed_lines)
+    # Skipped outright unless both errorMessage += and return NextResponse occur
+    if procedural_can_match(content, "smart.error_message_block"):
+        lines = content.split('\n')
+        starts = list(accumulate((len(line) + 1 for line in lines[:-1]), initial=0))
+        buffer = EditBuffer(content)
+        i = 0
+
+        while i < len(lines):
+            line = lines[i]
+
+            # Check if this line has errorMessage += and next significant line is return
+            if 'errorMessage +=' in line and i + 1 < len(lines):
+                # Look ahead for next non-empty line
+                j = i + 1
+                while j < len(lines) and lines[j].strip() == '':
+                    j += 1
+
+                if j < len(lines) and 'return NextResponse' in lines[j]:
+                    # We need a closing } between them; the empty lines stay
+                    line_end = starts[i] + len(line)
+                    buffer.add(line_end, line_end, '\n      }', "smart.error_message_block")
+                    i = j
+                    if "Closed conditional block before return" not in fixes_applied:
+                        fixes_applied.append("Closed conditional block before return")
+                    continue
+
+            i += 1
+
+        content = apply_edits(buffer, buffers)
+
+    return content, fixes_applied
+
+def smart_fix(filepath):
+    """Apply smart fixes based on auth/login patterns"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        original = f.read()
+
+    content, _ = smart_fix_content(original)
 
     # Write back if changed
     if content != original:
@@ -4,9 +4,32 @@ Test Critical API Routes
 Tests the 20 most important API endpoints to verify they compile and respond correctly
 """
 
+import argparse
+import asyncio
+import atexit
 import subprocess
 import json
-from typing import List, Tuple
+import signal
+import sys
+import time
+import zlib
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from auth_session import AuthError, SessionPool, TokenSession, add_auth_arguments, parse_users
+from http_client import DEFAULT_BASE_URL, DEFAULT_TIMEOUT, ConnectionPool, HttpResponse, TransferStats
+from latency_stats import LatencyHistogram, check_budgets, find_regressions, load_budgets, load_results
+from load_generator import LoadReport, WeightedMix, load_mix, run_open_loop
+from query_attribution import (DEFAULT_REPEAT_THRESHOLD, DEFAULT_SETTLE, DevServer, LogTail, QueryReport,
+                               attribute_queries)
+from rate_pacer import DEFAULT_BURST_FRACTION, GENEROUS, MODERATE, RateLimit, RateLimitPacer
+from route_discovery import add_sample_arguments, discover_routes, parse_samples, routes_for_file
+from route_import_graph import SOURCE_DIR, ImportGraph, git_changed_files
+from route_tree import API_DIR
+from route_watcher import TreeWatcher
 
 # Most critical routes to test (in order of importance)
 CRITICAL_ROUTES = [
@@ -43,12 +66,55 @@ CRITICAL_ROUTES = [
     ("GET", "/api/maintenance/stats", "Maintenance Statistics"),
 ]
 
-def test_route(method: str, path: str, description: str) -> Tuple[bool, int, str]:
+SUCCESS_STATUSES = [200, 400, 401, 403, 404]
+
+# Methods sent with an empty JSON body, as the curl POSTs were
+BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+SHARD_STRATEGIES = ["round-robin", "hash"]
+
+# 429s retried after Retry-After when pacing
+MAX_429_RETRIES = 2
+
+# A cold request on the dev server includes compiling the route module
+DEFAULT_WARMUP_TIMEOUT = 120.0
+
+class RouteOutcome(NamedTuple):
+    success: bool
+    status: int
+    message: str
+    # The request's own time on the wire, not time queued for a connection
+    seconds: float
+    # Only from the async client, when a response arrived
+    transfer: Optional[TransferStats] = None
+
+def classify_response(status_code: int, output: str) -> Tuple[bool, int, str]:
     """
-    Test a single route.
+    Classify a route's response.
     Returns (success, status_code, message)
     """
-    url = f"http://localhost:3001{path}"
+    # Check if it's a compilation error (500 with ModuleBuildError)
+    if status_code == 500 and "ModuleBuildError" in output:
+        return False, 500, "COMPILATION ERROR"
+
+    # Any non-500 status is considered success (even 401/400 means it compiled)
+    # 401 = Auth required (expected for secured routes)
+    # 400 = Validation error (expected for POST without valid data)
+    # 200 = Success
+    if status_code in SUCCESS_STATUSES:
+        return True, status_code, "OK (Route compiles)"
+    elif status_code == 500:
+        return False, 500, "Runtime error"
+    else:
+        return True, status_code, f"Unexpected status (but compiled)"
+
+def test_route(method: str, path: str, description: str,
+               base_url: str = DEFAULT_BASE_URL) -> Tuple[bool, int, str]:
+    """
+    Test a single route with a curl subprocess.
+    Returns (success, status_code, message)
+    """
+    url = f"{base_url}{path}"
 
     try:
         if method == "GET":
@@ -77,51 +143,887 @@ def test_route(method: str, path: str, description: str) -> Tuple[bool, int, str
         else:
             return False, 0, "No status code returned"
 
-        # Check if it's a compilation error (500 with ModuleBuildError)
-        if status_code == 500 and "ModuleBuildError" in output:
-            return False, 500, "COMPILATION ERROR"
-
-        # Any non-500 status is considered success (even 401/400 means it compiled)
-        # 401 = Auth required (expected for secured routes)
-        # 400 = Validation error (expected for POST without valid data)
-        # 200 = Success
-        if status_code in [200, 400, 401, 403, 404]:
-            return True, status_code, "OK (Route compiles)"
-        elif status_code == 500:
-            return False, 500, "Runtime error"
-        else:
-            return True, status_code, f"Unexpected status (but compiled)"
+        return classify_response(status_code, output)
 
     except subprocess.TimeoutExpired:
         return False, 0, "Timeout"
     except Exception as e:
         return False, 0, f"Error: {str(e)}"
 
-def main():
-    print("=" * 100)
-    print(" TESTING 20 MOST CRITICAL API ROUTES")
-    print("=" * 100)
-    print()
+async def test_route_async(pool: ConnectionPool, method: str, path: str, description: str,
+                           sessions: Optional[SessionPool] = None,
+                           pacer: Optional[RateLimitPacer] = None,
+                           accept_encoding: Optional[str] = None,
+                           authorization: Optional[str] = None) -> RouteOutcome:
+    """
+    Test a single route over a pooled keep-alive connection.
+    Sends the same requests as the curl version (POST, PUT and PATCH carry an
+    empty JSON body). With sessions, the next test user's bearer token is
+    sent, and a 401 is retried once with a renewed token. authorization,
+    when given instead, is sent as is and a 401 is returned to the caller.
+    With a pacer, each send waits for rate limit allowance and a 429 is
+    retried after its Retry-After. accept_encoding, when given, is sent as
+    Accept-Encoding.
+    """
+    headers = {}
+    if accept_encoding:
+        headers["Accept-Encoding"] = accept_encoding
+    if authorization:
+        headers["Authorization"] = authorization
+    body = None
+    if method in BODY_METHODS:
+        headers["Content-Type"] = "application/json"
+        body = b"{}"
 
+    started = time.perf_counter()
+    try:
+        session = sessions.next() if sessions else None
+        if session:
+            headers["Authorization"] = await session.authorization(pool)
+        response = await send_paced(pool, method, path, headers, body, pacer)
+        if session and response.status == 401:
+            headers["Authorization"] = await session.authorization(pool, force=True)
+            response = await send_paced(pool, method, path, headers, body, pacer)
+    except asyncio.TimeoutError:
+        return RouteOutcome(False, 0, "Timeout", time.perf_counter() - started)
+    except Exception as e:
+        return RouteOutcome(False, 0, f"Error: {str(e)}", time.perf_counter() - started)
+
+    return RouteOutcome(*classify_response(response.status, response.text()), response.elapsed,
+                        response.transfer_stats())
+
+async def send_paced(pool: ConnectionPool, method: str, path: str, headers: Dict[str, str],
+                     body: Optional[bytes], pacer: Optional[RateLimitPacer] = None) -> HttpResponse:
+    """One request, held back by the pacer if given, retrying 429s it can wait out"""
+    for attempt in range(MAX_429_RETRIES + 1):
+        if pacer:
+            await pacer.acquire(method, headers.get("Authorization"))
+        response = await pool.request(method, path, headers, body)
+        if not pacer:
+            return response
+        retry = pacer.observe(method, headers.get("Authorization"), response.status, response.headers)
+        if retry is None or attempt == MAX_429_RETRIES:
+            return response
+    return response
+
+def assign_shards(routes: List[Tuple[str, str, str]], instances: int, strategy: str = "round-robin",
+                  round_length: Optional[int] = None) -> List[int]:
+    """
+    Instance index for each route. "hash" pins a route to one instance (its
+    caches stay warm there); "round-robin" spreads requests evenly, shifting
+    by one each round of round_length routes so that, over several rounds,
+    every route visits every instance.
+    """
+    if instances <= 1:
+        return [0] * len(routes)
+    if strategy == "hash":
+        return [zlib.crc32(route_key(method, path).encode()) % instances for method, path, _ in routes]
+    round_length = round_length or len(routes) or 1
+    return [(i % round_length + i // round_length) % instances for i in range(len(routes))]
+
+async def run_routes_async(routes: List[Tuple[str, str, str]], base_url: Union[str, List[str]] = DEFAULT_BASE_URL,
+                           concurrency: int = 8, timeout: float = DEFAULT_TIMEOUT,
+                           sessions: Optional[SessionPool] = None,
+                           pacer: Optional[RateLimitPacer] = None,
+                           accept_encoding: Optional[str] = None,
+                           shards: Optional[List[int]] = None) -> List[RouteOutcome]:
+    """
+    Test every route concurrently, at most `concurrency` in flight per
+    instance. With several base URLs, shards gives each route's instance.
+    Returns one RouteOutcome per route, in input order.
+    """
+    base_urls = [base_url] if isinstance(base_url, str) else base_url
+    shards = shards or [0] * len(routes)
+    async with AsyncExitStack() as stack:
+        pools = [await stack.enter_async_context(ConnectionPool(url, max_connections=concurrency, timeout=timeout))
+                 for url in base_urls]
+        return await asyncio.gather(*(test_route_async(pools[shard], *route, sessions=sessions, pacer=pacer,
+                                                       accept_encoding=accept_encoding)
+                                      for route, shard in zip(routes, shards)))
+
+async def log_in(sessions: SessionPool, base_url: str = DEFAULT_BASE_URL,
+                 timeout: float = DEFAULT_TIMEOUT) -> List[str]:
+    """Get every test user a token before any timed request; returns login errors"""
+    async with ConnectionPool(base_url, max_connections=len(sessions.sessions), timeout=timeout) as pool:
+        return await sessions.login_all(pool)
+
+def run_routes_curl(routes: List[Tuple[str, str, str]], base_url: Union[str, List[str]] = DEFAULT_BASE_URL,
+                    shards: Optional[List[int]] = None) -> List[RouteOutcome]:
+    """Test every route one after another with curl (the original behaviour)"""
+    base_urls = [base_url] if isinstance(base_url, str) else base_url
+    shards = shards or [0] * len(routes)
     results = []
+    for (method, path, description), shard in zip(routes, shards):
+        started = time.perf_counter()
+        success, status, message = test_route(method, path, description, base_urls[shard])
+        results.append(RouteOutcome(success, status, message, time.perf_counter() - started))
+    return results
 
-    for method, path, description in CRITICAL_ROUTES:
-        print(f"Testing: {description:<35} [{method} {path}]")
-        success, status, message = test_route(method, path, description)
+async def warm_up_routes(routes: List[Tuple[str, str, str]], base_url: str = DEFAULT_BASE_URL,
+                         concurrency: int = 1, timeout: float = DEFAULT_WARMUP_TIMEOUT,
+                         sessions: Optional[SessionPool] = None,
+                         pacer: Optional[RateLimitPacer] = None) -> Dict[str, Tuple[str, RouteOutcome]]:
+    """
+    Hit each distinct path once, before any measured request, so the dev
+    server compiles its module on demand. Methods of one route.ts share a
+    module, so only the first listed method of a path is sent. Compiles are
+    kept serial by default: concurrent ones contend for the same compiler and
+    would inflate each other's time.
+    Returns {path: (method, outcome)}.
+    """
+    first: Dict[str, Tuple[str, str, str]] = {}
+    for route in routes:
+        first.setdefault(route[1], route)
+    outcomes = await run_routes_async(list(first.values()), base_url, concurrency, timeout, sessions, pacer)
+    return {path: (route[0], outcome) for (path, route), outcome in zip(first.items(), outcomes)}
 
-        if success:
-            print(f"  [OK] Status {status} - {message}")
-        else:
-            print(f"  [FAIL] Status {status} - {message}")
+def route_line_counts(samples: Dict[str, str], api_dir: Path = API_DIR) -> Dict[str, int]:
+    """Lines in the route.ts serving each discovered URL path"""
+    counts = {}
+    for route in discover_routes(api_dir, samples=samples):
+        if route.path not in counts:
+            with open(route.file, 'r', encoding='utf-8') as f:
+                counts[route.path] = sum(1 for _ in f)
+    return counts
+
+def compile_costs(results: List[Dict], cold: Dict[str, Tuple[str, RouteOutcome]]) -> List[Dict]:
+    """
+    Estimated on-demand compile time per path: the cold first request minus
+    the warm p50 of the same route. Sorted most expensive first.
+    """
+    warm = {(r["method"], r["path"]): r for r in results}
+    costs = []
+    for path, (method, outcome) in cold.items():
+        result = warm.get((method, path))
+        warm_ms = result["histogram"].percentile(50) if result and result["histogram"].count else 0.0
+        cold_ms = outcome.seconds * 1000
+        costs.append({
+            "method": method,
+            "path": path,
+            "cold_ms": round(cold_ms, 3),
+            "warm_p50_ms": round(warm_ms, 3),
+            "compile_ms": round(max(0.0, cold_ms - warm_ms), 3) if outcome.status else None,
+            "cold_status": outcome.status,
+            "cold_message": outcome.message,
+            "cold_success": outcome.success
+        })
+    return sorted(costs, key=lambda c: -(c["compile_ms"] or 0.0))
+
+def print_compile_table(costs: List[Dict], line_counts: Dict[str, int], limit: int = 0):
+    shown = costs[:limit] if limit > 0 else costs
+    print("COMPILE COST (cold first request - warm p50, ms):")
+    print(f"  {'Route':<60} {'lines':>6} {'cold':>9} {'warm':>9} {'compile':>9}")
+    for c in shown:
+        lines = line_counts.get(c["path"])
+        compile_ms = f"{c['compile_ms']:>9.0f}" if c["compile_ms"] is not None else f"{'-':>9}"
+        note = "" if c["cold_success"] else f"  [{c['cold_message']}]"
+        print(f"  {route_key(c['method'], c['path']):<60} {lines if lines is not None else '-':>6} "
+              f"{c['cold_ms']:>9.0f} {c['warm_p50_ms']:>9.0f} {compile_ms}{note}")
+    if len(shown) < len(costs):
+        print(f"  ... {len(costs) - len(shown)} more")
+    total = sum(c["compile_ms"] or 0.0 for c in costs)
+    print(f"  Total estimated compile time: {total / 1000:.2f}s over {len(costs)} routes")
+    print()
 
+def merge_cold(per_instance: List[Dict[str, Tuple[str, RouteOutcome]]]) -> Dict[str, Tuple[str, RouteOutcome]]:
+    """Every instance compiles on its own; a path's cold cost is its slowest instance's"""
+    merged: Dict[str, Tuple[str, RouteOutcome]] = {}
+    for cold in per_instance:
+        for path, (method, outcome) in cold.items():
+            if path not in merged or outcome.seconds > merged[path][1].seconds:
+                merged[path] = (method, outcome)
+    return merged
+
+def instance_breakdown(base_urls: List[str], outcomes: List[RouteOutcome], shards: List[int]) -> List[Dict]:
+    """Hits, errors and latency per instance"""
+    instances = [{"base_url": url, "hits": 0, "errors": 0, "histogram": LatencyHistogram()} for url in base_urls]
+    for outcome, shard in zip(outcomes, shards):
+        instance = instances[shard]
+        instance["hits"] += 1
+        instance["errors"] += not outcome.success
+        if outcome.status:
+            instance["histogram"].record(outcome.seconds)
+    return instances
+
+def print_instance_table(instances: List[Dict], strategy: str, slow_factor: float = 1.5):
+    print(f"PER INSTANCE ({strategy}, ms):")
+    print(f"  {'Instance':<40} {'hits':>6} {'errors':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    p50s = [instance["histogram"].percentile(50) if instance["histogram"].count else None for instance in instances]
+    for i, instance in enumerate(instances):
+        summary = instance["histogram"].summary()
+        # Compared with the median of the other instances
+        others = sorted(p50 for j, p50 in enumerate(p50s) if j != i and p50)
+        slow = bool(others) and p50s[i] is not None and p50s[i] > slow_factor * others[len(others) // 2]
+        print(f"  {instance['base_url']:<40} {instance['hits']:>6} {instance['errors']:>7} "
+              f"{summary['p50']:>9.1f} {summary['p90']:>9.1f} {summary['p99']:>9.1f} {summary['max']:>9.1f}"
+              + ("  SLOW" if slow else ""))
+    if strategy == "hash":
+        print("  (hash sharding sends different routes to each instance, so latencies differ by route mix)")
+    print()
+
+def route_key(method: str, path: str) -> str:
+    """Key used for a route in results, baseline and budget files"""
+    return f"{method} {path}"
+
+def collect_results(routes: List[Tuple[str, str, str]],
+                    outcomes: List[RouteOutcome], repeat: int) -> List[Dict]:
+    """
+    Fold repeated hits into one result per route. outcomes holds `repeat`
+    rounds of len(routes) hits. A route passes only if every hit passed; its
+    message is that of the first failing hit. Latency is recorded for every
+    hit that got a response, and so are transfer stats when the client
+    provided them.
+    """
+    results = []
+    for i, (method, path, description) in enumerate(routes):
+        hits = outcomes[i::len(routes)][:repeat]
+        histogram = LatencyHistogram()
+        for hit in hits:
+            if hit.status:
+                histogram.record(hit.seconds)
+        failures = [hit for hit in hits if not hit.success]
+        success, status, message = (failures[0] if failures else hits[-1])[:3]
+        transfers = [hit.transfer for hit in hits if hit.transfer]
         results.append({
             "description": description,
             "method": method,
             "path": path,
             "success": success,
             "status": status,
-            "message": message
+            "message": message,
+            "seconds": sum(hit.seconds for hit in hits) / len(hits),
+            "errors": len(failures),
+            "histogram": histogram,
+            **({"transfer": summarize_transfers(transfers)} if transfers else {})
         })
+    return results
+
+def summarize_transfers(transfers: List[TransferStats]) -> Dict:
+    """TTFB and transfer-time percentiles plus the largest payload seen"""
+    ttfb = LatencyHistogram()
+    transfer = LatencyHistogram()
+    for stats in transfers:
+        ttfb.record(stats.ttfb)
+        transfer.record(stats.transfer)
+    largest = max(transfers, key=lambda stats: stats.body_bytes)
+    return {
+        "ttfb_ms": ttfb.summary(),
+        "transfer_ms": transfer.summary(),
+        "wire_bytes": largest.wire_bytes,
+        "body_bytes": largest.body_bytes,
+        "encodings": sorted({stats.encoding for stats in transfers})
+    }
+
+def print_transfer_table(results: List[Dict], max_payload_bytes: int) -> List[Dict]:
+    """Per-route TTFB / transfer / size table, largest payloads first; returns oversized routes"""
+    measured = [r for r in results if "transfer" in r]
+    print("TRANSFER (ms, KB):")
+    print(f"  {'Route':<50} {'ttfb p50':>9} {'xfer p50':>9} {'wire KB':>9} {'body KB':>9} {'ratio':>6}  encoding")
+    oversized = []
+    for r in sorted(measured, key=lambda r: -r["transfer"]["body_bytes"]):
+        t = r["transfer"]
+        ratio = t["wire_bytes"] / t["body_bytes"] if t["body_bytes"] else 1.0
+        flag = ""
+        if t["body_bytes"] > max_payload_bytes:
+            oversized.append(r)
+            flag = "  OVERSIZED"
+        print(f"  {route_key(r['method'], r['path']):<50} {t['ttfb_ms']['p50']:>9.1f} "
+              f"{t['transfer_ms']['p50']:>9.1f} {t['wire_bytes'] / 1024:>9.1f} {t['body_bytes'] / 1024:>9.1f} "
+              f"{ratio:>6.2f}  {','.join(t['encodings'])}{flag}")
+    if oversized:
+        print(f"  {len(oversized)} route(s) over the {max_payload_bytes / 1024:g} KB payload threshold: "
+              "paginate or trim them")
+    print()
+    return oversized
+
+def write_results_json(path: Path, results: List[Dict], base_url: Union[str, List[str]], repeat: int,
+                       concurrency: int, costs: Optional[List[Dict]] = None, load: Optional[Dict] = None,
+                       instances: Optional[List[Dict]] = None):
+    """
+    Machine-readable results, usable later as a --baseline. With a warm-up
+    pass, routes also carry cold_ms/compile_ms and the compile ranking is
+    included.
+    """
+    cold = {route_key(c["method"], c["path"]): c for c in costs or []}
+    data = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "base_url": base_url if isinstance(base_url, str) else ", ".join(base_url),
+        "repeat": repeat,
+        "concurrency": concurrency,
+        "routes": {
+            key: {
+                "description": r["description"],
+                "success": r["success"],
+                "status": r["status"],
+                "message": r["message"],
+                "errors": r["errors"],
+                **r["histogram"].to_dict(),
+                **({"load": r["load"]} if "load" in r else {}),
+                **({"transfer": r["transfer"]} if "transfer" in r else {}),
+                **({"queries": r["queries"]} if "queries" in r else {}),
+                **({"cold_ms": cold[key]["cold_ms"], "compile_ms": cold[key]["compile_ms"]}
+                   if key in cold else {})
+            }
+            for r in results
+            for key in [route_key(r["method"], r["path"])]
+        }
+    }
+    if costs is not None:
+        data["compile_ranking"] = costs
+    if load is not None:
+        data["load"] = load
+    if instances:
+        data["instances"] = [{"base_url": instance["base_url"], "hits": instance["hits"],
+                              "errors": instance["errors"], **instance["histogram"].to_dict()}
+                             for instance in instances]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+def print_latency_table(results: List[Dict], show_histograms: bool = False):
+    print("LATENCY (ms):")
+    print(f"  {'Route':<60} {'n':>4} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for r in sorted(results, key=lambda r: -r["histogram"].percentile(90)):
+        summary = r["histogram"].summary()
+        print(f"  {route_key(r['method'], r['path']):<60} {r['histogram'].count:>4} "
+              f"{summary['p50']:>9.1f} {summary['p90']:>9.1f} {summary['p99']:>9.1f} {summary['max']:>9.1f}")
+        if show_histograms:
+            for bar in r["histogram"].bars():
+                print(f"      {bar}")
+    print()
+
+def check_latency_gates(results: List[Dict], baseline: Optional[Path], threshold_pct: float,
+                        min_regression_ms: float, budgets: Optional[Path]) -> int:
+    """Print p90 regressions against a baseline and budget violations; 1 if any"""
+    current = {route_key(r["method"], r["path"]): {"count": r["histogram"].count, **r["histogram"].to_dict()}
+               for r in results}
+    exit_code = 0
+    if baseline:
+        regressions = find_regressions(current, load_results(baseline), threshold_pct / 100, min_regression_ms)
+        if regressions:
+            print(f"\np90 REGRESSIONS vs {baseline} (>{threshold_pct:g}%):")
+            for regression in regressions:
+                print(f"  - {regression.route}: {regression.baseline_p90:.1f} ms -> "
+                      f"{regression.current_p90:.1f} ms (+{regression.change * 100:.0f}%)")
+            exit_code = 1
+        else:
+            print(f"\nNo p90 regressions vs {baseline}")
+    if budgets:
+        violations = check_budgets(current, load_budgets(budgets))
+        if violations:
+            print(f"\nLATENCY BUDGETS EXCEEDED ({len(violations)}):")
+            for violation in violations:
+                print(f"  - {violation.route}: {violation.metric} {violation.actual_ms:.1f} ms "
+                      f"> budget {violation.budget_ms:.1f} ms")
+            exit_code = 1
+        else:
+            print(f"\nAll routes within latency budgets ({budgets})")
+    return exit_code
+
+async def run_load(weighted: List[Tuple[Tuple[str, str, str], float]],
+                   base_url: Union[str, List[str]], rate: float, duration: float, max_in_flight: int,
+                   timeout: float, sessions: Optional[SessionPool] = None,
+                   seed: Optional[int] = None, pacer: Optional[RateLimitPacer] = None,
+                   accept_encoding: Optional[str] = None,
+                   strategy: str = "round-robin") -> Tuple[LoadReport, List[Dict]]:
+    """
+    Open-loop load over the weighted mix, one connection pool per instance
+    shared by all requests. Returns the report and a per-instance breakdown
+    of service times (the load report's latency runs from the scheduled
+    send time, which an instance does not see).
+    """
+    base_urls = [base_url] if isinstance(base_url, str) else base_url
+    instances = [{"base_url": url, "hits": 0, "errors": 0, "histogram": LatencyHistogram()} for url in base_urls]
+    sent = 0
+    async with AsyncExitStack() as stack:
+        pools = [await stack.enter_async_context(ConnectionPool(url, max_connections=max_in_flight, timeout=timeout))
+                 for url in base_urls]
+
+        async def send(route):
+            nonlocal sent
+            shard = assign_shards([route], len(pools), "hash")[0] if strategy == "hash" else sent % len(pools)
+            sent += 1
+            outcome = await test_route_async(pools[shard], *route, sessions=sessions, pacer=pacer,
+                                             accept_encoding=accept_encoding)
+            instances[shard]["hits"] += 1
+            instances[shard]["errors"] += not outcome.success
+            if outcome.status:
+                instances[shard]["histogram"].record(outcome.seconds)
+            return outcome
+
+        report = await run_open_loop(send, WeightedMix(weighted), rate, duration,
+                                     drain_timeout=timeout, seed=seed)
+    return report, instances
+
+def load_results_table(report: LoadReport) -> List[Dict]:
+    """Per-route results in the shape collect_results produces, plus load counters"""
+    results = []
+    for load in report.routes:
+        method, path, description = load.route
+        results.append({
+            "description": description,
+            "method": method,
+            "path": path,
+            "success": load.errors == 0 and load.completed > 0,
+            "status": max(load.statuses, key=load.statuses.get) if load.statuses else 0,
+            "message": load.first_error or "OK",
+            "seconds": load.latency.total_us / load.latency.count / 1e6 if load.latency.count else 0.0,
+            "errors": load.errors,
+            "histogram": load.latency,
+            "load": {
+                "sent": load.sent,
+                "completed": load.completed,
+                "unfinished": load.unfinished,
+                "throughput_rps": round(load.completed / report.duration, 3),
+                "error_rate": round(load.errors / load.sent, 4) if load.sent else None,
+                "statuses": {str(status): count for status, count in sorted(load.statuses.items())},
+                "service_ms": load.service.summary()
+            }
+        })
+    return results
+
+def print_load_report(report: LoadReport):
+    print("=" * 100)
+    print(f" OPEN-LOOP LOAD: {report.rate:g} req/s target for {report.duration:g}s")
+    print("=" * 100)
+    print(f"  {'Route':<44} {'sent':>6} {'done':>6} {'err%':>6} {'rps':>7} "
+          f"{'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+    for load in sorted(report.routes, key=lambda load: -load.sent):
+        summary = load.latency.summary()
+        error_pct = 100 * load.errors / load.sent if load.sent else 0.0
+        print(f"  {route_key(load.route[0], load.route[1]):<44} {load.sent:>6} {load.completed:>6} "
+              f"{error_pct:>6.1f} {load.completed / report.duration:>7.1f} {summary['p50']:>8.1f} "
+              f"{summary['p90']:>8.1f} {summary['p99']:>8.1f} {summary['max']:>8.1f}")
+    total = report.total_latency().summary()
+    error_pct = 100 * report.errors / report.sent if report.sent else 0.0
+    print(f"  {'TOTAL':<44} {report.sent:>6} {report.completed:>6} {error_pct:>6.1f} "
+          f"{report.completed / report.duration:>7.1f} {total['p50']:>8.1f} {total['p90']:>8.1f} "
+          f"{total['p99']:>8.1f} {total['max']:>8.1f}")
+    print()
+    print("Latency (ms) is measured from each request's scheduled send time.")
+    if report.unfinished:
+        print(f"[WARN] {report.unfinished} request(s) still in flight at the end were abandoned "
+              "(counted as errors, their wait so far included in the percentiles)")
+    if report.late:
+        print(f"[WARN] {report.late} request(s) were sent late by the generator itself "
+              f"(max {report.max_lag * 1000:.0f} ms); the target rate may be beyond this client")
+    if report.completed < report.sent:
+        print(f"[WARN] Achieved {report.completed / report.duration:.1f} req/s of "
+              f"{report.sent / report.duration:.1f} offered: past the saturation point")
+    print("=" * 100)
+
+async def run_query_attribution(routes: List[Tuple[str, str, str]], base_url: str, tail: LogTail,
+                                repeat: int = 1, timeout: float = DEFAULT_TIMEOUT,
+                                sessions: Optional[SessionPool] = None,
+                                pacer: Optional[RateLimitPacer] = None,
+                                settle: float = DEFAULT_SETTLE) -> Tuple[QueryReport, List[RouteOutcome]]:
+    """
+    Serialized rounds over one connection, with the queries the server logs
+    charged to the request in flight. Tokens are readied outside that
+    window, so logins and refreshes are not charged to a route. Outcomes
+    come in the round order collect_results expects, one per route and
+    round even when a 401 was retried.
+    """
+    async with ConnectionPool(base_url, max_connections=1, timeout=timeout) as pool:
+        session: Optional[TokenSession] = None
+        header: Optional[str] = None
+
+        async def authorize(force: bool) -> bool:
+            nonlocal session, header
+            if not force:
+                session = sessions.next()
+            round_trips = session.logins + session.refreshes
+            try:
+                header = await session.authorization(pool, force=force)
+            except Exception:
+                # The route is sent without a token and its 401 recorded
+                header = None
+                return True
+            return session.logins + session.refreshes != round_trips
+
+        async def send(route):
+            return await test_route_async(pool, *route, pacer=pacer, authorization=header)
+
+        report = await attribute_queries(send, routes, tail, repeat, settle, authorize if sessions else None)
+    return report, list(report.outcomes)
+
+def print_query_report(report: QueryReport, repeat_threshold: int = DEFAULT_REPEAT_THRESHOLD):
+    """Routes by queries per request, with statements repeated within one request"""
+    print("=" * 100)
+    print(" PRISMA QUERIES PER ROUTE")
+    print("=" * 100)
+    print(f"  {'Route':<52} {'req':>4} {'q/req':>7} {'DB ms/req':>10} {'dups':>5} {'repeat':>7}")
+    suspects = []
+    for stats in sorted(report.routes, key=lambda stats: -stats.queries_per_request):
+        db_ms = stats.db_ms_per_request
+        sql, count = stats.worst_repeat()
+        flag = ""
+        if count >= repeat_threshold:
+            flag = "  N+1?"
+            suspects.append((stats, sql, count))
+        print(f"  {route_key(stats.route[0], stats.route[1]):<52} {stats.requests:>4} "
+              f"{stats.queries_per_request:>7.1f} {(f'{db_ms:.1f}' if db_ms is not None else '-'):>10} "
+              f"{stats.exact_duplicates:>5} {(f'x{count}' if count else '-'):>7}{flag}")
+    print()
+    total_queries = sum(stats.queries for stats in report.routes)
+    total_requests = sum(stats.requests for stats in report.routes)
+    print(f"{total_queries} queries over {total_requests} request(s)"
+          + (f", {sum(stats.db_ms for stats in report.routes):.1f} ms of DB time" if report.timed else ""))
+    if not report.timed:
+        print("No query durations in the log: start the dev server with PRISMA_LOG_QUERY_TIMING=1 "
+              "(or use --start-server) for DB time and duplicate detection")
+    if report.auth:
+        print(f"{report.auth} query(ies) from test-user logins, token refreshes and rejected tokens were left out")
+    if report.unattributed:
+        print(f"[WARN] {report.unattributed} query(ies) were logged between requests and left out "
+              "(background jobs or other clients of the server)")
+    if suspects:
+        print()
+        print(f"Statements run {repeat_threshold}+ times within a single request:")
+        for stats, sql, count in suspects:
+            print(f"  {route_key(stats.route[0], stats.route[1])} x{count}: {sql[:160]}")
+    print("=" * 100)
+
+def affected_routes(graph: ImportGraph, changed: List[Path], api_dir: Path = API_DIR,
+                    samples: Optional[Dict[str, str]] = None,
+                    warnings: Optional[List[str]] = None) -> List[Tuple[str, str, str]]:
+    """Every handler of the route files that import a changed file, directly or not"""
+    return [(route.method, route.path, route.description)
+            for route_file in graph.affected_route_files(changed, api_dir)
+            for route in routes_for_file(route_file, api_dir, samples, warnings)]
+
+def watch_and_retest(base_urls: List[str], samples: Dict[str, str], interval: float = 0.5,
+                     timeout: float = DEFAULT_WARMUP_TIMEOUT, concurrency: int = 8,
+                     sessions: Optional[SessionPool] = None, pacer: Optional[RateLimitPacer] = None,
+                     accept_encoding: Optional[str] = None, api_dir: Path = API_DIR,
+                     follow_imports: bool = False):
+    """
+    Poll the app/api tree and, whenever route.ts files change, hit just the
+    routes they serve. The dev server compiles a changed module on its next
+    request, so each hit waits for that compile (hence the long timeout) and
+    its result reflects the saved source. With follow_imports the whole src
+    tree is watched and a change to a shared module retests every route that
+    imports it. Runs until interrupted.
+    """
+    graph = ImportGraph().build() if follow_imports else None
+    watcher = TreeWatcher(SOURCE_DIR, "*.ts*") if follow_imports else TreeWatcher(api_dir)
+    print(f"Watching {len(watcher.files)} {'source' if follow_imports else 'route'} files under "
+          f"{watcher.root} (Ctrl+C to stop)")
+    print()
+    try:
+        while True:
+            time.sleep(interval)
+            changes = watcher.poll()
+            if not changes:
+                continue
+            detected = time.perf_counter()
+            stamp = datetime.now().strftime("%H:%M:%S")
+            for removed in changes.removed:
+                print(f"[{stamp}] Removed {removed.relative_to(watcher.root)}")
+
+            warnings: List[str] = []
+            if graph:
+                # Importers of a removed file are only known to the graph built before the removal
+                routes = affected_routes(graph, changes.removed, api_dir, samples, warnings)
+                graph.build()
+                routes += affected_routes(graph, changes.changed, api_dir, samples, warnings)
+                routes = list(dict.fromkeys(routes))
+            else:
+                routes = [(route.method, route.path, route.description)
+                          for changed in changes.changed
+                          for route in routes_for_file(changed, api_dir, samples, warnings)]
+            for warning in warnings:
+                print(f"[{stamp}] [WARN] {warning}")
+            if not routes:
+                continue
+            print(f"[{stamp}] {len(changes.changed)} file(s) changed, retesting {len(routes)} route(s)")
+
+            shards = assign_shards(routes, len(base_urls))
+            outcomes = asyncio.run(run_routes_async(routes, base_urls, concurrency, timeout, sessions,
+                                                    pacer, accept_encoding, shards))
+            for (method, path, _), outcome in zip(routes, outcomes):
+                tag = "OK" if outcome.success else "FAIL"
+                print(f"  [{tag}] {method:<6} {path:<55} Status {outcome.status} - {outcome.message} "
+                      f"({outcome.seconds:.2f}s incl. compile)")
+            print(f"  Done {time.perf_counter() - detected:.2f}s after the save was detected")
+            print()
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+def main():
+    parser = argparse.ArgumentParser(description="Smoke-test the critical API routes")
+    parser.add_argument("--base-url", action="append", metavar="URL",
+                        help=f"Server URL (default {DEFAULT_BASE_URL}); repeat or comma-separate "
+                             "several to spread the run across instances")
+    parser.add_argument("--shard", choices=SHARD_STRATEGIES, default="round-robin",
+                        help="How routes are split across several base URLs (default round-robin)")
+    parser.add_argument("--concurrency", "-c", type=int, default=8,
+                        help="Requests in flight at once (default 8)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Per-request timeout in seconds (default {DEFAULT_TIMEOUT:g})")
+    parser.add_argument("--curl", action="store_true",
+                        help="Use one curl subprocess per route, serially, instead of the async client")
+    parser.add_argument("--all", action="store_true",
+                        help="Test every handler discovered under app/api instead of CRITICAL_ROUTES")
+    add_sample_arguments(parser)
+    parser.add_argument("--repeat", "-n", type=int, default=1,
+                        help="Hits per route; latency percentiles are taken over them (default 1)")
+    parser.add_argument("--histogram", action="store_true", help="Print a latency histogram per route")
+    parser.add_argument("--json", type=Path, metavar="FILE", help="Write results and histograms as JSON")
+    parser.add_argument("--baseline", type=Path, metavar="FILE",
+                        help="Compare p90 latency against a results JSON from an earlier run")
+    parser.add_argument("--regression-threshold", type=float, default=20.0, metavar="PCT",
+                        help="p90 growth over the baseline that counts as a regression (default 20%%)")
+    parser.add_argument("--min-regression-ms", type=float, default=5.0,
+                        help="Ignore p90 growth smaller than this many ms (default 5)")
+    parser.add_argument("--budgets", type=Path, metavar="FILE",
+                        help="JSON latency budgets per route; exceeding one exits non-zero")
+    parser.add_argument("--warmup", action="store_true",
+                        help="Hit each route once before measuring and rank routes by compile cost")
+    parser.add_argument("--warmup-concurrency", type=int, default=1,
+                        help="Cold requests in flight during the warm-up (default 1, so compiles do not overlap)")
+    parser.add_argument("--warmup-timeout", type=float, default=DEFAULT_WARMUP_TIMEOUT,
+                        help=f"Timeout for a cold request in seconds (default {DEFAULT_WARMUP_TIMEOUT:g})")
+    parser.add_argument("--top", type=int, default=0, help="Show only the N most expensive compiles")
+    add_auth_arguments(parser)
+    parser.add_argument("--rate", type=float, metavar="RPS",
+                        help="Open-loop load mode: Poisson arrivals at RPS requests/s instead of a smoke test")
+    parser.add_argument("--duration", type=float, default=30.0, help="Load mode duration in seconds (default 30)")
+    parser.add_argument("--mix", type=Path, metavar="FILE",
+                        help='Load mode route weights, JSON {"METHOD /path": weight} (default: equal weights)')
+    parser.add_argument("--max-in-flight", type=int, default=256,
+                        help="Load mode connection cap; requests beyond it queue and that wait counts (default 256)")
+    parser.add_argument("--seed", type=int, help="Seed for load mode arrivals and route picks")
+    parser.add_argument("--transfer", action="store_true",
+                        help="Report TTFB, transfer time and compressed/uncompressed payload size per route")
+    parser.add_argument("--accept-encoding", metavar="VALUE",
+                        help='Accept-Encoding to send (default "gzip, deflate" with --transfer, none otherwise)')
+    parser.add_argument("--max-payload-kb", type=float, default=256.0,
+                        help="Flag routes whose uncompressed body exceeds this many KB (default 256)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Watch app/api and retest only the routes of each route.ts that changes")
+    parser.add_argument("--api-dir", type=Path, default=API_DIR, help="API routes directory for --all and --watch")
+    parser.add_argument("--watch-interval", type=float, default=0.5,
+                        help="Seconds between polls in watch mode (default 0.5)")
+    parser.add_argument("--follow-imports", action="store_true",
+                        help="In watch mode, watch all of src and retest the routes importing a changed module")
+    parser.add_argument("--changed", action="append", default=[], type=Path, metavar="FILE",
+                        help="Test only the routes that import FILE, directly or transitively (repeatable)")
+    parser.add_argument("--since", metavar="REV",
+                        help="Test only the routes affected by files changed since git revision REV")
+    parser.add_argument("--queries", action="store_true",
+                        help="Send requests one at a time and attribute the Prisma queries the dev server "
+                             "logs to each route (needs --server-log or --start-server)")
+    parser.add_argument("--server-log", type=Path, metavar="FILE",
+                        help="Dev server output redirected to FILE, followed for --queries")
+    parser.add_argument("--start-server", action="store_true",
+                        help="Start next dev on the --base-url port with query timing for --queries, "
+                             "and stop it afterwards")
+    parser.add_argument("--query-settle", type=float, default=DEFAULT_SETTLE, metavar="SECONDS",
+                        help=f"Wait after each response for its query log lines (default {DEFAULT_SETTLE:g})")
+    parser.add_argument("--repeat-threshold", type=int, default=DEFAULT_REPEAT_THRESHOLD, metavar="N",
+                        help="Flag a statement run N+ times in one request as N+1 "
+                             f"(default {DEFAULT_REPEAT_THRESHOLD})")
+    parser.add_argument("--pace", action="store_true",
+                        help="Stay inside the API rate limits: pace requests per limiter key and retry 429s")
+    parser.add_argument("--read-limit", type=int, default=GENEROUS.limit,
+                        help=f"GET/HEAD requests allowed per window (default {GENEROUS.limit}, GENEROUS)")
+    parser.add_argument("--write-limit", type=int, default=MODERATE.limit,
+                        help=f"Write requests allowed per window (default {MODERATE.limit}, MODERATE)")
+    parser.add_argument("--limit-window", type=float, default=GENEROUS.window,
+                        help=f"Rate limit window in seconds (default {GENEROUS.window:g})")
+    parser.add_argument("--burst-fraction", type=float, default=DEFAULT_BURST_FRACTION,
+                        help=f"Share of a limit sent as an initial burst (default {DEFAULT_BURST_FRACTION:g})")
+    args = parser.parse_args()
+    repeat = max(1, args.repeat)
+    base_urls = [url.strip() for value in args.base_url or [DEFAULT_BASE_URL]
+                 for url in value.split(",") if url.strip()]
+
+    accept_encoding = args.accept_encoding
+    if accept_encoding is None and args.transfer:
+        # What browsers and the mobile app accept that the standard library can decode
+        accept_encoding = "gzip, deflate"
+
+    pacer = None
+    if args.pace:
+        if args.curl:
+            parser.error("--pace is not supported with --curl")
+        pacer = RateLimitPacer(RateLimit(args.read_limit, args.limit_window),
+                               RateLimit(args.write_limit, args.limit_window), args.burst_fraction)
+
+    sessions = None
+    if args.login:
+        if args.curl:
+            parser.error("--login is not supported with --curl")
+        users = parse_users(args.user, args.users)
+        if not users:
+            parser.error("--login needs --user EMAIL:PASSWORD, --users FILE or $ASH_TEST_EMAIL/$ASH_TEST_PASSWORD")
+        sessions = SessionPool(users)
+        if args.token_cache:
+            sessions.load_cache(args.token_cache)
+
+    if args.queries:
+        if args.curl:
+            parser.error("--queries is not supported with --curl")
+        if len(base_urls) > 1:
+            parser.error("--queries follows a single server's log; give one --base-url")
+        if not args.server_log and not args.start_server:
+            parser.error("--queries needs --server-log FILE or --start-server")
+
+    samples = parse_samples(args.param, args.samples)
+    if args.all:
+        routes = [(route.method, route.path, route.description)
+                  for route in discover_routes(args.api_dir, samples=samples)]
+        title = f"TESTING ALL {len(routes)} DISCOVERED API HANDLERS"
+    else:
+        routes = CRITICAL_ROUTES
+        title = "TESTING 20 MOST CRITICAL API ROUTES"
+    if args.changed or args.since:
+        changed = args.changed + (git_changed_files(args.since) if args.since else [])
+        routes = affected_routes(ImportGraph().build(), changed, args.api_dir, samples)
+        title = f"TESTING {len(routes)} ROUTES AFFECTED BY {len(changed)} CHANGED FILE(S)"
+        if not routes:
+            print(f"None of the {len(changed)} changed file(s) is imported by an API route; nothing to test")
+            return
+    if args.watch:
+        title = "WATCH MODE: RETESTING ROUTES AS THEIR SOURCE CHANGES"
+
+    print("=" * 100)
+    print(f" {title}" + (f" x{repeat}" if repeat > 1 else "")
+          + (f" ACROSS {len(base_urls)} INSTANCES" if len(base_urls) > 1 else ""))
+    print("=" * 100)
+    print()
+
+    tail = None
+    if args.queries:
+        if args.start_server:
+            server = DevServer(urlsplit(base_urls[0]).port or 80)
+            print(f"Starting next dev on port {server.port} with query timing...")
+            # Exit through atexit on SIGTERM too, so the server is not left running
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(128 + signal.SIGTERM))
+            try:
+                tail = server.start()
+            except RuntimeError as e:
+                print(f"[FAIL] {e}")
+                sys.exit(1)
+            atexit.register(server.stop)
+        else:
+            tail = LogTail.from_file(args.server_log)
+        print()
+
+    if sessions:
+        try:
+            # Tokens are signed with the shared JWT secret, so any instance can issue them
+            errors = asyncio.run(log_in(sessions, base_urls[0], args.timeout))
+        except AuthError as e:
+            print(f"[FAIL] {e}")
+            sys.exit(1)
+        for error in errors:
+            print(f"[WARN] Login failed, user left out: {error}")
+        print(f"Authenticated as {len(sessions.sessions)} test user(s): "
+              + ", ".join(session.credentials.email for session in sessions.sessions))
+        print()
+
+    if args.watch:
+        if args.curl:
+            parser.error("--watch is not supported with --curl")
+        watch_and_retest(base_urls, samples, args.watch_interval, args.warmup_timeout,
+                         max(1, args.concurrency), sessions, pacer, accept_encoding, args.api_dir,
+                         args.follow_imports)
+        return
+
+    cold = None
+    if args.warmup:
+        print(f"Warming up {len({route[1] for route in routes})} routes (cold first requests)"
+              + (f" on each of {len(base_urls)} instances" if len(base_urls) > 1 else "") + "...")
+        started = time.perf_counter()
+        cold = merge_cold([asyncio.run(warm_up_routes(routes, url, max(1, args.warmup_concurrency),
+                                                      args.warmup_timeout, sessions, pacer))
+                           for url in base_urls])
+        print(f"Warm-up took {time.perf_counter() - started:.2f}s")
+        print()
+
+    if args.queries:
+        print(f"Attributing queries over {len(routes)} routes, one request at a time...")
+        report, outcomes = asyncio.run(run_query_attribution(routes, base_urls[0], tail, repeat, args.timeout,
+                                                             sessions, pacer, args.query_settle))
+        tail.close()
+        print()
+        print_query_report(report, args.repeat_threshold)
+        results = collect_results(routes, outcomes, repeat)
+        for result, stats in zip(results, report.routes):
+            result["queries"] = stats.to_dict()
+        if sessions and args.token_cache:
+            sessions.save_cache(args.token_cache)
+        if args.json:
+            write_results_json(args.json, results, base_urls, repeat, 1)
+            print(f"Results written to {args.json}")
+        return
+
+    if args.rate:
+        if args.curl:
+            parser.error("--rate is not supported with --curl")
+        weighted = load_mix(args.mix, routes) if args.mix else [(route, 1.0) for route in routes]
+        print(f"Sending {args.rate:g} req/s for {args.duration:g}s over {len(weighted)} routes...")
+        report, instances = asyncio.run(run_load(weighted, base_urls, args.rate, args.duration,
+                                                 max(1, args.max_in_flight), args.timeout, sessions,
+                                                 args.seed, pacer, accept_encoding, args.shard))
+        print()
+        print_load_report(report)
+        if len(base_urls) > 1:
+            print("Service time per instance, from request sent to response complete:")
+            print_instance_table(instances, args.shard)
+        if pacer:
+            print(f"Rate limits: {pacer.summary()}")
+        results = load_results_table(report)
+        if sessions and args.token_cache:
+            sessions.save_cache(args.token_cache)
+        if args.json:
+            write_results_json(args.json, results, base_urls, 1, args.max_in_flight, instances=instances, load={
+                "target_rps": args.rate,
+                "duration": args.duration,
+                "sent": report.sent,
+                "completed": report.completed,
+                "errors": report.errors,
+                "throughput_rps": round(report.completed / args.duration, 3),
+                "latency_ms": report.total_latency().summary(),
+                "max_scheduler_lag_ms": round(report.max_lag * 1000, 3),
+                "unfinished": report.unfinished
+            })
+            print(f"Results written to {args.json}")
+        exit_code = check_latency_gates(results, args.baseline, args.regression_threshold,
+                                        args.min_regression_ms, args.budgets)
+        if exit_code:
+            sys.exit(exit_code)
+        return
+
+    # Every round hits each route once; rounds are queued in order
+    hits = list(routes) * repeat
+    shards = assign_shards(hits, len(base_urls), args.shard, len(routes))
+    started = time.perf_counter()
+    if args.curl:
+        outcomes = run_routes_curl(hits, base_urls, shards)
+    else:
+        outcomes = asyncio.run(run_routes_async(hits, base_urls,
+                                                max(1, args.concurrency), args.timeout, sessions, pacer,
+                                                accept_encoding, shards))
+    wall_seconds = time.perf_counter() - started
+
+    results = collect_results(routes, outcomes, repeat)
+
+    for r in results:
+        print(f"Testing: {r['description']:<35} [{r['method']} {r['path']}]")
+        if repeat > 1:
+            summary = r["histogram"].summary()
+            timing = f"p50 {summary['p50']:.0f} ms, p90 {summary['p90']:.0f} ms, max {summary['max']:.0f} ms"
+            if r["errors"]:
+                timing += f", {r['errors']}/{repeat} hits failed"
+        else:
+            timing = f"{r['seconds'] * 1000:.0f} ms"
+
+        if r["success"]:
+            print(f"  [OK] Status {r['status']} - {r['message']} ({timing})")
+        else:
+            print(f"  [FAIL] Status {r['status']} - {r['message']} ({timing})")
         print()
 
     # Summary
@@ -134,15 +1036,40 @@ def main():
     failed = total - passed
 
     print(f"Total routes tested: {total}")
-    print(f"Passed (compiles):   {passed} ({100*passed//total}%)")
+    print(f"Passed (compiles):   {passed}" + (f" ({100*passed//total}%)" if total else ""))
     print(f"Failed (errors):     {failed}")
+    slowest = max((r["seconds"] for r in results), default=0.0)
+    print(f"Wall time:           {wall_seconds:.2f}s "
+          f"(slowest route {slowest:.2f}s, sum of routes {sum(r['seconds'] for r in results) * repeat:.2f}s)")
+    if pacer:
+        print(f"Rate limits:         {pacer.summary()}")
+    if sessions:
+        logins = sum(session.logins for session in sessions.sessions)
+        refreshes = sum(session.refreshes for session in sessions.sessions)
+        print(f"Auth:                {len(sessions.sessions)} user(s), {logins} login(s), {refreshes} refresh(es)")
+        unauthorized = [r for r in results if r["status"] == 401 and not r["path"].startswith("/api/auth/")]
+        if unauthorized:
+            print(f"[WARN] {len(unauthorized)} route(s) still answered 401 with a token "
+                  "(role or permission checks), so their handler was not timed")
+        if args.token_cache:
+            sessions.save_cache(args.token_cache)
     print()
-
+    if repeat > 1 or args.histogram:
+        print_latency_table(results, args.histogram)
+    if args.transfer:
+        print_transfer_table(results, int(args.max_payload_kb * 1024))
+    instances = instance_breakdown(base_urls, outcomes, shards) if len(base_urls) > 1 else None
+    if instances:
+        print_instance_table(instances, args.shard)
+    costs = None
+    if cold is not None:
+        costs = compile_costs(results, cold)
+        print_compile_table(costs, route_line_counts(samples, args.api_dir), args.top)
     if failed > 0:
         print("FAILED ROUTES:")
         for r in results:
             if not r["success"]:
-                print(f"  - {r['description']}: {r['message']}")
+                print(f"  - {r['description']} [{r['method']}]: {r['message']}")
         print()
 
     if passed == total:
@@ -156,5 +1083,14 @@ def main():
 
     print("=" * 100)
 
+    if args.json:
+        write_results_json(args.json, results, base_urls, repeat, args.concurrency, costs, instances=instances)
+        print(f"Results written to {args.json}")
+
+    exit_code = check_latency_gates(results, args.baseline, args.regression_threshold,
+                                    args.min_regression_ms, args.budgets)
+    if exit_code:
+        sys.exit(exit_code)
+
 if __name__ == "__main__":
     main()